@@ -0,0 +1,100 @@
+"""
+Load test for /chatbot/chatbotGemenai.
+
+Two modes:
+  * live      - fire concurrent POSTs at a running server and report throughput
+                python -m benchmarks.chat_load --url http://localhost:8004/chatbot/chatbotGemenai
+  * simulate  - offline before/after comparison on a single event loop, with the
+                Gemini call and the Astra round trips replaced by fixed-latency stubs
+                python -m benchmarks.chat_load --simulate
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    print(f"{label:<12} requests={len(latencies):<5} "
+          f"elapsed={elapsed:7.2f}s  throughput={len(latencies) / elapsed:8.1f} req/s  "
+          f"p50={statistics.median(latencies) * 1000:8.1f}ms  p95={p95 * 1000:8.1f}ms")
+
+
+# -------------------------------
+# LIVE MODE
+# -------------------------------
+def _post(url, i):
+    body = json.dumps({"user_id": f"loadtest-{i % 50}", "message": f"load test message {i}"}).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def run_live(url, total, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda i: _post(url, i), range(total)))
+    _report("live", latencies, time.perf_counter() - start)
+
+
+# -------------------------------
+# SIMULATE MODE
+# -------------------------------
+async def _blocking_handler(db_latency, llm_latency):
+    # previous handler: sync astrapy calls + sync graph run inside `async def`
+    time.sleep(db_latency)   # find_one
+    time.sleep(llm_latency)  # get_chatbot_response
+    time.sleep(db_latency)   # update_one
+
+
+async def _async_handler(db_latency, llm_latency):
+    # current handler: awaited AsyncCollection calls + graph.ainvoke
+    await asyncio.sleep(db_latency)
+    await asyncio.sleep(llm_latency)
+    await asyncio.sleep(db_latency)
+
+
+async def _drive(handler, total, concurrency, db_latency, llm_latency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await handler(db_latency, llm_latency)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - start
+
+
+def run_simulation(total, concurrency, db_latency, llm_latency):
+    print(f"simulated db={db_latency * 1000:.0f}ms llm={llm_latency * 1000:.0f}ms "
+          f"concurrency={concurrency}")
+    for label, handler in (("before", _blocking_handler), ("after", _async_handler)):
+        latencies, elapsed = asyncio.run(_drive(handler, total, concurrency, db_latency, llm_latency))
+        _report(label, latencies, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="endpoint of a running server (live mode)")
+    parser.add_argument("--simulate", action="store_true", help="offline before/after comparison")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--db-latency", type=float, default=0.03, help="seconds per Astra call (simulate)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per Gemini call (simulate)")
+    args = parser.parse_args()
+
+    if args.url:
+        run_live(args.url, args.requests, args.concurrency)
+    else:
+        run_simulation(args.requests, args.concurrency, args.db_latency, args.llm_latency)
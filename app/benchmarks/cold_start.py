@@ -0,0 +1,112 @@
+"""
+Cold-start benchmark for main.py: import time, lifespan startup time, peak RSS and
+which heavy dependencies got loaded, each measured in a fresh interpreter.
+
+    python -m benchmarks.cold_start                       # lazy (default) vs PRELOAD_SUBSYSTEMS=all
+    python -m benchmarks.cold_start --runs 10 --subsystems chat,analysis
+    python -m benchmarks.cold_start --max-seconds 2 --max-rss-mb 250   # exit 1 on regression (CI)
+
+Run from app/ with the same environment (.env) the server uses.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = [
+    "yfinance", "pandas", "numpy", "praw", "firecrawl", "langchain_google_genai",
+    "langgraph", "astrapy", "redis", "openai",
+]
+
+# executed in a fresh interpreter per run; prints one JSON line
+_CHILD = r"""
+import sys, time, json, asyncio, resource
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def _startup():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+startup_error = None
+try:
+    asyncio.run(_startup())
+except Exception as e:
+    startup_error = str(e)
+started = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "startup_s": started - imported,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [m for m in HEAVY if m in sys.modules],
+    "startup_error": startup_error,
+}))
+"""
+
+
+def run_once(env):
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + _CHILD
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=app_dir, env=env,
+        capture_output=True, text=True, timeout=300
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"child failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_scenario(label, overrides, runs):
+    env = {**os.environ, **overrides}
+    samples = [run_once(env) for _ in range(runs)]
+    result = {
+        "scenario": label,
+        "import_s": statistics.median(s["import_s"] for s in samples),
+        "startup_s": statistics.median(s["startup_s"] for s in samples),
+        "rss_mb": statistics.median(s["rss_mb"] for s in samples),
+        "loaded": samples[-1]["loaded"],
+        "startup_error": samples[-1]["startup_error"],
+    }
+    print(f"{label:<10} import={result['import_s']:6.2f}s  startup={result['startup_s']:6.2f}s  "
+          f"total={result['import_s'] + result['startup_s']:6.2f}s  rss={result['rss_mb']:7.1f}MB  "
+          f"heavy={','.join(result['loaded']) or '-'}")
+    if result["startup_error"]:
+        print(f"{'':<10} lifespan error: {result['startup_error']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per scenario (median is reported)")
+    parser.add_argument("--subsystems", default="all", help="SUBSYSTEMS value for both scenarios")
+    parser.add_argument("--lazy-only", action="store_true", help="skip the PRELOAD_SUBSYSTEMS=all scenario")
+    parser.add_argument("--max-seconds", type=float, help="fail if lazy import+startup exceeds this")
+    parser.add_argument("--max-rss-mb", type=float, help="fail if lazy peak RSS exceeds this")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    base = {"SUBSYSTEMS": args.subsystems}
+    results = [run_scenario("lazy", {**base, "PRELOAD_SUBSYSTEMS": ""}, args.runs)]
+    if not args.lazy_only:
+        results.append(run_scenario("preload", {**base, "PRELOAD_SUBSYSTEMS": "all"}, args.runs))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    lazy = results[0]
+    failures = []
+    if args.max_seconds is not None and lazy["import_s"] + lazy["startup_s"] > args.max_seconds:
+        failures.append(f"cold start {lazy['import_s'] + lazy['startup_s']:.2f}s > {args.max_seconds}s")
+    if args.max_rss_mb is not None and lazy["rss_mb"] > args.max_rss_mb:
+        failures.append(f"peak RSS {lazy['rss_mb']:.1f}MB > {args.max_rss_mb}MB")
+    if failures:
+        print("REGRESSION: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Per-request setup overhead of the LangGraph workflows: building a new workflow
+(and compiling its graph) for every request, as the handlers used to, vs the
+process-wide compiled singletons they use now. Models and Firecrawl are stubs,
+so only construction + compile is measured (no network, no API keys).
+
+    python -m benchmarks.graph_setup
+    python -m benchmarks.graph_setup --requests 500
+
+Run from app/.
+"""
+import time
+import argparse
+import statistics
+from utills.clients import registry
+
+
+class StubModel:
+    """Enough of a chat model for the workflows' constructors"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class StubFirecrawl:
+    pass
+
+
+def _stub_registry():
+    registry.chat_model_for = lambda node: StubModel()
+    registry.firecrawl = lambda: StubFirecrawl()
+
+
+def _scenarios():
+    from multiAgent.workflow import Workflow
+    from multiAgent.multiAgent import get_workflow
+    from tradingAgent.agents.agents import Workflow_tradingAgent
+    from tradingAgent.main import get_trading_workflow
+    from tradingAgent_cronjob.workflow import Workflow_tradingAgent as Workflow_cronjob
+    from tradingAgent_cronjob.main import get_cronjob_workflow
+
+    return {
+        # name: (per request before, per request now)
+        "analysis": (lambda: Workflow(registry.chat_model_for("analysis.chatbot")).workflow, get_workflow),
+        "trading": (lambda: Workflow_tradingAgent(None, registry.firecrawl()).workflow, get_trading_workflow),
+        "cronjob": (lambda: Workflow_cronjob().workflow, get_cronjob_workflow),
+    }
+
+
+def _per_request(setup, requests):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        setup()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    _stub_registry()
+    print(f"{args.requests} requests per workflow, setup time per request")
+    for name, (rebuild, singleton) in _scenarios().items():
+        before = _per_request(rebuild, args.requests)
+        start = time.perf_counter()
+        singleton()  # first request pays the compile once
+        first = time.perf_counter() - start
+        after = _per_request(singleton, args.requests)
+        print(f"{name:9} rebuild median={statistics.median(before) * 1e3:8.3f}ms  "
+              f"singleton first={first * 1e3:8.3f}ms then median={statistics.median(after) * 1e6:6.2f}us  "
+              f"saved/request={(statistics.median(before) - statistics.median(after)) * 1e3:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
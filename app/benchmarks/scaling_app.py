@@ -0,0 +1,45 @@
+"""
+CPU-bound stub app for benchmarks.worker_scaling: no upstream calls, so throughput
+is bounded by the GIL of each worker process.
+
+The module is imported once in the parent before the workers are forked (like
+gunicorn --preload), and the import already creates registry clients there. Every
+response reports the pid that created the worker's probe client and whether its
+HTTP session is the parent's object: a fork-safe registry hands each worker
+clients created in that worker.
+"""
+import os
+import hashlib
+from fastapi import FastAPI
+from utills.clients import registry
+
+app = FastAPI()
+WORK_ROUNDS = int(os.getenv("SCALING_WORK_ROUNDS", 20000))
+
+
+def _probe():
+    # the factory runs in whichever process creates the client, so this is its creating pid
+    return registry._get("scaling_probe", lambda: {"pid": os.getpid()})
+
+
+# created at import, i.e. in the parent when the app is preloaded
+_probe()
+PRELOAD_SESSION_ID = id(registry.http_session())
+
+
+@app.get("/health")
+def health():
+    return {"pid": os.getpid()}
+
+
+@app.get("/work")
+def work():
+    digest = b"stub"
+    for _ in range(WORK_ROUNDS):
+        digest = hashlib.sha256(digest).digest()
+    return {
+        "pid": os.getpid(),
+        "client_pid": _probe()["pid"],
+        "parent_session": id(registry.http_session()) == PRELOAD_SESSION_ID,
+        "digest": digest.hex()[:8],
+    }
@@ -0,0 +1,95 @@
+"""
+Sequential vs parallel execution of one model turn's tool calls, with stub tools
+that sleep for typical upstream latencies (no network, no API keys).
+
+    python -m benchmarks.tool_loop                    # 3 tickers x 5 tools
+    python -m benchmarks.tool_loop --tickers 8 --rounds 5
+    python -m benchmarks.tool_loop --hang             # one tool never answers: shows the timeout
+
+Run from app/.
+"""
+import time
+import argparse
+import statistics
+import threading
+from utills.tool_loop import execute_tool_calls
+
+# seconds per call, roughly what the real upstreams take
+STUB_LATENCIES = {
+    "get_ticker_data_poly": 0.35,
+    "fetch_stock_price_polygon": 0.20,
+    "get_stock_data_yahoo": 0.60,
+    "get_reddit_vibe": 0.90,
+    "get_related_articles": 0.45,
+}
+
+
+class StubTool:
+    def __init__(self, name, latency, hang_event=None):
+        self.name = name
+        self.latency = latency
+        self.hang_event = hang_event
+
+    def invoke(self, args):
+        if self.hang_event is not None:
+            self.hang_event.wait()
+        time.sleep(self.latency)
+        return {"tool": self.name, "args": args, "data": "x" * 20000}
+
+
+def _tool_calls(tickers):
+    return [
+        {"id": f"{name}-{i}", "name": name, "args": {"ticker": f"T{i}"}}
+        for i in range(tickers) for name in STUB_LATENCIES
+    ]
+
+
+def run_sequential(tools_by_name, calls):
+    for call in calls:
+        tools_by_name[call["name"]].invoke(call["args"])
+
+
+def run_parallel(tools_by_name, calls, timeout):
+    return execute_tool_calls(calls, tools_by_name, timeout=timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--hang", action="store_true", help="make get_reddit_vibe never return")
+    args = parser.parse_args()
+
+    hang = threading.Event() if args.hang else None
+    tools_by_name = {
+        name: StubTool(name, latency, hang if name == "get_reddit_vibe" else None)
+        for name, latency in STUB_LATENCIES.items()
+    }
+    calls = _tool_calls(args.tickers)
+    print(f"{len(calls)} tool calls per model turn ({args.tickers} tickers x {len(STUB_LATENCIES)} tools)")
+
+    sequential, parallel = [], []
+    for _ in range(args.rounds):
+        if not args.hang:
+            start = time.perf_counter()
+            run_sequential(tools_by_name, calls)
+            sequential.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        messages = run_parallel(tools_by_name, calls, args.timeout)
+        parallel.append(time.perf_counter() - start)
+
+    if sequential:
+        print(f"sequential  median={statistics.median(sequential):6.2f}s")
+    print(f"parallel    median={statistics.median(parallel):6.2f}s"
+          + (f"  speedup={statistics.median(sequential) / statistics.median(parallel):5.1f}x" if sequential else ""))
+    errors = [m for m in messages if m.status == "error"]
+    print(f"last turn: {len(messages)} ToolMessages, {len(errors)} errors, "
+          f"largest result {max(len(m.content) for m in messages)} chars (capped)")
+    if hang is not None:
+        hang.set()  # release the stuck stub threads
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Multi-worker scaling harness: serves the CPU-bound stub in benchmarks/scaling_app.py
+from 1..N forked workers, drives it with concurrent requests and reports
+throughput, speedup and per-worker fork safety.
+
+The server (`--serve N`) imports the app and binds the socket in the parent, then
+forks the workers with the multiprocessing fork start method - the same model as
+gunicorn --preload with the uvicorn worker. (uvicorn --workers spawns fresh
+interpreters, which would not exercise the fork path.)
+
+    python -m benchmarks.worker_scaling --max-workers 4 --requests 400 --concurrency 32
+
+Near-linear speedup needs at least --max-workers free cores. Run from app/.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import subprocess
+import multiprocessing
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+# -------------------------------
+# FORKING SERVER
+# -------------------------------
+def _serve_worker(sock):
+    import uvicorn
+    from benchmarks.scaling_app import app
+    uvicorn.Server(uvicorn.Config(app, log_level="warning")).run(sockets=[sock])
+
+
+def serve(workers, port):
+    """Preload the app, bind once, fork `workers` uvicorn servers sharing the socket"""
+    import benchmarks.scaling_app  # noqa: F401  creates the parent's clients before the fork
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    context = multiprocessing.get_context("fork")
+    procs = [context.Process(target=_serve_worker, args=(sock,), daemon=True) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    def stop(*_):
+        for proc in procs:
+            proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for proc in procs:
+        proc.join()
+
+
+# -------------------------------
+# LOAD
+# -------------------------------
+
+
+def _get(url, timeout=60):
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def _wait_ready(base_url, proc, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            _get(f"{base_url}/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run(workers, port, total, concurrency):
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.worker_scaling", "--serve", str(workers), "--port", str(port)],
+        cwd=app_dir
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url, proc)
+        # warm every worker (and its lazily created clients) before timing
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda _: _get(f"{base_url}/work"), range(workers * 4)))
+            start = time.perf_counter()
+            responses = list(pool.map(lambda _: _get(f"{base_url}/work"), range(total)))
+            elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    pids = Counter(r["pid"] for r in responses)
+    inherited = [r for r in responses if r["client_pid"] != r["pid"] or r["parent_session"]]
+    return {"workers": workers, "throughput": total / elapsed, "pids": len(pids), "inherited_clients": len(inherited)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8910)
+    parser.add_argument("--serve", type=int, metavar="WORKERS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    results = []
+    for workers in range(1, args.max_workers + 1):
+        result = run(workers, args.port, args.requests, args.concurrency)
+        baseline = results[0]["throughput"] if results else result["throughput"]
+        speedup = result["throughput"] / baseline
+        print(f"workers={workers:<3} throughput={result['throughput']:8.1f} req/s  "
+              f"speedup={speedup:5.2f}x  efficiency={speedup / workers:6.1%}  "
+              f"pids_seen={result['pids']}  inherited_clients={result['inherited_clients']}")
+        results.append(result)
+
+    if any(r["inherited_clients"] for r in results):
+        print("FAIL: a worker used clients created before the fork")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
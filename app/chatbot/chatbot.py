@@ -1,37 +1,53 @@
 from typing import Annotated
-import os
-from langchain.chat_models import init_chat_model
+import functools
 from typing_extensions import TypedDict
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START
 from langgraph.graph.message import add_messages
 
 from dotenv import load_dotenv 
+from utills.clients import registry
+from utills.limiter import limit, alimit
+from utills.metrics import timed_node
 load_dotenv()
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
 
-graph_builder = StateGraph(State)
-
-GOOGLE_API_KEY = os.environ["GOOGLE_API_KEY"] 
-NVIDIA_MODEL_KEY = os.environ["NVIDIA_MODEL_KEY"]
-
-llm = init_chat_model("google_genai:gemini-2.0-flash-exp",api_key=GOOGLE_API_KEY)
+# the model (tier of `chatbot.chatbot` in model_tiers.json) is created on the first call, not at import
 #llm2 = init_chat_model("google_genai:gemini-2.5-flash",api_key=GOOGLE_API_KEY)
 #llm3 = init_chat_model("nvidia/llama-3.1-nemotron-70b-instruct",api_key=NVIDIA_MODEL_KEY)
 
 
 def chatbot(state: State):
-    return {"messages": [llm.invoke(state["messages"])]}
-
-graph_builder.add_node("chatbot", chatbot)
-
-graph_builder.add_edge(START, "chatbot")
-
-graph = graph_builder.compile()
+    llm = registry.chat_model_for("chatbot.chatbot")
+    with limit("gemini"):
+        return {"messages": [llm.invoke(state["messages"])]}
+
+async def achatbot(state: State):
+    llm = registry.chat_model_for("chatbot.chatbot")
+    async with alimit("gemini"):
+        return {"messages": [await llm.ainvoke(state["messages"])]}
+
+@functools.lru_cache(maxsize=None)
+def get_graph():
+    """Compiled once per process, on first use"""
+    graph_builder = StateGraph(State)
+    # sync callers (stream/invoke) hit `chatbot`, async callers (ainvoke/astream) hit `achatbot`
+    graph_builder.add_node("chatbot", RunnableLambda(
+        timed_node("chatbot", "chatbot", chatbot),
+        afunc=timed_node("chatbot", "chatbot", achatbot)
+    ))
+    graph_builder.add_edge(START, "chatbot")
+    return graph_builder.compile()
 
 def get_chatbot_response(user_input: str):
-    for event in graph.stream({"messages": [{"role": "user", "content": user_input}]}):
+    for event in get_graph().stream({"messages": [{"role": "user", "content": user_input}]}):
         for value in event.values():
-            return value["messages"][-1].content
\ No newline at end of file
+            return value["messages"][-1].content
+
+async def aget_chatbot_response(user_input: str):
+    """Non-blocking variant of get_chatbot_response for use inside the event loop"""
+    state = await get_graph().ainvoke({"messages": [{"role": "user", "content": user_input}]})
+    return state["messages"][-1].content
\ No newline at end of file
@@ -0,0 +1,203 @@
+import os
+import time
+import asyncio
+import logging
+import zlib
+from collections import OrderedDict
+from utills.clients import registry, redis_enabled
+
+HISTORY_LIMIT = 5
+# The Data API has no `$slice` update modifier, so the stored array is allowed to
+# grow to this many pushes and is then trimmed back to HISTORY_LIMIT in one write.
+COMPACT_AFTER = int(os.getenv("HISTORY_COMPACT_AFTER", 20))
+CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", 10000))
+# with Redis every read checks the user's revision, so entries can live long;
+# without it another worker's appends only show up once the entry expires
+USE_REDIS = redis_enabled("HISTORY_REDIS")
+CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", 300 if USE_REDIS else 15))
+FLUSHERS = int(os.getenv("HISTORY_FLUSHERS", 4))
+
+
+class ChatHistoryStore:
+    """
+    Recent queries per user, backed by the `users_queries_history` collection.
+
+    Reads are served from a per-process LRU (one projected find_one on a miss).
+    Writes are visible to this process immediately - they extend the cached
+    history, or wait in `_pending` (merged into the next load) until flushed -
+    and are flushed behind the request as a single atomic find_one_and_update
+    per message ($push + $inc, upsert), so concurrent messages from one user
+    never overwrite each other. Flushes are partitioned by user so each user's
+    writes stay in order.
+
+    With Redis (REDIS_HOST set, or HISTORY_REDIS=1) every flush bumps the user's
+    revision `history:rev:<user_id>` and a cached history is only served while
+    the revision is unchanged, so other workers' appends are never hidden.
+    Without it, entries expire after HISTORY_CACHE_TTL (default 15s).
+    """
+
+    def __init__(self, collection_name: str = "users_queries_history"):
+        self.collection_name = collection_name
+        self._cache = OrderedDict()  # user_id -> (expires_at, revision, queries)
+        self._pending = {}           # user_id -> queries appended here but not flushed yet
+        self._loading = {}           # user_id -> [queries appended while a `recent` load is awaited]
+        self._queues = []
+        self._flushers = []
+
+    def _collection(self):
+        return registry.async_collection(self.collection_name)
+
+    # -------------------------------
+    # LRU
+    # -------------------------------
+    def _cache_get(self, user_id, revision=None):
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        expires_at, cached_revision, queries = entry
+        if expires_at < time.monotonic() or (USE_REDIS and cached_revision != revision):
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return queries
+
+    def _cache_put(self, user_id, queries, revision=None):
+        self._cache[user_id] = (time.monotonic() + CACHE_TTL, revision, queries[-HISTORY_LIMIT:])
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    # -------------------------------
+    # REVISIONS (Redis)
+    # -------------------------------
+    def _revision_key(self, user_id):
+        return f"history:rev:{user_id}"
+
+    async def _revision(self, user_id):
+        if not USE_REDIS:
+            return None
+        try:
+            return await registry.async_redis().get(self._revision_key(user_id))
+        except Exception as e:
+            logging.warning(f"Chat history revision unavailable, reloading {user_id}: {e}")
+            return "unavailable"
+
+    async def _bump_revision(self, user_id):
+        if not USE_REDIS:
+            return
+        try:
+            revision = await registry.async_redis().incr(self._revision_key(user_id))
+            entry = self._cache.get(user_id)
+            if entry is not None and int(entry[1] or 0) == revision - 1:
+                # our own write: the cached history already has it
+                self._cache[user_id] = (entry[0], str(revision), entry[2])
+        except Exception as e:
+            logging.warning(f"Could not bump chat history revision of {user_id}: {e}")
+
+    # -------------------------------
+    # PUBLIC API
+    # -------------------------------
+    async def recent(self, user_id: str):
+        """Last HISTORY_LIMIT queries for the user, oldest first"""
+        revision = await self._revision(user_id)
+        queries = self._cache_get(user_id, revision)
+        if queries is not None:
+            return list(queries)
+        # the read may land before writes that were pending (or made) meanwhile, even if they flush first
+        unflushed = list(self._pending.get(user_id, []))
+        appended = []
+        self._loading.setdefault(user_id, []).append(appended)
+        try:
+            doc = await self._collection().find_one(
+                {"user_id": user_id},
+                projection={"queries": {"$slice": -HISTORY_LIMIT}}
+            )
+        finally:
+            self._loading[user_id].remove(appended)
+            if not self._loading[user_id]:
+                del self._loading[user_id]
+        queries = list((doc or {}).get("queries", []))
+        for query in unflushed + appended:
+            if query not in queries:
+                queries.append(query)
+        queries = queries[-HISTORY_LIMIT:]
+        if revision != "unavailable":
+            self._cache_put(user_id, queries, revision)
+        return queries
+
+    def append(self, user_id: str, query: dict):
+        """Record a query: visible to `recent` immediately, persisted write-behind"""
+        self._pending.setdefault(user_id, []).append(query)
+        for appended in self._loading.get(user_id, ()):
+            appended.append(query)
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            expires_at, revision, cached = entry
+            self._cache_put(user_id, cached + [query], revision)
+        self._ensure_started()
+        self._queues[zlib.crc32(user_id.encode()) % len(self._queues)].put_nowait((user_id, query))
+
+    def _flushed(self, user_id, query):
+        pending = self._pending.get(user_id)
+        if pending and query in pending:
+            pending.remove(query)
+        if not pending:
+            self._pending.pop(user_id, None)
+
+    # -------------------------------
+    # WRITE-BEHIND
+    # -------------------------------
+    def _ensure_started(self):
+        if self._flushers:
+            return
+        self._queues = [asyncio.Queue() for _ in range(max(1, FLUSHERS))]
+        self._flushers = [asyncio.create_task(self._flush_loop(q)) for q in self._queues]
+
+    async def start(self):
+        self._ensure_started()
+
+    async def stop(self):
+        """Drain pending writes, then stop the flushers"""
+        if not self._flushers:
+            return
+        await asyncio.gather(*(q.join() for q in self._queues))
+        for task in self._flushers:
+            task.cancel()
+        await asyncio.gather(*self._flushers, return_exceptions=True)
+        self._flushers, self._queues = [], []
+
+    async def _flush_loop(self, queue: asyncio.Queue):
+        while True:
+            user_id, query = await queue.get()
+            try:
+                await self._push(user_id, query)
+                await self._bump_revision(user_id)
+            except Exception as e:
+                logging.error(f"Chat history flush failed for {user_id}: {e}")
+            finally:
+                self._flushed(user_id, query)
+                queue.task_done()
+
+    async def _push(self, user_id, query):
+        from astrapy.constants import ReturnDocument
+
+        collection = self._collection()
+        doc = await collection.find_one_and_update(
+            {"user_id": user_id},
+            {"$push": {"queries": {"$each": [query]}}, "$inc": {"pushes": 1}},
+            projection={"queries": {"$slice": -HISTORY_LIMIT}, "pushes": 1},
+            return_document=ReturnDocument.AFTER,
+            upsert=True
+        )
+        if not doc:
+            return
+        if doc.get("pushes", 0) >= COMPACT_AFTER:
+            # conditional on `pushes` so a concurrent push is never trimmed away;
+            # if another write got in first, the next push retries the trim
+            await collection.update_one(
+                {"user_id": user_id, "pushes": doc["pushes"]},
+                {"$set": {"queries": doc.get("queries", []), "pushes": 0}}
+            )
+
+
+chat_history = ChatHistoryStore()
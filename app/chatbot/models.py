@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class ChatRequest(BaseModel):
     message: str
@@ -11,6 +12,7 @@ class FirecrawlInput(BaseModel):
     query: str  
     economic_term: str
     symbol: str  
+    bypass_cache: bool = False
 
 class ChatRequest2(BaseModel):
     user_id: str
@@ -18,4 +20,17 @@ class ChatRequest2(BaseModel):
 
 class UserChatHistory(BaseModel):
     user_id: str
-    queries: list[dict]      
\ No newline at end of file
+    queries: list[dict]      
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    user_email: Optional[str] = None
+    enqueued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    wait_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+    queue_depth: Optional[int] = None
+    response: Optional[str] = None
+    error: Optional[str] = None
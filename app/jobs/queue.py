@@ -0,0 +1,194 @@
+"""
+Redis job queue for trading-bot runs.
+
+Enqueued ids are LPUSHed onto QUEUE_KEY. A worker takes one with BLMOVE into
+PROCESSING_KEY, so the id is never only in the worker's memory. It then holds a
+lease (LEASES_KEY, job id -> expiry) that it renews with `heartbeat` while the job
+runs. `recover_expired_jobs` (run by workers at startup and while idle) requeues
+jobs whose worker died, up to TRADING_JOB_MAX_ATTEMPTS runs, then fails them.
+"""
+import os
+import json
+import time
+import uuid
+import logging
+import statistics
+from utills.clients import registry
+
+QUEUE_KEY = "jobs:trading:queue"
+PROCESSING_KEY = "jobs:trading:processing"
+LEASES_KEY = "jobs:trading:leases"
+RUNNING_KEY = "jobs:trading:running"
+COUNTERS_KEY = "jobs:trading:counters"
+WAIT_SAMPLES_KEY = "jobs:trading:wait_samples"
+RUN_SAMPLES_KEY = "jobs:trading:run_samples"
+
+JOB_RESULT_TTL = int(os.getenv("TRADING_JOB_RESULT_TTL", 7 * 24 * 3600))
+JOB_LEASE_SECONDS = float(os.getenv("TRADING_JOB_LEASE_SECONDS", 60))
+JOB_MAX_ATTEMPTS = int(os.getenv("TRADING_JOB_MAX_ATTEMPTS", 3))
+MAX_SAMPLES = 1000
+
+
+def _job_key(job_id):
+    return f"jobs:trading:{job_id}"
+
+
+def enqueue_trading_job(user_prefs: dict):
+    """Store a queued job record and push its id onto the work queue"""
+    r = registry.redis()
+    job_id = uuid.uuid4().hex
+    pipe = r.pipeline()
+    pipe.hset(_job_key(job_id), mapping={
+        "job_id": job_id,
+        "status": "queued",
+        "user_email": user_prefs.get("user_email", ""),
+        "payload": json.dumps(user_prefs, default=str),
+        "enqueued_at": time.time(),
+    })
+    pipe.lpush(QUEUE_KEY, job_id)
+    pipe.hincrby(COUNTERS_KEY, "enqueued", 1)
+    pipe.llen(QUEUE_KEY)
+    *_, queue_depth = pipe.execute()
+    return job_id, queue_depth
+
+
+def get_job(job_id):
+    record = registry.redis().hgetall(_job_key(job_id))
+    if not record:
+        return None
+    record.pop("payload", None)
+    for field in ("enqueued_at", "started_at", "finished_at", "wait_seconds", "run_seconds"):
+        if field in record:
+            record[field] = float(record[field])
+    return record
+
+
+def next_job(timeout: int = 5):
+    """Block until a job is available; lease it, mark it running and return (job_id, user_prefs)"""
+    r = registry.redis()
+    # the id stays in the processing list until finish_job, so a crashed worker's job can be recovered
+    job_id = r.blmove(QUEUE_KEY, PROCESSING_KEY, timeout, src="RIGHT", dest="LEFT")
+    if not job_id:
+        return None
+    started_at = time.time()
+    r.zadd(LEASES_KEY, {job_id: started_at + JOB_LEASE_SECONDS})
+    payload, enqueued_at = r.hmget(_job_key(job_id), "payload", "enqueued_at")
+    if payload is None:
+        # the record expired or was deleted: nothing to run
+        pipe = r.pipeline()
+        pipe.lrem(PROCESSING_KEY, 0, job_id)
+        pipe.zrem(LEASES_KEY, job_id)
+        pipe.execute()
+        return None
+    wait_seconds = started_at - float(enqueued_at)
+    pipe = r.pipeline()
+    pipe.hset(_job_key(job_id), mapping={
+        "status": "running",
+        "started_at": started_at,
+        "wait_seconds": wait_seconds,
+        "worker_pid": os.getpid(),
+    })
+    pipe.hincrby(_job_key(job_id), "attempts", 1)
+    pipe.sadd(RUNNING_KEY, job_id)
+    pipe.lpush(WAIT_SAMPLES_KEY, wait_seconds)
+    pipe.ltrim(WAIT_SAMPLES_KEY, 0, MAX_SAMPLES - 1)
+    pipe.execute()
+    return job_id, json.loads(payload)
+
+
+def heartbeat(job_id) -> bool:
+    """Extend the job's lease; False if it was lost (expired and recovered by another worker)"""
+    return bool(registry.redis().zadd(LEASES_KEY, {job_id: time.time() + JOB_LEASE_SECONDS}, xx=True, ch=True))
+
+
+def recover_expired_jobs():
+    """Requeue (or fail, after JOB_MAX_ATTEMPTS runs) jobs whose lease expired; returns (requeued, failed)"""
+    r = registry.redis()
+    now = time.time()
+    # an id moved by a worker that died before taking its lease gets one now
+    leased = set(r.zrange(LEASES_KEY, 0, -1))
+    orphans = [job_id for job_id in r.lrange(PROCESSING_KEY, 0, -1) if job_id not in leased]
+    if orphans:
+        r.zadd(LEASES_KEY, {job_id: now + JOB_LEASE_SECONDS for job_id in orphans}, nx=True)
+
+    requeued, failed = [], []
+    for job_id in r.zrangebyscore(LEASES_KEY, 0, now):
+        # only the worker whose ZREM succeeds recovers the job
+        if not r.zrem(LEASES_KEY, job_id):
+            continue
+        attempts = int(r.hget(_job_key(job_id), "attempts") or 0)
+        if attempts >= JOB_MAX_ATTEMPTS:
+            r.lrem(PROCESSING_KEY, 0, job_id)
+            finish_job(job_id, error=f"worker lost after {attempts} attempts (lease expired)")
+            failed.append(job_id)
+            continue
+        pipe = r.pipeline()
+        pipe.hset(_job_key(job_id), "status", "queued")
+        pipe.srem(RUNNING_KEY, job_id)
+        pipe.lrem(PROCESSING_KEY, 0, job_id)
+        # the queue is consumed from the right: a recovered job runs next
+        pipe.rpush(QUEUE_KEY, job_id)
+        pipe.hincrby(COUNTERS_KEY, "requeued", 1)
+        pipe.execute()
+        requeued.append(job_id)
+    if requeued or failed:
+        logging.warning(f"Recovered trading jobs with expired leases: requeued {requeued}, failed {failed}")
+    return requeued, failed
+
+
+def finish_job(job_id, response=None, error=None):
+    r = registry.redis()
+    finished_at = time.time()
+    started_at = float(r.hget(_job_key(job_id), "started_at") or finished_at)
+    run_seconds = finished_at - started_at
+    status = "failed" if error else "succeeded"
+    pipe = r.pipeline()
+    pipe.hset(_job_key(job_id), mapping={
+        "status": status,
+        "finished_at": finished_at,
+        "run_seconds": run_seconds,
+        "response": response or "",
+        "error": error or "",
+    })
+    pipe.expire(_job_key(job_id), JOB_RESULT_TTL)
+    pipe.srem(RUNNING_KEY, job_id)
+    pipe.lrem(PROCESSING_KEY, 0, job_id)
+    pipe.zrem(LEASES_KEY, job_id)
+    pipe.hincrby(COUNTERS_KEY, status, 1)
+    pipe.lpush(RUN_SAMPLES_KEY, run_seconds)
+    pipe.ltrim(RUN_SAMPLES_KEY, 0, MAX_SAMPLES - 1)
+    pipe.execute()
+
+
+def _summary(samples):
+    values = sorted(float(v) for v in samples)
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "max": None}
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": values[len(values) // 2],
+        "p95": values[max(0, int(len(values) * 0.95) - 1)],
+        "max": values[-1],
+    }
+
+
+def queue_metrics():
+    """Queue depth, running jobs, totals and wait/run time summaries over recent jobs"""
+    r = registry.redis()
+    pipe = r.pipeline()
+    pipe.llen(QUEUE_KEY)
+    pipe.scard(RUNNING_KEY)
+    pipe.zcount(LEASES_KEY, 0, time.time())
+    pipe.hgetall(COUNTERS_KEY)
+    pipe.lrange(WAIT_SAMPLES_KEY, 0, -1)
+    pipe.lrange(RUN_SAMPLES_KEY, 0, -1)
+    queue_depth, running, expired_leases, counters, wait_samples, run_samples = pipe.execute()
+    return {
+        "queue_depth": queue_depth,
+        "running": running,
+        "expired_leases": expired_leases,
+        "totals": {key: int(value) for key, value in counters.items()},
+        "wait_seconds": _summary(wait_samples),
+        "run_seconds": _summary(run_samples),
+    }
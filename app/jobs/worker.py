@@ -0,0 +1,97 @@
+"""
+Worker pool for queued trading-bot runs.
+
+    python -m jobs.worker --workers 4
+
+Each worker process pops job ids from Redis and executes trading_bot_multi_agents
+through run_and_store_trading_bot, renewing the job's lease while it runs. At
+startup and while idle, workers requeue jobs whose lease expired because their
+worker crashed (see jobs/queue.py). Size the pool with the queue depth and
+wait/run times reported by GET /chatbot/userTradingAgents/jobs/metrics.
+"""
+import os
+import time
+import signal
+import threading
+import argparse
+import logging
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _worker_loop():
+    # heavy imports happen inside the worker process, after the fork
+    from jobs.queue import next_job, finish_job, heartbeat, recover_expired_jobs, JOB_LEASE_SECONDS
+    from tradingAgent.core.models import UserPreferences
+    from tradingAgent.main import run_and_store_trading_bot
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logging.info(f"Trading job worker {os.getpid()} started")
+
+    recovered_at = 0.0
+    while not stopping:
+        if time.monotonic() - recovered_at >= JOB_LEASE_SECONDS:
+            try:
+                recover_expired_jobs()
+            except Exception as e:
+                logging.warning(f"Could not recover expired trading jobs: {e}")
+            recovered_at = time.monotonic()
+        job = next_job(timeout=5)
+        if job is None:
+            continue
+        job_id, payload = job
+        logging.info(f"Worker {os.getpid()} running job {job_id}")
+        done = threading.Event()
+        beat = threading.Thread(target=_keep_leased, args=(job_id, done, heartbeat, JOB_LEASE_SECONDS / 3), daemon=True)
+        beat.start()
+        try:
+            model_answer = run_and_store_trading_bot(UserPreferences(**payload))
+            finish_job(job_id, response=model_answer)
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {e}")
+            finish_job(job_id, error=str(e))
+        finally:
+            done.set()
+            beat.join()
+
+
+def _keep_leased(job_id, done, heartbeat, interval):
+    while not done.wait(interval):
+        try:
+            if not heartbeat(job_id):
+                logging.warning(f"Lost the lease of job {job_id}; it may run again on another worker")
+                return
+        except Exception as e:
+            logging.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+
+def main(workers: int):
+    processes = [multiprocessing.Process(target=_worker_loop, name=f"trading-worker-{i}") for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TRADING_JOB_WORKERS", 2)))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main(args.workers)
@@ -1,109 +1,58 @@
-from fastapi import FastAPI
-from chatbot.chatbot import get_chatbot_response
-from multiAgent.tools import ArxivToAstra
-from chatbot.models import ChatRequest, ChatRequest2, ChatResponse , FirecrawlInput ,UserChatHistory
-from multiAgent.multiAgent import get_chat_response
-from dotenv import load_dotenv 
-import os
-from datetime import datetime
-from nvidiaModel.chatbot import nvidia_model
-from tradingAgent.core.models import UserPreferences
-from tradingAgent.main import trading_bot_multi_agents
-from tradingAgent_cronjob.main import cronjob_trading_agents 
-from astrapy import DataAPIClient
-from langchain_core.messages import BaseMessage
-import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import time
+from starlette.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from chatbot.history import chat_history
+from utills.clients import registry
+from utills.limiter import UpstreamBusy
+from utills import metrics
+import routers
 
 load_dotenv()
-ASTRA_TOKEN = os.environ["ASTRA_TOKEN"] 
-ASTRA_ENDPOINT = os.environ["ASTRA_ENDPOINT"] 
 
-app = FastAPI()
 
-@app.get("/chatbot")
-def root():
-    return {"msg":"server is running"}    
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    registry.warm_up()
+    # heavy subsystems load on first request unless PRELOAD_SUBSYSTEMS asks for them here
+    await run_in_threadpool(routers.preload)
+    await chat_history.start()
+    yield
+    await chat_history.stop()
+    registry.close()
 
-@app.get("/chatbot/health")
-def health():
-    return {"msg":"server is healthy"}     
+app = FastAPI(lifespan=lifespan)
 
+for router in routers.routers():
+    app.include_router(router)
 
-@app.post("/chatbot/chatbotGemenai", response_model=ChatResponse)
-async def chat(req: ChatRequest2):
-    arxiv_store = ArxivToAstra(ASTRA_TOKEN, ASTRA_ENDPOINT)
-    collection = arxiv_store.db.get_collection("users_queries_history")
 
-    # Fetch user chat history 
-    user_history = collection.find_one({"user_id": req.user_id})
-    past_queries = []
-    if user_history:
-        past_queries = user_history.get("queries", [])[-5:]  # Get last 5 queries
-    else:
-        collection.insert_one({"user_id": req.user_id, "queries": []})
-
-    context = "\n".join([q["query"] for q in past_queries])
-    enriched_input = f"Context from past queries:\n{context}\n\nCurrent query: {req.message}"
-
-    reply = get_chatbot_response(enriched_input)
-
-    new_query = {"query": req.message, "timestamp": datetime.utcnow().isoformat()}
-    updated_queries_history = (past_queries + [new_query])[-5:]
-
-    collection.update_one(
-        {"user_id": req.user_id},
-        {"$set": {"queries": updated_queries_history}},
-        upsert=True
-    )
-    return ChatResponse(response=reply)
-
-
-@app.post("/chatbot/anlasisysAgent", response_model=ChatResponse)
-def multiAgent(req: FirecrawlInput):
-    reply = get_chat_response(req.query, req.economic_term, req.symbol)
-    return {"response": reply}
-
-
-@app.post("/chatbot/chatbotNvidia", response_model=ChatResponse)
-async def chat(req: ChatRequest):
-    model_answer = nvidia_model(req.message)        
-    return {"response": model_answer}
-
-
-
-
-@app.post("/chatbot/userTradingAgents", response_model=ChatResponse)
-async def user_trading_bot(req: UserPreferences):
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
     try:
-        client = DataAPIClient(ASTRA_TOKEN)
-        db = client.get_database_by_api_endpoint(ASTRA_ENDPOINT)
-        collection = db.get_collection("trading_bot")
-        
-        if collection.find_one({"user_email": req.user_email}):
-            return {"response": "Error: A trading bot session already exists for this email."}
-
-        model_answer, state = trading_bot_multi_agents(req)
-            
-        collection.insert_one({
-        "user_email": req.user_email,
-        "response": model_answer,
-        "user_preferences": req.dict(),
-        "timestamp": datetime.utcnow().isoformat()
-        })
-        
-    except Exception as e:
-        model_answer = f"Error: {e}"
-        print(f"Error: {e}")    
-    return {"response": model_answer}
-
-
-
-@app.get("/chatbot/cronTradingAgents", response_model=ChatResponse)
-async def cronjob_trading_bot():
-    try:
-        state = cronjob_trading_agents()
-        model_answer = "Cronjob trading agents executed."
-    except Exception as e:
-        model_answer = f"Error: {e}"
-        print(f"Error: {e}")    
-    return {"response": model_answer}
\ No newline at end of file
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # route template (e.g. /chatbot/userTradingAgents/jobs/{job_id}) keeps label cardinality bounded;
+        # streaming responses are measured until their headers are sent
+        route = request.scope.get("route")
+        metrics.http_request_duration.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status
+        )
+
+
+@app.exception_handler(UpstreamBusy)
+async def upstream_busy_handler(request: Request, exc: UpstreamBusy):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "upstream": exc.upstream},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
@@ -1,21 +1,83 @@
 from typing import Annotated
 import os
-from langchain.chat_models import init_chat_model
+import functools
 from .workflow import Workflow
+from utills.clients import registry
+from utills.singleflight import SingleFlight
+from utills.response_cache import ResponseCache
 from dotenv import load_dotenv 
 
 load_dotenv()
 
 
+# concurrent identical analyses (e.g. many users asking about one symbol at market open)
+# share a single workflow run, within this worker and across workers via Redis
+_analysis_flight = SingleFlight("analysis")
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+# finished analyses are reused for ANALYSIS_CACHE_TTL seconds during market hours
+# and until the next open (at most ANALYSIS_CACHE_MAX_TTL seconds) outside them
+analysis_cache = ResponseCache(
+    "analysis",
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", 300)),
+    max_ttl=int(os.getenv("ANALYSIS_CACHE_MAX_TTL", 12 * 3600))
+)
+
+
+def analyze(message: str , economic_term: str ,symbol: str, bypass_cache: bool = False):
+    """
+    Cached + coalesced analysis. Returns (reply, cache_status, max_age) where
+    cache_status is HIT, MISS or BYPASS (forced refresh, or the cache is disabled)
+    and max_age the seconds the reply stays fresh (0 for BYPASS).
+    `bypass_cache` runs the workflow on its own (no cache read, no coalescing) and
+    stores the fresh reply.
+    """
+    key = f"{_normalize(message)}|{_normalize(economic_term)}|{_normalize(symbol)}"
+    if bypass_cache:
+        analysis_cache.bypassed()
+    else:
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            reply, remaining = cached
+            return reply, "HIT", remaining
+
+    def run_and_store():
+        reply = _run_analysis(message, economic_term, symbol)
+        if reply is not None:
+            analysis_cache.set(key, reply)
+        return reply
+
+    if bypass_cache:
+        # a forced refresh must not join (or be joined by) an ordinary run already in flight
+        return run_and_store(), "BYPASS", 0
+    reply = _analysis_flight.do(key, run_and_store)
+    if not analysis_cache.enabled:
+        return reply, "BYPASS", 0
+    return reply, "MISS", analysis_cache.ttl_for()
+
+
 def get_chat_response(message: str , economic_term: str ,symbol: str):
-    GOOGLE_API_KEY = os.environ["GOOGLE_API_KEY"] 
-    llm = init_chat_model("google_genai:gemini-2.5-flash",api_key=GOOGLE_API_KEY)
-    workflow = Workflow(llm)
+    reply, _, _ = analyze(message, economic_term, symbol)
+    return reply
+
+
+@functools.lru_cache(maxsize=None)
+def get_workflow():
+    """Compiled once per process; the question, term and symbol travel in the state"""
+    return Workflow(registry.chat_model_for("analysis.chatbot")).workflow
+
+
+def _run_analysis(message: str , economic_term: str ,symbol: str):
+    workflow = get_workflow()
     print("Economic & Stocks Research Agent")
     print("=" * 40)
     query = (f"Financial Query: {message}").strip()
     if query:
-        state = workflow.workflow.invoke({
+        state = workflow.invoke({
             "messages": [{"role":"user", "content":query}],
             "economic_term": economic_term,
             "symbol": symbol
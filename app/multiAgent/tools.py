@@ -7,16 +7,22 @@ from astrapy import DataAPIClient
 import re
 from dotenv import load_dotenv
 import os
+from utills.clients import registry
+from utills.metrics import observed
+from utills.limiter import limit
 
 load_dotenv()
 
 
 
 class ArxivToAstra:
-    def __init__(self, astra_token, astra_endpoint):
-        """Initialize connection to Astra DB"""
-        self.client = DataAPIClient(astra_token)
-        self.db = self.client.get_database_by_api_endpoint(astra_endpoint)
+    def __init__(self, astra_token=None, astra_endpoint=None, db=None):
+        """Initialize connection to Astra DB (or reuse an existing database handle)"""
+        if db is not None:
+            self.db = db
+        else:
+            self.client = DataAPIClient(astra_token)
+            self.db = self.client.get_database_by_api_endpoint(astra_endpoint)
 
     # regex search
     def search_papers(self, query=None, limit=10, collection_name="arxiv_papers"):
@@ -63,12 +69,10 @@ class ArxivToAstra:
 
 
 @tool(description="Fetches arxives collected in database using vector search for relevant data user query.")
+@observed("astra")
 def fetch_arxives(economic_term):
-    ASTRA_TOKEN = os.environ["ASTRA_TOKEN"] 
-    ASTRA_ENDPOINT = os.environ["ASTRA_ENDPOINT"] 
-
-    # Initialize the ArXiv to Astra pipeline
-    arxiv_store = ArxivToAstra(ASTRA_TOKEN, ASTRA_ENDPOINT)
+    # Reuse the process-wide Astra connection
+    arxiv_store = ArxivToAstra(db=registry.astra_db())
     print(f"\nSearching for {economic_term} papers...")
     results = arxiv_store.search_papers( economic_term, limit=3)
     #results = arxiv_store.search_papers_advanced( economic_term, limit=3) # TODO: in production
@@ -83,10 +87,12 @@ def fetch_arxives(economic_term):
 
 
 @tool(description="Fetches the latest economic or stock-related articles.")
+@observed("articles")
 def fetch_articles(economic_term, symbol) -> dict:
     url = f"http://129.159.138.109/v1/api/dataagent?economic_term={economic_term}&symbol={symbol}"
     try:
-        response = requests.post(url)
+        with limit("articles"):
+            response = registry.http_session().post(url)
         response.raise_for_status()
         return {"data": response.json()}
     except requests.exceptions.RequestException as e:
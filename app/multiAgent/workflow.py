@@ -1,15 +1,23 @@
 from typing import Dict, Any ,Annotated 
 from langgraph.graph import StateGraph, END ,START
 from langchain_core.messages import HumanMessage, SystemMessage
-from utills.firecrawl import FirecrawlService
+from utills.clients import registry
+from utills.limiter import limit
+from utills.metrics import timed_node
+from utills.compaction import compact_results
+from utills.tool_loop import run_parallel, TOOL_RESULT_MAX_CHARS
 #from .promts import FinancialToolsPrompts
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
 from .tools import fetch_articles, fetch_arxives
 from langchain_core.tools import tool
 from chatbot.models import FirecrawlInput
+import os
+import json
 import logging
 
+# each retrieval branch gets this long before it is dropped from the answer
+ANALYSIS_BRANCH_TIMEOUT = float(os.getenv("ANALYSIS_BRANCH_TIMEOUT", 20))
 
 # Configure logging
 logging.basicConfig(
@@ -25,69 +33,90 @@ class State(TypedDict):
 
 class Workflow:
     def __init__(self,llm):
-        self.firecrawl = FirecrawlService()
+        self.firecrawl = registry.firecrawl()
         self.llm = llm
         #self.prompts = FinancialToolsPrompts()
         self.workflow = self._build_workflow()
 
     def _build_workflow(self):
         graph = StateGraph(state_schema=State)
-        graph.add_node("chatbot", self._chatbot)
-        graph.add_node("fetch_articles" , fetch_articles) 
-        graph.add_node("fetch_arxives" , fetch_arxives) 
-        graph.add_node("firecrawl_search" , self._firecrawl_search) #(FIRECRAWL)
+        graph.add_node("chatbot", timed_node("analysis", "chatbot", self._chatbot))
+        graph.add_node("fetch_articles" , timed_node("analysis", "fetch_articles", self._fetch_articles)) 
+        graph.add_node("fetch_arxives" , timed_node("analysis", "fetch_arxives", self._fetch_arxives)) 
+        graph.add_node("firecrawl_search" , timed_node("analysis", "firecrawl_search", self._firecrawl_branch)) #(FIRECRAWL)
         #graph.set_entry_point("extract_financial_tools")
-        graph.add_edge(START , "fetch_articles")
-        graph.add_edge("fetch_articles", "fetch_arxives")
-        graph.add_edge("fetch_arxives" , "firecrawl_search")
-        graph.add_edge("firecrawl_search" , "chatbot")
+        # the three sources are independent: fan out from START, join before chatbot
+        branches = ["fetch_articles", "fetch_arxives", "firecrawl_search"]
+        for branch in branches:
+            graph.add_edge(START, branch)
+        graph.add_edge(branches, "chatbot")
         graph.add_edge("chatbot", END)
         return graph.compile()
 
+    # -------------------------------
+    # RETRIEVAL BRANCHES
+    # -------------------------------
+    def _with_deadline(self, source: str, fn, *args):
+        """Run fn on the tool pool; past ANALYSIS_BRANCH_TIMEOUT the source is dropped"""
+        result = run_parallel([(fn, args, {})], ANALYSIS_BRANCH_TIMEOUT)[0]
+        if isinstance(result, Exception):
+            logging.warning(f"analysis: dropping {source} ({result})")
+            return None
+        return result
+
+    def _source_message(self, title: str, result) -> dict:
+        if not result or (isinstance(result, dict) and result.get("error")):
+            return {"messages": []}
+        content = json.dumps(result, default=str)
+        if len(content) > TOOL_RESULT_MAX_CHARS:
+            content = content[:TOOL_RESULT_MAX_CHARS] + "...[truncated]"
+        return {"messages": [SystemMessage(content=f"{title}:\n{content}")]}
+
+    def _fetch_articles(self, state: State):
+        economic_term, symbol = state.get("economic_term", ""), state.get("symbol", "")
+        result = self._with_deadline(
+            "articles", fetch_articles.invoke, {"economic_term": economic_term, "symbol": symbol})
+        return self._source_message(f"Latest articles for '{economic_term}' ({symbol})", result)
+
+    def _fetch_arxives(self, state: State):
+        economic_term = state.get("economic_term", "")
+        result = self._with_deadline("arxives", fetch_arxives.invoke, {"economic_term": economic_term})
+        return self._source_message(f"Research papers for '{economic_term}'", result)
+
+    def _firecrawl_branch(self, state: State):
+        return self._with_deadline("firecrawl", self._firecrawl_search, state) or {"messages": []}
+
+    def _model_input(self, messages):
+        """
+        Branch results are SystemMessages added after the question, and Gemini only
+        honours a leading system message: merge them into one context message up front.
+        """
+        context = [m.content for m in messages if isinstance(m, SystemMessage)]
+        conversation = [m for m in messages if not isinstance(m, SystemMessage)]
+        if not context:
+            return conversation
+        return [SystemMessage(content="Answer using this research context:\n\n" + "\n\n".join(context))] + conversation
+
     def _chatbot(self, state: State):
-        return {"messages": [self.llm.invoke(state["messages"])] }
+        with limit("gemini"):
+            return {"messages": [self.llm.invoke(self._model_input(state["messages"]))] }
 
     #@tool(description="FireCrawl for advance crawling websites related to the economic terms Query")
     def _firecrawl_search(self, state: State):
         query = state.get("query", "financial market")
         
         try:
-            # Get serialized results
-            search_results = self.firecrawl.search_financial_services(query)
-            
-            # Create a system message with the search results
-            result_message = SystemMessage(
-                content=f"Firecrawl search results for query '{query}':\n{json.dumps(search_results, indent=2)}"
-            )
-            
-            # Initialize firecrawl_data list
-            firecrawl_data = []
-            
-            # Process search results if they exist
-            if search_results and isinstance(search_results, dict) and search_results.get('data'):
-                for result_item in search_results['data'][:3]:  # Limit to first 3 results
-                    if isinstance(result_item, dict) and result_item.get('url'):
-                        scraped_data = self.firecrawl.scrape_financial_website(url=result_item['url'])
-                        if scraped_data:
-                            firecrawl_data.append(scraped_data)
-            
-            # Get market data
-            market_data = self.firecrawl.search_market_data(query=query)
-            if market_data:
-                firecrawl_data.append(market_data)
-            
-            # Get economic data
-            economic_data = self.firecrawl.scrape_economic_data(indicator=query)
-            if economic_data:
-                firecrawl_data.append(economic_data)
+            # searches, then the top result pages, run concurrently (partial results on timeouts)
+            search_results, firecrawl_data = self.firecrawl.research(query, max_urls=3)
             
-            # Create consolidated message with all data
+            # Search hits and scraped pages overlap: compact them into one ranked,
+            # deduplicated block within the FIRECRAWL_*_TOKENS budgets
             consolidated_message = SystemMessage(
-                content=f"Firecrawl crawling results for query '{query}':\n{json.dumps(firecrawl_data, indent=2)}"
+                content=f"Firecrawl results for query '{query}':\n{compact_results(query, [search_results, firecrawl_data])}"
             )
             logging.info(f"Completed firecrawl search for query: {query}. \n answer: {consolidated_message} \n" )
             # Return updated state with new messages
-            return {"messages": [result_message, consolidated_message]}
+            return {"messages": [consolidated_message]}
             
         except Exception as e:
             error_message = SystemMessage(
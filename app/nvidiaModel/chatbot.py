@@ -1,33 +1,31 @@
-from openai import OpenAI
-import os
-from dotenv import load_dotenv 
+from utills.clients import registry
+from utills.limiter import limit
 
 
-def nvidia_model(query : str):
-    load_dotenv()
-    NVIDIA_MODEL_KEY =os.environ["NVIDIA_MODEL_KEY"]
+def nvidia_model_stream(query : str):
+    """Yield completion deltas as they arrive from the NVIDIA endpoint"""
+    client = registry.nvidia_openai()
+
+    # the admission slot is held until the stream is exhausted or closed
+    with limit("nvidia"):
+        completion = client.chat.completions.create(
+            model="nvidia/llama-3.1-nemotron-70b-instruct",
+            messages=[{"role":"user","content": query}],
+            temperature=0.5,
+            top_p=1,
+            max_tokens=1024,
+            stream=True
+            )
 
-    client = OpenAI(
-        base_url = "https://integrate.api.nvidia.com/v1",
-        api_key = NVIDIA_MODEL_KEY
-        )
+        for chunk in completion:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
 
-    completion = client.chat.completions.create(
-        model="nvidia/llama-3.1-nemotron-70b-instruct",
-        messages=[{"role":"user","content": query}],
-        temperature=0.5,
-        top_p=1,
-        max_tokens=1024,
-        stream=True
-        )
 
+def nvidia_model(query : str):
     full_response = ""
-    for chunk in completion:
-        if chunk.choices[0].delta.content is not None:
-            content = chunk.choices[0].delta.content
-            print(content, end="")
-            full_response = full_response + content
+    for content in nvidia_model_stream(query):
+        print(content, end="")
+        full_response = full_response + content
        
     return full_response  
-
-
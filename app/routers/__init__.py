@@ -0,0 +1,58 @@
+"""
+One APIRouter per subsystem. Router modules import only FastAPI, pydantic models
+and small utilities; the subsystem itself (LangGraph, Gemini, Firecrawl, yfinance,
+praw, astrapy, ...) is imported inside the handlers on first use, so a worker only
+pays startup time and memory for the features it actually serves.
+
+SUBSYSTEMS=chat,analysis   mount only these routers (default: all)
+PRELOAD_SUBSYSTEMS=all     import these subsystems during startup instead of on first request
+"""
+import os
+import logging
+import importlib
+
+# subsystem -> (router module, heavy modules it loads lazily)
+SUBSYSTEMS = {
+    "ops":      ("routers.ops", []),
+    "chat":     ("routers.chat", ["chatbot.chatbot"]),
+    "analysis": ("routers.analysis", ["multiAgent.multiAgent"]),
+    "nvidia":   ("routers.nvidia", ["nvidiaModel.chatbot"]),
+    "trading":  ("routers.trading", ["tradingAgent.main", "jobs.queue"]),
+    "cronjob":  ("routers.cronjob", ["tradingAgent_cronjob.main"]),
+}
+
+
+def _names(value: str):
+    if value.strip().lower() == "all":
+        return list(SUBSYSTEMS)
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SUBSYSTEMS]
+    if unknown:
+        raise ValueError(f"Unknown subsystems {unknown}; expected any of {list(SUBSYSTEMS)}")
+    return names
+
+
+def enabled_subsystems():
+    names = _names(os.getenv("SUBSYSTEMS", "all"))
+    # health/metrics routes are always served
+    return names if "ops" in names else ["ops"] + names
+
+
+def routers():
+    for name in enabled_subsystems():
+        yield importlib.import_module(SUBSYSTEMS[name][0]).router
+
+
+def preload(names=None):
+    """Import the heavy modules of the given (default: PRELOAD_SUBSYSTEMS) enabled subsystems"""
+    if names is None:
+        names = _names(os.getenv("PRELOAD_SUBSYSTEMS", "")) if os.getenv("PRELOAD_SUBSYSTEMS") else []
+    enabled = enabled_subsystems()
+    for name in names:
+        if name not in enabled:
+            continue
+        for module in SUBSYSTEMS[name][1]:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logging.warning(f"Could not preload {module}: {e}")
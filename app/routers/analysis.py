@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Request, Response
+from chatbot.models import ChatResponse, FirecrawlInput
+
+router = APIRouter()
+
+
+@router.post("/chatbot/anlasisysAgent", response_model=ChatResponse)
+def multiAgent(req: FirecrawlInput, request: Request, response: Response):
+    from multiAgent.multiAgent import analyze
+
+    # `bypass_cache` in the body or `Cache-Control: no-cache` forces a fresh run
+    bypass = req.bypass_cache or "no-cache" in request.headers.get("cache-control", "")
+    reply, cache_status, max_age = analyze(req.query, req.economic_term, req.symbol, bypass_cache=bypass)
+    response.headers["X-Cache"] = cache_status
+    # a bypassed or uncached reply must not be reused by the client either
+    response.headers["Cache-Control"] = "no-store" if cache_status == "BYPASS" else f"private, max-age={max_age}"
+    return {"response": reply}
+
+
+@router.get("/chatbot/anlasisysAgent/cache")
+def multiAgent_cache_stats():
+    from multiAgent.multiAgent import analysis_cache
+    return analysis_cache.stats()
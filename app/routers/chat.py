@@ -0,0 +1,23 @@
+from datetime import datetime
+from fastapi import APIRouter
+from chatbot.history import chat_history
+from chatbot.models import ChatRequest2, ChatResponse
+
+router = APIRouter()
+
+
+@router.post("/chatbot/chatbotGemenai", response_model=ChatResponse)
+async def chat(req: ChatRequest2):
+    from chatbot.chatbot import aget_chatbot_response
+
+    # Fetch user chat history (served from the per-process LRU when warm)
+    past_queries = await chat_history.recent(req.user_id)
+
+    context = "\n".join([q["query"] for q in past_queries])
+    enriched_input = f"Context from past queries:\n{context}\n\nCurrent query: {req.message}"
+
+    reply = await aget_chatbot_response(enriched_input)
+
+    # persisted write-behind as one atomic push
+    chat_history.append(req.user_id, {"query": req.message, "timestamp": datetime.utcnow().isoformat()})
+    return ChatResponse(response=reply)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from starlette.concurrency import run_in_threadpool
+from chatbot.models import ChatResponse
+
+router = APIRouter()
+
+
+@router.get("/chatbot/cronTradingAgents", response_model=ChatResponse)
+async def cronjob_trading_bot():
+    try:
+        from tradingAgent_cronjob.main import cronjob_trading_agents
+        state = await run_in_threadpool(cronjob_trading_agents)
+        model_answer = "Cronjob trading agents executed."
+    except Exception as e:
+        model_answer = f"Error: {e}"
+        print(f"Error: {e}")    
+    return {"response": model_answer}
@@ -0,0 +1,38 @@
+import itertools
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from chatbot.models import ChatRequest, ChatResponse
+from utills.sse import sse_event, SSE_HEADERS
+
+router = APIRouter()
+
+
+@router.post("/chatbot/chatbotNvidia", response_model=ChatResponse)
+async def chat_nvidia(req: ChatRequest):
+    from nvidiaModel.chatbot import nvidia_model
+    model_answer = await run_in_threadpool(nvidia_model, req.message)
+    return {"response": model_answer}
+
+
+@router.post("/chatbot/chatbotNvidia/stream")
+def chat_nvidia_stream(req: ChatRequest):
+    """Server-sent events: one `data` event per delta, then `done` (or `error`)"""
+    from nvidiaModel.chatbot import nvidia_model_stream
+
+    # pull the first delta before responding, so admission (429/503) and
+    # connection errors surface as HTTP errors instead of mid-stream events
+    stream = nvidia_model_stream(req.message)
+    first = list(itertools.islice(stream, 1))
+
+    def events():
+        try:
+            for delta in itertools.chain(first, stream):
+                yield sse_event({"delta": delta})
+            yield sse_event({}, event="done")
+        except Exception as e:
+            print(f"Error: {e}")
+            yield sse_event({"error": str(e)}, event="error")
+
+    # sync generator: Starlette iterates it in the thread pool, off the event loop
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utills.limiter import upstream_stats
+from utills import metrics
+
+router = APIRouter()
+
+
+@router.get("/chatbot")
+def root():
+    return {"msg":"server is running"}    
+
+@router.get("/chatbot/health")
+def health():
+    return {"msg":"server is healthy"}     
+
+
+@router.get("/chatbot/upstreams")
+def upstreams():
+    """In-flight and queued calls per upstream (Gemini, NVIDIA, Firecrawl, Polygon, Reddit, ...)"""
+    return upstream_stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,83 @@
+from datetime import datetime
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from chatbot.models import ChatResponse, JobStatus
+from tradingAgent.core.models import UserPreferences
+from utills.clients import registry
+from utills.sse import sse_event, with_heartbeat, SSE_HEADERS
+from utills.limiter import UpstreamBusy
+
+router = APIRouter()
+
+
+@router.post("/chatbot/userTradingAgents", response_model=ChatResponse)
+async def user_trading_bot(req: UserPreferences):
+    from tradingAgent.main import run_and_store_trading_bot
+    try:
+        model_answer = await run_in_threadpool(run_and_store_trading_bot, req)
+    except UpstreamBusy:
+        raise
+    except Exception as e:
+        model_answer = f"Error: {e}"
+        print(f"Error: {e}")    
+    return {"response": model_answer}
+
+
+@router.post("/chatbot/userTradingAgents/stream")
+def user_trading_bot_stream(req: UserPreferences):
+    """
+    Server-sent events for the trading workflow: `token` events while an LLM node
+    generates text (structured-output nodes send none), a `node` event with its summary and partial state as each node
+    completes, then `final` with the same response the JSON endpoint returns.
+    """
+    def events():
+        try:
+            from tradingAgent.main import trading_bot_multi_agents_stream
+
+            collection = registry.collection("trading_bot")
+            if collection.find_one({"user_email": req.user_email}):
+                yield sse_event({"error": "A trading bot session already exists for this email."}, event="error")
+                return
+
+            model_answer = None
+            for event, payload in trading_bot_multi_agents_stream(req):
+                if event == "final":
+                    model_answer = payload["response"]
+                yield sse_event(payload, event=event)
+
+            collection.insert_one({
+            "user_email": req.user_email,
+            "response": model_answer,
+            "user_preferences": req.dict(),
+            "timestamp": datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            print(f"Error: {e}")
+            yield sse_event({"error": str(e)}, event="error")
+
+    return StreamingResponse(with_heartbeat(events()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+
+@router.post("/chatbot/userTradingAgents/jobs", response_model=JobStatus, status_code=202)
+def enqueue_user_trading_bot(req: UserPreferences):
+    """Queue a trading-bot run for the worker pool (python -m jobs.worker) and return its id"""
+    from jobs.queue import enqueue_trading_job
+    job_id, queue_depth = enqueue_trading_job(req.dict())
+    return {"job_id": job_id, "status": "queued", "user_email": req.user_email, "queue_depth": queue_depth}
+
+
+@router.get("/chatbot/userTradingAgents/jobs/metrics")
+def trading_jobs_metrics():
+    from jobs.queue import queue_metrics
+    return queue_metrics()
+
+
+@router.get("/chatbot/userTradingAgents/jobs/{job_id}", response_model=JobStatus)
+def trading_job_status(job_id: str):
+    from jobs.queue import get_job
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,10 +1,16 @@
 from typing import Dict, Any, Annotated 
 from langgraph.graph import StateGraph, END, START
 from langchain_core.messages import HumanMessage, SystemMessage
-from utills.firecrawl import FirecrawlService
+from utills.clients import registry
+from utills.limiter import UpstreamBusy
+from utills.metrics import timed_node
+from utills.compaction import compact_results
+from utills.structured_output import invoke_structured
+from utills.tool_loop import build_tool_agent, tool_transcript
+from tradingAgent.core.models import MarketResearch, InvestmentPlan, user_plan_terms
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
-from tradingAgent.core.tools import tools_list
+from tradingAgent.core.tools import research_tools
 from .tradingAgents import TradingAgents
 import logging
 import json
@@ -25,24 +31,50 @@ class State(TypedDict):
     validation_results: dict
 
 class Workflow_tradingAgent:
-    def __init__(self, llm, user_prefs, FirecrawlService):
-        self.firecrawl = FirecrawlService()
-        self.llm = llm.bind_tools(tools_list)
-        self.user_prefs = user_prefs
-        self.agents = TradingAgents(self.llm, user_prefs)
+    """
+    Compiled once per process (see `tradingAgent.main.get_trading_workflow`); the
+    user's preferences travel in the state (`user_preferences`), never on the instance.
+    """
+    def __init__(self, llm=None, firecrawl=None):
+        # `llm` pins one model for every node; None gives each node its tier from model_tiers.json
+        self.firecrawl = firecrawl or registry.firecrawl()
+        self._pinned_llm = llm
+        self.llm = llm.bind_tools(research_tools) if llm is not None else None
+        self._node_llms = {}
+        self._tool_agents = {}
+        self.agents = TradingAgents(llm if llm is not None else registry.chat_model_for("trading.agents"))
         self.workflow = self._build_workflow()
+
+    def _model_for(self, node: str):
+        """Unbound chat model of the node's tier (or the pinned model)"""
+        return self._pinned_llm if self._pinned_llm is not None else registry.chat_model_for(f"trading.{node}")
+
+    def _llm_for(self, node: str):
+        """Node model with the read-only research tools bound"""
+        if self.llm is not None:
+            return self.llm
+        if node not in self._node_llms:
+            self._node_llms[node] = self._model_for(node).bind_tools(research_tools)
+        return self._node_llms[node]
+
+    def _gather_with_tools(self, node: str, prompt: str) -> str:
+        """Let the node's model call tools (in parallel, bounded rounds) and return what they found"""
+        if node not in self._tool_agents:
+            self._tool_agents[node] = build_tool_agent(self._llm_for(node), research_tools, name=f"trading_{node}_tools")
+        state = self._tool_agents[node].invoke({"messages": [HumanMessage(content=prompt)], "iterations": 0})
+        return tool_transcript(state["messages"])
        
     def _build_workflow(self):
         """Build enhanced workflow with better structure"""
         graph = StateGraph(state_schema=State)
 
-        graph.add_node("firecrawl_search", self._firecrawl_search)
-        graph.add_node("market_research", self._market_research_node)
-        graph.add_node("investment_analysis", self._investment_analysis_node)
-        graph.add_node("portfolio_optimization", self._portfolio_optimization_node)
-        graph.add_node("execution_planning", self._execution_planning_node)
-        graph.add_node("validation", self._validation_node)
-        graph.add_node("final_output", self._final_output_node)
+        graph.add_node("firecrawl_search", timed_node("trading", "firecrawl_search", self._firecrawl_search))
+        graph.add_node("market_research", timed_node("trading", "market_research", self._market_research_node))
+        graph.add_node("investment_analysis", timed_node("trading", "investment_analysis", self._investment_analysis_node, cache=False))
+        graph.add_node("portfolio_optimization", timed_node("trading", "portfolio_optimization", self._portfolio_optimization_node))
+        graph.add_node("execution_planning", timed_node("trading", "execution_planning", self._execution_planning_node))
+        graph.add_node("validation", timed_node("trading", "validation", self._validation_node))
+        graph.add_node("final_output", timed_node("trading", "final_output", self._final_output_node))
         
         graph.add_edge(START, "firecrawl_search")
         graph.add_edge("firecrawl_search","market_research")
@@ -74,36 +106,17 @@ class Workflow_tradingAgent:
             2. Use get_related_articles("{query}") to get recent news
             3. Use stock data tools to analyze price trends
             
-            After gathering data, provide a summary in this JSON format:
-            {{
-                "market_research": {{
-                    "sentiment_analysis": {{
-                        "overall_sentiment": "positive/negative/neutral",
-                        "sentiment_score": 0.0,
-                        "key_themes": ["theme1", "theme2"],
-                        "reddit_insights": "Summary of Reddit sentiment"
-                    }},
-                    "news_analysis": {{
-                        "recent_developments": ["news1", "news2"],
-                        "market_catalysts": ["catalyst1", "catalyst2"],
-                        "risk_events": ["risk1", "risk2"]
-                    }},
-                    "market_conditions": {{
-                        "trend_direction": "bullish/bearish/sideways",
-                        "volatility_level": "low/medium/high",
-                        "market_phase": "accumulation/distribution/trending"
-                    }}
-                }}
-            }}
-            
-            Use tools FIRST, then analyze the results. Return ONLY the JSON structure.
+            After gathering data, summarize the sentiment, the news and the market conditions.
             """
             
-            # Execute research
-            response = self.llm.invoke([HumanMessage(content=research_prompt)])
-            
-            # Extract JSON from response
-            market_analysis = self._extract_json_from_response(response.content, "market_research")
+            # Execute research; the schema replaces free-text JSON scraping
+            gathered = self._gather_with_tools("market_research", research_prompt)
+            research = invoke_structured(
+                self._model_for("market_research"), MarketResearch,
+                [HumanMessage(content=f"{research_prompt}\n\nDATA GATHERED WITH TOOLS:\n{gathered or 'none'}")],
+                "trading.market_research"
+            )
+            market_analysis = {"market_research": research.model_dump()} if research else {}
             
             message = SystemMessage(
                 content=f"📊 Market Research Completed\n"
@@ -116,6 +129,8 @@ class Workflow_tradingAgent:
                 "market_analysis": market_analysis
             }
             
+        except UpstreamBusy:
+            raise
         except Exception as e:
             logging.error(f"Market research error: {str(e)}")
             error_message = SystemMessage(content=f"❌ Market research error: {str(e)}")
@@ -146,40 +161,6 @@ class Workflow_tradingAgent:
             2. Analyze which stocks fit the user's criteria
             3. Calculate optimal allocations based on budget and risk level
             
-            OUTPUT EXACTLY THIS JSON STRUCTURE:
-            {{
-                "investment_plan": {{
-                    "status": "generated",
-                    "timestamp": "{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                    "strategy": "{user_prefs.get('strategy', 'swing')}",
-                    "risk_level": "{user_prefs.get('risk', 'medium')}",
-                    "total_budget": {user_prefs.get('budget', 0)},
-                    "user_query": "{user_prefs.get('query', '')}",
-                    "selected_stocks": [
-                        {{
-                            "symbol": "ACTUAL_TICKER",
-                            "company_name": "Real Company Name",
-                            "current_price": 150.00,
-                            "allocation_percentage": 25.0,
-                            "allocation_amount": 12500.0,
-                            "shares_to_buy": 83,
-                            "target_price": 180.00,
-                            "stop_loss_price": 135.00,
-                            "confidence_score": 8.5,
-                            "reasoning": "Specific reason based on analysis and market data",
-                            "expected_return": 20.0,
-                            "time_horizon": "3-6 months"
-                        }}
-                    ],
-                    "risk_management": {{
-                        "cash_reserve_percentage": 10.0,
-                        "max_position_size": 25.0,
-                        "stop_loss_percentage": 10.0,
-                        "rebalance_frequency": "monthly"
-                    }}
-                }}
-            }}
-            
             REQUIREMENTS:
             - Include 5-8 stocks maximum
             - Use REAL prices from tools
@@ -188,14 +169,25 @@ class Workflow_tradingAgent:
             - Set realistic target and stop-loss prices
             - Provide specific reasoning for each stock
             
-            Use tools to get real data, then return ONLY the JSON structure.
+            Use tools to get real data, then fill in the investment plan.
             """
             
-            # Execute analysis
-            response = self.llm.invoke([HumanMessage(content=analysis_prompt)])
-            
-            # Extract and validate JSON
-            investment_plan = self._extract_json_from_response(response.content, "investment_plan")
+            # Execute analysis; the schema replaces free-text JSON scraping
+            gathered = self._gather_with_tools("investment_analysis", analysis_prompt)
+            plan = invoke_structured(
+                self._model_for("investment_analysis"), InvestmentPlan,
+                [HumanMessage(content=f"{analysis_prompt}\n\nDATA GATHERED WITH TOOLS:\n{gathered or 'none'}")],
+                "trading.investment_analysis"
+            )
+            if plan is None:
+                error_message = SystemMessage(content="❌ Investment analysis error: the investment plan did not match the schema")
+                return {"messages": [error_message], "investment_plan": {}}
+            investment_plan = plan.as_state(
+                status="generated",
+                timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                user_query=user_prefs.get('query', ''),
+                **user_plan_terms(user_prefs)  # budget, strategy and risk are the user's, not the model's
+            )
             
             # Extract stock symbols for next steps
             selected_stocks = investment_plan.get("investment_plan", {}).get("selected_stocks", [])
@@ -213,6 +205,8 @@ class Workflow_tradingAgent:
                 "symbols": symbols
             }
             
+        except UpstreamBusy:
+            raise
         except Exception as e:
             logging.error(f"Investment analysis error: {str(e)}")
             error_message = SystemMessage(content=f"❌ Investment analysis error: {str(e)}")
@@ -375,7 +369,10 @@ class Workflow_tradingAgent:
             
             validation_results["checks_performed"].append("Budget allocation check")
             
-            if allocated_value > total_budget * 0.95:  # More than 95% allocated
+            if total_budget <= 0:
+                validation_results["errors"].append("Investment plan has no budget")
+                validation_results["validation_status"] = "failed"
+            elif allocated_value > total_budget * 0.95:  # More than 95% allocated
                 validation_results["warnings"].append(f"High allocation: {allocated_value/total_budget*100:.1f}% of budget")
             
             # Check 2: Position sizes
@@ -428,81 +425,21 @@ class Workflow_tradingAgent:
             error_message = SystemMessage(content=f"❌ Final output error: {str(e)}")
             return {"messages": [error_message]}
 
-    def _extract_json_from_response(self, response_content: str, expected_key: str = None):
-        """Helper method to extract JSON from LLM response"""
-        try:
-            # Remove markdown code blocks
-            if "```json" in response_content:
-                json_start = response_content.find("```json") + 7
-                json_end = response_content.find("```", json_start)
-                json_content = response_content[json_start:json_end].strip()
-            elif "```" in response_content:
-                json_start = response_content.find("```") + 3
-                json_end = response_content.find("```", json_start)
-                json_content = response_content[json_start:json_end].strip()
-            else:
-                json_content = response_content.strip()
-            
-            # Parse JSON
-            parsed_json = json.loads(json_content)
-            return parsed_json
-            
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON parsing error: {e}")
-            # Return empty structure if expected_key provided
-            if expected_key:
-                return {expected_key: {}}
-            return {}
-        except Exception as e:
-            logging.error(f"JSON extraction error: {e}")
-            return {}
-    
-
-
-
-
-    
-    #@tool(description="FireCrawl for advance crawling websites related to the economic terms Query")
     def _firecrawl_search(self, state: State):
         query = state.get("query", "financial market")
         
         try:
-            # Get serialized results
-            search_results = self.firecrawl.search_financial_services(query)
-            
-            # Create a system message with the search results
-            result_message = SystemMessage(
-                content=f"Firecrawl search results for query '{query}':\n{json.dumps(search_results, indent=2)}"
-            )
-            
-            # Initialize firecrawl_data list
-            firecrawl_data = []
-            
-            # Process search results if they exist
-            if search_results and isinstance(search_results, dict) and search_results.get('data'):
-                for result_item in search_results['data'][:5]:  # Limit to first 3 results
-                    if isinstance(result_item, dict) and result_item.get('url'):
-                        scraped_data = self.firecrawl.scrape_financial_website(url=result_item['url'])
-                        if scraped_data:
-                            firecrawl_data.append(scraped_data)
-            
-            # Get market data
-            market_data = self.firecrawl.search_market_data(query=query)
-            if market_data:
-                firecrawl_data.append(market_data)
-            
-            # Get economic data
-            economic_data = self.firecrawl.scrape_economic_data(indicator=query)
-            if economic_data:
-                firecrawl_data.append(economic_data)
+            # searches, then the top result pages, run concurrently (partial results on timeouts)
+            search_results, firecrawl_data = self.firecrawl.research(query, max_urls=5)
             
-            # Create consolidated message with all data
+            # Search hits and scraped pages overlap: compact them into one ranked,
+            # deduplicated block within the FIRECRAWL_*_TOKENS budgets
             consolidated_message = SystemMessage(
-                content=f"Firecrawl crawling results for query '{query}':\n{json.dumps(firecrawl_data, indent=2)}"
+                content=f"Firecrawl results for query '{query}':\n{compact_results(query, [search_results, firecrawl_data])}"
             )
             #logging.info(f"Completed firecrawl search for query: {query}. \n answer: {consolidated_message} \n" )
             # Return updated state with new messages
-            return {"messages": [result_message, consolidated_message]}
+            return {"messages": [consolidated_message]}
             
         except Exception as e:
             error_message = SystemMessage(
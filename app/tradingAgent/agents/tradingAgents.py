@@ -2,6 +2,9 @@ from typing import Dict, Any
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import tool
 from tradingAgent.core.tools import get_ticker_data_poly, get_stock_data_yahoo, get_reddit_vibe, get_related_articles, save_portfolio_to_astra, get_user_portfolio_from_astra, tools_list
+from utills.limiter import UpstreamBusy
+from utills.structured_output import invoke_structured
+from tradingAgent.core.models import InvestmentPlan, user_plan_terms
 import logging
 import json
 import random
@@ -11,13 +14,13 @@ import re, ast
 logging.basicConfig(level=logging.INFO)
 
 class TradingAgents:
-    def __init__(self, llm, user_prefs):
+    def __init__(self, llm):
+        self.base_llm = llm
         self.llm = llm.bind_tools(tools_list)
-        self.user_prefs = user_prefs
         
 
     def chatbot(self, state):
-        """Enhanced chatbot that generates structured investment plans using tools"""
+        """Generate a schema-validated investment plan from the user's preferences"""
         try:
             user_prefs = state.get("user_preferences", {})
             query = user_prefs.get("query", "")
@@ -27,7 +30,7 @@ class TradingAgents:
             risk = user_prefs.get("risk", "medium")
             mode = user_prefs.get("mode", "virtual")
 
-            # Create a comprehensive prompt for the LLM to use tools and generate structured output
+            # The plan schema carries the output shape; the prompt only carries the preferences
             analysis_prompt = f"""
             You are a professional trading analyst. Analyze the market and create an investment plan.
             
@@ -39,89 +42,25 @@ class TradingAgents:
             - Preferred Markets: {preferred_markets}
             - Mode: {mode}
             
-            TASK: Create a detailed investment plan following these steps:
-            
-            1. RESEARCH PHASE:
-               - Use get_reddit_vibe tool to analyze market sentiment for "{query}"
-               - Use get_stock_data_yahoo to get historical data for potential stocks
-               - Use get_ticker_data_poly for recent price data
-            
-            2. ANALYSIS PHASE:
-               - Based on the data gathered, identify 5-10 stocks that match the user's preferences
-               - Consider risk level when selecting stocks
+            TASK: Create a detailed investment plan:
+               - Identify 5-10 stocks that match the user's preferences
+               - Consider the risk level when selecting stocks
                - Factor in the chosen strategy ({strategy})
-            
-            3. OUTPUT PHASE:
-               - Generate a JSON response with the following structure:
-               
-            {{
-                "investment_plan": {{
-                    "strategy": "{strategy}",
-                    "total_budget": {budget},
-                    "risk_level": "{risk}",
-                    "selected_stocks": [
-                        {{
-                            "symbol": "STOCK_SYMBOL",
-                            "company_name": "Company Name",
-                            "allocation_percentage": 25.0,
-                            "allocation_amount": 2500.0,
-                            "estimated_shares": 25,
-                            "current_price": 100.0,
-                            "reasoning": "Why this stock fits the strategy",
-                            "confidence_score": 8.5,
-                            "target_price": 120.0,
-                            "stop_loss": 90.0
-                        }}
-                    ],
-                    "cash_reserve_percentage": 10.0,
-                    "market_analysis": {{
-                        "sentiment": "positive/negative/neutral",
-                        "key_trends": ["trend1", "trend2"],
-                        "risk_factors": ["risk1", "risk2"]
-                    }},
-                    "execution_timeline": "immediate/1-week/1-month",
-                    "rebalance_frequency": "weekly/monthly/quarterly"
-                }}
-            }}
+               - Fill in the investment plan: selected stocks with allocations, prices, targets and
+                 stop losses, cash reserve, market analysis, execution timeline and rebalance frequency
             
             IMPORTANT: 
-            - Use the tools available to gather real market data
-            - Make tool calls to get actual stock prices and sentiment
             - Ensure allocations add up to no more than 90% (keep 10% cash)
             - Match stock selection to risk level and strategy
             - Provide specific reasoning for each stock choice
-            
-            Start by making tool calls to gather data, then generate the final JSON response.
             """
 
-            # Send the comprehensive prompt to LLM
-            response = self.llm.invoke([HumanMessage(content=analysis_prompt)])
-            
-            # Log the response for debugging
-            logging.info(f"LLM response: {response.content}")
-            
-            # Extract JSON from response if it's wrapped in markdown
-            response_content = response.content.strip()
-            if "```json" in response_content:
-                # Extract JSON from markdown code block
-                json_start = response_content.find("```json") + 7
-                json_end = response_content.find("```", json_start)
-                json_content = response_content[json_start:json_end].strip()
-            elif "```" in response_content:
-                # Extract JSON from code block
-                json_start = response_content.find("```") + 3
-                json_end = response_content.find("```", json_start)
-                json_content = response_content[json_start:json_end].strip()
-            else:
-                json_content = response_content
-            
-            try:
-                # Parse the JSON response
-                investment_plan = json.loads(json_content)
-            except json.JSONDecodeError as e:
-                logging.error(f"JSON parsing error: {e}")
-                # Fallback: create a basic plan
-                investment_plan = self._create_fallback_plan(user_prefs)
+            # Structured output bound to the plan schema; one cheap repair call if it does not validate
+            plan = invoke_structured(self.base_llm, InvestmentPlan, [HumanMessage(content=analysis_prompt)], "trading.chatbot")
+            if plan is None:
+                error_message = SystemMessage(content="❌ Analysis error: the investment plan did not match the schema")
+                return {"messages": [error_message], "investment_plan": {}, "signals": {}}
+            investment_plan = plan.as_state(**user_plan_terms(user_prefs))
 
             # Extract data for next agents
             selected_stocks = investment_plan.get("investment_plan", {}).get("selected_stocks", [])
@@ -162,83 +101,12 @@ class TradingAgents:
                 "signals": signals
             }
             
+        except UpstreamBusy:
+            raise
         except Exception as e:
             logging.error(f"Chatbot error: {str(e)}")
-            # Create fallback plan
-            fallback_plan = self._create_fallback_plan(user_prefs)
-            error_message = SystemMessage(
-                content=f"❌ Analysis error, using fallback plan: {json.dumps(fallback_plan, indent=2)}"
-            )
-            return {
-                "messages": [error_message],
-                "investment_plan": fallback_plan,
-                "signals": {}
-            }
-
-    def _create_fallback_plan(self, user_prefs):
-        """Create a basic fallback investment plan"""
-        budget = user_prefs.get("budget", 10000)
-        risk = user_prefs.get("risk", "medium")
-        strategy = user_prefs.get("strategy", "swing")
-        
-        # Default stocks based on risk level
-        if risk == "low":
-            default_stocks = [
-                {"symbol": "VOO", "name": "Vanguard S&P 500 ETF", "allocation": 30},
-                {"symbol": "VTI", "name": "Vanguard Total Stock Market ETF", "allocation": 25},
-                {"symbol": "AAPL", "name": "Apple Inc.", "allocation": 20},
-                {"symbol": "MSFT", "name": "Microsoft Corporation", "allocation": 15}
-            ]
-        elif risk == "high":
-            default_stocks = [
-                {"symbol": "TSLA", "name": "Tesla Inc.", "allocation": 25},
-                {"symbol": "NVDA", "name": "NVIDIA Corporation", "allocation": 25},
-                {"symbol": "AMD", "name": "Advanced Micro Devices", "allocation": 20},
-                {"symbol": "PLTR", "name": "Palantir Technologies", "allocation": 20}
-            ]
-        else:  # medium
-            default_stocks = [
-                {"symbol": "AAPL", "name": "Apple Inc.", "allocation": 25},
-                {"symbol": "MSFT", "name": "Microsoft Corporation", "allocation": 25},
-                {"symbol": "GOOGL", "name": "Alphabet Inc.", "allocation": 20},
-                {"symbol": "AMZN", "name": "Amazon.com Inc.", "allocation": 20}
-            ]
-        
-        selected_stocks = []
-        for stock in default_stocks:
-            allocation_amount = (budget * stock["allocation"] / 100)
-            estimated_price = 150  # Rough estimate
-            estimated_shares = int(allocation_amount / estimated_price)
-            
-            selected_stocks.append({
-                "symbol": stock["symbol"],
-                "company_name": stock["name"],
-                "allocation_percentage": stock["allocation"],
-                "allocation_amount": allocation_amount,
-                "estimated_shares": estimated_shares,
-                "current_price": estimated_price,
-                "reasoning": f"Default selection for {risk} risk {strategy} strategy",
-                "confidence_score": 7.0,
-                "target_price": estimated_price * 1.2,
-                "stop_loss": estimated_price * 0.9
-            })
-        
-        return {
-            "investment_plan": {
-                "strategy": strategy,
-                "total_budget": budget,
-                "risk_level": risk,
-                "selected_stocks": selected_stocks,
-                "cash_reserve_percentage": 10.0,
-                "market_analysis": {
-                    "sentiment": "neutral",
-                    "key_trends": ["Market uncertainty", "Tech growth"],
-                    "risk_factors": ["Market volatility", "Economic uncertainty"]
-                },
-                "execution_timeline": "immediate",
-                "rebalance_frequency": "monthly"
-            }
-        }
+            error_message = SystemMessage(content=f"❌ Analysis error: {str(e)}")
+            return {"messages": [error_message], "investment_plan": {}, "signals": {}}
 
     def portfolio_manager_agent(self, state):
         """Enhanced portfolio manager that processes the investment plan"""
@@ -345,7 +213,7 @@ class TradingAgents:
             user_prefs = state.get("user_preferences", {})
 
             # Get user email
-            user_email = user_prefs.get("user_email") or getattr(self.user_prefs, "user_email", None)
+            user_email = user_prefs.get("user_email")
             if not user_email:
                 user_email = "unknown_user@example.com"
 
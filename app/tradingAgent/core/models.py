@@ -13,4 +13,100 @@ class UserPreferences(BaseModel):
     max_drawdown: Optional[float] = Field(None, ge=0, le=100, description="Maximum acceptable portfolio drawdown")
     leverage: Optional[float] = Field(1.0, ge=1.0, description="Trading leverage multiplier")
     trade_frequency: Optional[Literal['low', 'medium', 'high']] = None
-    preferred_markets: Optional[List[Literal['stocks', 'crypto', 'forex', 'etf']]] = ["stocks"]
\ No newline at end of file
+    preferred_markets: Optional[List[Literal['stocks', 'crypto', 'forex', 'etf']]] = ["stocks"]
+
+# -------------------------------
+# STRUCTURED LLM OUTPUT
+# -------------------------------
+# Schemas bound with `with_structured_output`; shapes follow the JSON the
+# trading prompts used to ask for in free text.
+
+class SentimentAnalysis(BaseModel):
+    overall_sentiment: Literal['positive', 'negative', 'neutral'] = 'neutral'
+    sentiment_score: float = Field(0.0, description="-1.0 (bearish) to 1.0 (bullish)")
+    key_themes: List[str] = []
+    reddit_insights: str = ""
+
+
+class NewsAnalysis(BaseModel):
+    recent_developments: List[str] = []
+    market_catalysts: List[str] = []
+    risk_events: List[str] = []
+
+
+class MarketConditions(BaseModel):
+    trend_direction: Literal['bullish', 'bearish', 'sideways'] = 'sideways'
+    volatility_level: Literal['low', 'medium', 'high'] = 'medium'
+    market_phase: Literal['accumulation', 'distribution', 'trending'] = 'trending'
+
+
+class MarketResearch(BaseModel):
+    """Output of the market research node"""
+    sentiment_analysis: SentimentAnalysis = Field(default_factory=SentimentAnalysis)
+    news_analysis: NewsAnalysis = Field(default_factory=NewsAnalysis)
+    market_conditions: MarketConditions = Field(default_factory=MarketConditions)
+
+
+class SelectedStock(BaseModel):
+    symbol: str = Field(description="Real ticker symbol, e.g. AAPL")
+    company_name: str = ""
+    current_price: float = 0.0
+    allocation_percentage: float = 0.0
+    allocation_amount: float = 0.0
+    shares_to_buy: int = Field(0, description="allocation_amount / current_price, rounded down")
+    target_price: float = 0.0
+    stop_loss_price: float = 0.0
+    confidence_score: float = Field(0.0, ge=0, le=10)
+    reasoning: str = ""
+    expected_return: Optional[float] = None
+    time_horizon: Optional[str] = None
+
+    def as_plan_entry(self) -> dict:
+        """Dict with the key aliases the portfolio manager reads (estimated_shares, stop_loss)"""
+        entry = self.model_dump()
+        entry["estimated_shares"] = self.shares_to_buy
+        entry["stop_loss"] = self.stop_loss_price
+        return entry
+
+
+class RiskManagement(BaseModel):
+    cash_reserve_percentage: float = 10.0
+    max_position_size: float = 25.0
+    stop_loss_percentage: float = 10.0
+    rebalance_frequency: str = "monthly"
+
+
+class PlanMarketAnalysis(BaseModel):
+    sentiment: Literal['positive', 'negative', 'neutral'] = 'neutral'
+    key_trends: List[str] = []
+    risk_factors: List[str] = []
+
+
+class InvestmentPlan(BaseModel):
+    """Output of the investment analysis node (and TradingAgents.chatbot)"""
+    strategy: str = "swing"
+    risk_level: str = "medium"
+    total_budget: float = 0.0
+    selected_stocks: List[SelectedStock] = Field(default_factory=list, max_length=10)
+    cash_reserve_percentage: float = 10.0
+    risk_management: Optional[RiskManagement] = None
+    market_analysis: Optional[PlanMarketAnalysis] = None
+    execution_timeline: str = "immediate"
+    rebalance_frequency: str = "monthly"
+
+    def as_state(self, **extra) -> dict:
+        """`{"investment_plan": {...}}`, the shape stored in graph state; `extra` overrides fields"""
+        plan = self.model_dump(exclude_none=True)
+        plan["selected_stocks"] = [stock.as_plan_entry() for stock in self.selected_stocks]
+        plan.update(extra)
+        return {"investment_plan": plan}
+
+
+def user_plan_terms(user_prefs: dict) -> dict:
+    """Plan fields the user chose (budget, strategy, risk); they override the model's values"""
+    terms = {
+        "total_budget": user_prefs.get("budget"),
+        "strategy": user_prefs.get("strategy"),
+        "risk_level": user_prefs.get("risk"),
+    }
+    return {key: value for key, value in terms.items() if value is not None}
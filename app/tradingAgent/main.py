@@ -1,13 +1,15 @@
 from typing import Annotated
 import os
-from langchain.chat_models import init_chat_model
+import functools
 from tradingAgent.agents.agents import Workflow_tradingAgent
 from dotenv import load_dotenv 
 from pydantic import BaseModel, Field
+from langchain_core.messages import AIMessageChunk
 from typing import List, Literal, Optional
-from utills.firecrawl import FirecrawlService
+from utills.clients import registry
 from tradingAgent.core.models import UserPreferences
 import logging
+from datetime import datetime
 
 
 
@@ -18,19 +20,95 @@ logging.basicConfig(
 )
 
 
+@functools.lru_cache(maxsize=None)
+def get_trading_workflow():
+    """Compiled once per process; per-node models come from model_tiers.json"""
+    return Workflow_tradingAgent(None, registry.firecrawl()).workflow
+
+
 def trading_bot_multi_agents(user_prefs: UserPreferences):
-    load_dotenv()
-    GOOGLE_API_KEY = os.environ["GOOGLE_API_KEY"] 
-    llm = init_chat_model("google_genai:gemini-2.0-flash-exp", api_key=GOOGLE_API_KEY)
-    workflow = Workflow_tradingAgent(llm, user_prefs, FirecrawlService)
+    workflow = get_trading_workflow()
     print("Economic & Stocks Trading Agent")
     print("=" * 40)
     query = (f"Financial Query: {user_prefs.query}").strip()
     if query:
-        state = workflow.workflow.invoke({
+        state = workflow.invoke({
             "messages": [{"role": "user", "content": query}],
             "user_preferences": user_prefs.dict()
         })
         
         return state["messages"][-1].content ,state
-    return None    
\ No newline at end of file
+    return None    
+
+
+def run_and_store_trading_bot(user_prefs: UserPreferences):
+    """Run the trading workflow for a new user and store the session record in Astra"""
+    collection = registry.collection("trading_bot")
+    if collection.find_one({"user_email": user_prefs.user_email}):
+        raise ValueError("A trading bot session already exists for this email.")
+
+    model_answer, state = trading_bot_multi_agents(user_prefs)
+
+    collection.insert_one({
+    "user_email": user_prefs.user_email,
+    "response": model_answer,
+    "user_preferences": user_prefs.dict(),
+    "timestamp": datetime.utcnow().isoformat()
+    })
+    return model_answer
+
+
+def _message_text(content):
+    """Chat model content may be a string or a list of content parts"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return ""
+
+
+def trading_bot_multi_agents_stream(user_prefs: UserPreferences):
+    """
+    Run the trading workflow and yield (event, payload) pairs as it progresses:
+      - ("token", {...}) for each non-empty text delta an LLM node streams. Structured
+        nodes (invoke_structured) answer through tool-call arguments with empty text,
+        so they emit no tokens, only their "node" event.
+      - ("node", {...})  when a node completes, with its summary message and partial state
+      - ("final", {...}) once, with the final answer (same value trading_bot_multi_agents returns)
+    """
+    workflow = get_trading_workflow()
+    query = (f"Financial Query: {user_prefs.query}").strip()
+    if not query:
+        return
+
+    final_answer = None
+    for mode, chunk in workflow.stream(
+        {
+            "messages": [{"role": "user", "content": query}],
+            "user_preferences": user_prefs.dict()
+        },
+        stream_mode=["updates", "messages"]
+    ):
+        if mode == "messages":
+            message_chunk, metadata = chunk
+            # only streamed model output; messages a node writes to the state arrive as "node"
+            if not isinstance(message_chunk, AIMessageChunk):
+                continue
+            delta = _message_text(message_chunk.content)
+            if delta:
+                yield "token", {"node": metadata.get("langgraph_node"), "delta": delta}
+            continue
+
+        for node, update in chunk.items():
+            update = update or {}
+            messages = update.get("messages") or []
+            summary = _message_text(messages[-1].content) if messages else None
+            if summary is not None:
+                final_answer = summary
+            yield "node", {
+                "node": node,
+                "summary": summary,
+                "state": {key: value for key, value in update.items() if key != "messages"}
+            }
+
+    yield "final", {"response": final_answer}
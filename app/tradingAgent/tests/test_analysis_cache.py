@@ -0,0 +1,102 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from multiAgent import multiAgent
+
+
+def _until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Analyses block until released; returns the list of started runs and the release event"""
+    started, release = [], threading.Event()
+
+    def run(message, economic_term, symbol):
+        started.append(message)
+        release.wait(2)
+        return f"analysis #{len(started)}"
+
+    monkeypatch.setattr(multiAgent, "_run_analysis", run)
+    # an empty cache that stores nothing
+    monkeypatch.setattr(multiAgent.analysis_cache, "enabled", True)
+    monkeypatch.setattr(multiAgent.analysis_cache, "get", lambda key: None)
+    monkeypatch.setattr(multiAgent.analysis_cache, "set", lambda key, value: 0)
+    return started, release
+
+
+def test_bypass_does_not_join_an_analysis_in_flight(runs):
+    started, release = runs
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        normal = pool.submit(multiAgent.analyze, "NVDA outlook", "cpi", "NVDA")
+        assert _until(lambda: started)
+        fresh = pool.submit(multiAgent.analyze, "nvda  OUTLOOK", "CPI", "nvda", bypass_cache=True)
+        joined = not _until(lambda: len(started) == 2, timeout=0.5)
+        release.set()
+        assert not joined, "the bypassing request joined the run in flight"
+        assert normal.result(2)[1] == "MISS"
+        assert fresh.result(2)[1] == "BYPASS"
+    assert len(started) == 2
+
+
+def test_identical_requests_still_share_one_run(runs):
+    started, release = runs
+    followers = multiAgent._analysis_flight.stats["local_followers"]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(multiAgent.analyze, "NVDA outlook", "cpi", "NVDA") for _ in range(3)]
+        assert _until(lambda: multiAgent._analysis_flight.stats["local_followers"] >= followers + 2)
+        release.set()
+        assert {f.result(2)[0] for f in futures} == {"analysis #1"}
+    assert len(started) == 1
+
+
+def test_disabled_cache_reports_bypass(runs, monkeypatch):
+    started, release = runs
+    release.set()
+    monkeypatch.setattr(multiAgent.analysis_cache, "enabled", False)
+    assert multiAgent.analyze("NVDA outlook", "cpi", "NVDA") == ("analysis #1", "BYPASS", 0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routers.analysis import router
+
+    answers = {}
+    monkeypatch.setattr(multiAgent, "analyze", lambda query, term, symbol, bypass_cache=False:
+                        ("reply", *answers["bypass" if bypass_cache else "normal"]))
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app), answers
+
+
+def _post(client, **extra):
+    body = {"query": "NVDA outlook", "economic_term": "cpi", "symbol": "NVDA"}
+    return client.post("/chatbot/anlasisysAgent", json={**body, **extra.pop("body", {})}, **extra)
+
+
+def test_cached_replies_may_be_reused_privately(client):
+    client, answers = client
+    answers["normal"] = ("HIT", 120)
+    response = _post(client)
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.headers["Cache-Control"] == "private, max-age=120"
+
+
+def test_bypassed_and_uncached_replies_are_not_stored(client):
+    client, answers = client
+    answers["bypass"] = ("BYPASS", 0)
+    for response in (_post(client, body={"bypass_cache": True}),
+                     _post(client, headers={"Cache-Control": "no-cache"})):
+        assert response.headers["X-Cache"] == "BYPASS"
+        assert response.headers["Cache-Control"] == "no-store"
+
+    # response cache disabled
+    answers["normal"] = ("BYPASS", 0)
+    assert _post(client).headers["Cache-Control"] == "no-store"
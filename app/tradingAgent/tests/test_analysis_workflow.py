@@ -0,0 +1,53 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from multiAgent import workflow as workflow_module
+from multiAgent.workflow import Workflow
+
+
+class FakeTool:
+    def __init__(self, result):
+        self.result = result
+
+    def invoke(self, args):
+        return self.result
+
+
+class FakeFirecrawl:
+    def research(self, query, max_urls=3):
+        return {"data": [{"url": "https://example.com/nvda", "markdown": "NVDA guidance raised after record data center revenue this quarter."}]}, []
+
+
+class RecordingModel:
+    """Stands in for the Gemini chat model and keeps what it was sent"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def invoke(self, messages):
+        self.inputs.append(messages)
+        return AIMessage(content="NVDA looks strong")
+
+
+def test_branch_results_reach_the_model_in_one_leading_system_message(monkeypatch):
+    monkeypatch.setattr(workflow_module.registry, "firecrawl", lambda: FakeFirecrawl())
+    monkeypatch.setattr(workflow_module, "fetch_articles", FakeTool({"data": [{"title": "Chip demand surges"}]}))
+    monkeypatch.setattr(workflow_module, "fetch_arxives", FakeTool({"arxives": [{"title": "Pricing AI accelerators"}]}))
+    model = RecordingModel()
+
+    state = Workflow(model).workflow.invoke({
+        "messages": [HumanMessage(content="Financial Query: NVDA outlook")],
+        "query": "NVDA outlook", "economic_term": "cpi", "symbol": "NVDA",
+    })
+
+    assert state["messages"][-1].content == "NVDA looks strong"
+    sent, = model.inputs
+    assert [type(m) for m in sent] == [SystemMessage, HumanMessage]
+    context = sent[0].content
+    for fact in ("Chip demand surges", "Pricing AI accelerators", "NVDA guidance raised"):
+        assert fact in context
+    assert sent[1].content == "Financial Query: NVDA outlook"
+
+
+def test_model_input_without_branch_results_is_the_conversation():
+    workflow = Workflow.__new__(Workflow)
+    question = HumanMessage(content="Financial Query: NVDA outlook")
+    assert workflow._model_input([question]) == [question]
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from chatbot import history
+from chatbot.history import ChatHistoryStore
+from utills.clients import registry
+
+
+class FakeCollection:
+    """users_queries_history in memory; find_one can be held so writes land while it is in flight"""
+
+    def __init__(self):
+        self.docs = {}
+        self.hold = None
+
+    async def find_one(self, filter, projection=None):
+        snapshot = list(self.docs.get(filter["user_id"], []))
+        if self.hold is not None:
+            await self.hold.wait()
+        return {"queries": snapshot} if snapshot else None
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        queries = self.docs.setdefault(filter["user_id"], [])
+        queries.extend(update["$push"]["queries"]["$each"])
+        return {"queries": queries[-history.HISTORY_LIMIT:], "pushes": len(queries)}
+
+    async def update_one(self, filter, update):
+        pass
+
+
+class FakeAsyncRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeCollection()
+    monkeypatch.setattr(registry, "async_collection", lambda name: fake)
+    monkeypatch.setattr(history, "USE_REDIS", False)
+    return fake
+
+
+def _q(text):
+    return {"query": text, "timestamp": text}
+
+
+async def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+
+def test_append_during_a_cold_read_is_not_lost(collection):
+    collection.docs["u1"] = [_q("old")]
+
+    async def scenario():
+        store = ChatHistoryStore()
+        collection.hold = asyncio.Event()
+        # recent misses and awaits find_one, whose snapshot predates the append
+        reading = asyncio.create_task(store.recent("u1"))
+        await asyncio.sleep(0)
+        store.append("u1", _q("new"))
+        # the write is flushed before the stale read returns
+        await _wait_for(lambda: len(collection.docs["u1"]) == 2 and not store._pending)
+        collection.hold.set()
+        loaded = await reading
+        cached = await store.recent("u1")
+        await store.stop()
+        return loaded, cached
+
+    loaded, cached = asyncio.run(scenario())
+    assert loaded == [_q("old"), _q("new")]
+    assert cached == [_q("old"), _q("new")]
+
+
+def test_unflushed_appends_are_merged_into_a_load(collection):
+    async def scenario():
+        store = ChatHistoryStore()
+        store.append("u1", _q("a"))
+        # not flushed yet: the flushers have not run
+        loaded = await store.recent("u1")
+        await store.stop()
+        return loaded, collection.docs["u1"]
+
+    loaded, stored = asyncio.run(scenario())
+    assert loaded == [_q("a")]
+    assert stored == [_q("a")]
+
+
+def test_other_workers_appends_invalidate_the_cache_through_redis(collection, monkeypatch):
+    redis = FakeAsyncRedis()
+    monkeypatch.setattr(registry, "async_redis", lambda: redis)
+    monkeypatch.setattr(history, "USE_REDIS", True)
+
+    async def scenario():
+        this_worker, other_worker = ChatHistoryStore(), ChatHistoryStore()
+        assert await this_worker.recent("u1") == []
+        other_worker.append("u1", _q("from another worker"))
+        await other_worker.stop()
+        seen = await this_worker.recent("u1")
+
+        # our own flushed write keeps our cache valid
+        this_worker.append("u1", _q("mine"))
+        await this_worker.stop()
+        collection.docs["u1"].append(_q("unseen write"))
+        return seen, await this_worker.recent("u1")
+
+    seen, own = asyncio.run(scenario())
+    assert seen == [_q("from another worker")]
+    assert own == [_q("from another worker"), _q("mine")]
@@ -0,0 +1,72 @@
+from utills.compaction import clean_text, compact_results, estimate_tokens, extract_documents
+
+ARTICLE = """
+# NVDA earnings preview
+
+Cookie settings: accept all cookies to continue
+
+![chart](https://example.com/chart.png)
+
+Nvidia reports quarterly earnings on Wednesday, and analysts expect revenue of $43 billion, up 50% from a year ago.
+
+Data center demand for the Blackwell platform is the main driver of the guidance, according to [Reuters](https://reuters.com/nvda).
+
+Subscribe to our newsletter
+
+Markets  Sectors  About
+"""
+
+OTHER_TOPIC = "Coffee prices rose sharply this week as drought hit growers across Brazil and Vietnam alike.\n\n" * 3
+
+
+def _page(url, text, title="NVDA"):
+    return {"url": url, "title": title, "markdown": text}
+
+
+def test_clean_text_drops_images_links_and_boilerplate():
+    text = clean_text(ARTICLE)
+    assert "Nvidia reports quarterly earnings" in text
+    assert "according to Reuters" in text
+    for noise in ("Cookie", "newsletter", "chart.png", "reuters.com", "Sectors"):
+        assert noise not in text
+
+
+def test_extract_documents_walks_nested_results_and_skips_errors():
+    results = [
+        {"success": True, "data": [_page("https://a.com", "alpha text"), {"error": "blocked"}]},
+        {"error": "timed out"},
+        {"url": "https://b.com", "metadata": {"title": "B"}, "content": "beta text"},
+    ]
+    docs = extract_documents(results)
+    assert [(d["url"], d["title"], d["text"]) for d in docs] == [
+        ("https://a.com", "NVDA", "alpha text"),
+        ("https://b.com", "B", "beta text"),
+    ]
+
+
+def test_duplicate_pages_and_passages_are_kept_once():
+    compacted = compact_results("NVDA earnings revenue", [
+        _page("https://a.com", ARTICLE),
+        _page("https://a.com", ARTICLE),         # same URL
+        _page("https://b.com", ARTICLE, "Copy"),  # same passages on another site
+    ])
+    assert compacted.count("analysts expect revenue") == 1
+    assert compacted.startswith("[1] NVDA (https://a.com)")
+    assert "[2]" not in compacted
+
+
+def test_budgets_bound_the_output_and_prefer_relevant_passages():
+    pages = [_page(f"https://site{i}.com", OTHER_TOPIC + ARTICLE.replace("Wednesday", f"day {i}")) for i in range(6)]
+    compacted = compact_results("NVDA earnings revenue", pages, per_source_tokens=60, total_tokens=120)
+
+    assert estimate_tokens(compacted) <= 120 + 6 * 15  # passages plus source headers
+    assert "analysts expect revenue" in compacted
+
+
+def test_off_topic_passages_beyond_the_lead_are_dropped():
+    page = "Intro line about the markets today with 5 figures.\n\n" + "\n\n".join(
+        f"Unrelated gardening tip number {i} about tomatoes and watering schedules." for i in range(6)
+    ) + "\n\nNVDA earnings beat estimates with revenue of $43 billion."
+    compacted = compact_results("NVDA earnings", [_page("https://a.com", page)])
+    assert "NVDA earnings beat estimates" in compacted
+    assert "tip number 5" not in compacted
@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utills import tool_loop
+from tradingAgent_cronjob import workflow
+from tradingAgent_cronjob.workflow import Workflow_tradingAgent
+
+FIELDS = ("get_reddit_vibe", "get_stock_data_yahoo", "get_ticker_data_poly", "fetch_stock_price_polygon", "get_related_articles")
+
+
+class SlowTool:
+    def __init__(self, name, seconds):
+        self.name = name
+        self.seconds = seconds
+
+    def invoke(self, ticker):
+        time.sleep(self.seconds)
+        return {"tool": self.name, "ticker": ticker}
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tool-test")
+    monkeypatch.setattr(tool_loop, "_executor", pool)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_concurrent_users_queued_on_the_shared_pool_do_not_time_out(small_pool, monkeypatch):
+    for name in FIELDS:
+        monkeypatch.setattr(workflow, name, SlowTool(name, 0.1))
+    monkeypatch.setattr(workflow, "extract_symbols", lambda text: text)
+    monkeypatch.setattr(workflow, "extract_symbols_list", lambda symbols: ["AAPL", "MSFT"])
+    # each call needs 0.1s, but 4 users x 10 calls on 4 threads queue for ~1s
+    monkeypatch.setattr(workflow, "TOOL_CALL_TIMEOUT", 0.3)
+
+    node = Workflow_tradingAgent()._market_research_node
+    states = [{"user_email": f"user{i}@example.com", "plan_record": {"response": "plan"}} for i in range(4)]
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as users:
+        results = list(users.map(node, states))
+
+    assert time.monotonic() - started >= 0.9
+    for state in results:
+        research = state["data_fetched"]
+        assert [r["ticker"] for r in research] == ["AAPL", "MSFT"]
+        assert not any("error" in r for r in research)
+        assert research[0]["latest_price"] == {"tool": "fetch_stock_price_polygon", "ticker": "AAPL"}
+
+
+def test_a_call_that_runs_too_long_still_times_out(small_pool, monkeypatch):
+    for name in FIELDS:
+        monkeypatch.setattr(workflow, name, SlowTool(name, 0.01))
+    monkeypatch.setattr(workflow, "get_reddit_vibe", SlowTool("get_reddit_vibe", 1.0))
+    monkeypatch.setattr(workflow, "extract_symbols", lambda text: text)
+    monkeypatch.setattr(workflow, "extract_symbols_list", lambda symbols: ["AAPL"])
+    monkeypatch.setattr(workflow, "TOOL_CALL_TIMEOUT", 0.2)
+
+    state = Workflow_tradingAgent()._market_research_node({"user_email": "a@b.c", "plan_record": {"response": "plan"}})
+    assert state["data_fetched"] == [{"ticker": "AAPL", "error": "timed out after 0s"}]
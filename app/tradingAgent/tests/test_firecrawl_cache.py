@@ -0,0 +1,80 @@
+import json
+import time
+import zlib
+import pytest
+from utills.firecrawl_cache import FirecrawlCache, cache_key, normalize_query
+
+
+class Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FirecrawlCache(str(tmp_path / "firecrawl.sqlite"), max_bytes=1 << 20)
+
+
+def test_keys_ignore_case_and_whitespace():
+    assert normalize_query("  NVDA   Earnings ") == "nvda earnings"
+    assert cache_key("search", normalize_query("NVDA  earnings"), 5) == cache_key("search", "nvda earnings", 5)
+    assert cache_key("search", "nvda", 5) != cache_key("market", "nvda", 5)
+
+
+def test_hit_within_ttl(cache):
+    loader = Loader({"data": [1]}, {"data": [2]})
+    assert cache.fetch("search", "k", loader) == {"data": [1]}
+    assert cache.fetch("search", "k", loader) == {"data": [1]}
+    assert loader.calls == 1
+
+
+def test_expired_entries_are_reloaded(cache):
+    cache.ttls["market"] = -1
+    loader = Loader({"data": [1]}, {"data": [2]})
+    cache.fetch("market", "k", loader)
+    assert cache.fetch("market", "k", loader) == {"data": [2]}
+    assert loader.calls == 2
+
+
+def test_errors_and_empty_results_are_not_stored(cache):
+    loader = Loader({"error": "rate limited"}, None, {"data": [1]})
+    assert cache.fetch("search", "k", loader) == {"error": "rate limited"}
+    assert cache.fetch("search", "k", loader) is None
+    assert cache.fetch("search", "k", loader) == {"data": [1]}
+    assert loader.calls == 3
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(cache):
+    cache.ttls["search"] = -1
+    cache.stale = 60
+    cache.fetch("search", "k", Loader({"data": ["old"]}))
+
+    cache.ttls["search"] = 3600
+    loader = Loader({"data": ["new"]})
+    assert cache.fetch("search", "k", loader) == {"data": ["old"]}
+    deadline = time.monotonic() + 2
+    while cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert loader.calls == 1
+    assert cache.fetch("search", "k", Loader()) == {"data": ["new"]}
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes(tmp_path):
+    page = {"markdown": "x" * 2000}
+    size = len(zlib.compress(json.dumps(page).encode(), 6))
+    cache = FirecrawlCache(str(tmp_path / "firecrawl.sqlite"), max_bytes=2 * size)
+    cache.fetch("scrape", "a", Loader(page))
+    time.sleep(0.01)
+    cache.fetch("scrape", "b", Loader(page))
+    time.sleep(0.01)
+    cache.fetch("scrape", "a", Loader())   # touch a: b is now the oldest
+    time.sleep(0.01)
+    cache.fetch("scrape", "c", Loader(page))
+
+    assert cache._get("a") is not None and cache._get("c") is not None
+    assert cache._get("b") is None
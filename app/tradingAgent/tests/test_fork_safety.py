@@ -0,0 +1,78 @@
+import os
+import json
+import threading
+import pytest
+from utills import limiter, tool_loop
+from utills.clients import registry
+from utills.firecrawl_cache import FirecrawlCache
+from utills.singleflight import SingleFlight
+
+
+def _in_child(check):
+    """Fork, run `check()` in the child and return its JSON result"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            payload = {"result": check()}
+        except BaseException as e:
+            payload = {"error": repr(e)}
+        with os.fdopen(write_fd, "w") as out:
+            json.dump(payload, out)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as result:
+        payload = json.load(result)
+    os.waitpid(pid, 0)
+    assert "error" not in payload, payload.get("error")
+    return payload["result"]
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")  # fork with threads alive, on purpose
+def test_forked_child_starts_with_fresh_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("SINGLEFLIGHT_REDIS", "0")
+    parent_pid = os.getpid()
+    probe = registry._get("fork_probe", lambda: {"pid": os.getpid()})
+
+    upstream = limiter.limiter("fork-test")
+    held = upstream.acquire()
+
+    flight = SingleFlight("fork-test")
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("same-key", release.wait), daemon=True)
+    leader.start()
+    while "same-key" not in flight._calls:
+        pass
+
+    cache = FirecrawlCache(str(tmp_path / "firecrawl.sqlite"), max_bytes=1 << 20)
+    cache._refreshing.add("refreshing-key")
+    tool_loop._pool()
+
+    def check():
+        child_probe = registry._get("fork_probe", lambda: {"pid": os.getpid()})
+        return {
+            "probe_pid": child_probe["pid"],
+            "parent_probe": child_probe is probe,
+            "limiter_in_flight": limiter.limiter("fork-test").stats()["in_flight"],
+            "limiter_is_parent": limiter.limiter("fork-test") is upstream,
+            # a follower of the parent's in-flight call would block forever
+            "singleflight": flight.do("same-key", lambda: "child"),
+            "refreshing": sorted(cache._refreshing),
+            "tool_pool": tool_loop._executor is None,
+        }
+
+    try:
+        state = _in_child(check)
+    finally:
+        release.set()
+        leader.join()
+        upstream.release(0.0)
+
+    assert state["probe_pid"] != parent_pid and not state["parent_probe"]
+    assert state["limiter_in_flight"] == 0 and not state["limiter_is_parent"]
+    assert state["singleflight"] == "child"
+    assert state["refreshing"] == []
+    assert state["tool_pool"]
+    # the parent's own state is untouched
+    assert registry._get("fork_probe", lambda: None) is probe
@@ -0,0 +1,191 @@
+import pytest
+from jobs import queue
+from utills.clients import registry
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((getattr(self.redis, name), args, kwargs))
+            return self
+        return record
+
+    def execute(self):
+        return [fn(*args, **kwargs) for fn, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """The list, hash, set and sorted-set commands jobs.queue uses (decode_responses=True)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def _get(self, key, kind):
+        return self.data.setdefault(key, kind())
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    # hashes
+    def hset(self, key, field=None, value=None, mapping=None):
+        h = self._get(key, dict)
+        h.update({k: str(v) for k, v in (mapping or {field: value}).items()})
+
+    def hget(self, key, field):
+        return self._get(key, dict).get(field)
+
+    def hmget(self, key, *fields):
+        return [self._get(key, dict).get(f) for f in fields]
+
+    def hgetall(self, key):
+        return dict(self._get(key, dict))
+
+    def hincrby(self, key, field, amount=1):
+        h = self._get(key, dict)
+        h[field] = str(int(h.get(field, 0)) + amount)
+        return int(h[field])
+
+    def expire(self, key, seconds):
+        pass
+
+    # lists (index 0 = left)
+    def lpush(self, key, value):
+        self._get(key, list).insert(0, str(value))
+
+    def rpush(self, key, value):
+        self._get(key, list).append(str(value))
+
+    def llen(self, key):
+        return len(self._get(key, list))
+
+    def lrange(self, key, start, end):
+        items = self._get(key, list)
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.data[key] = self.lrange(key, start, end)
+
+    def lrem(self, key, count, value):
+        items = self._get(key, list)
+        removed = items.count(value)
+        self.data[key] = [item for item in items if item != value]
+        return removed
+
+    def blmove(self, source, destination, timeout, src="LEFT", dest="RIGHT"):
+        items = self._get(source, list)
+        if not items:
+            return None
+        value = items.pop(0 if src == "LEFT" else -1)
+        target = self._get(destination, list)
+        target.insert(0, value) if dest == "LEFT" else target.append(value)
+        return value
+
+    # sets
+    def sadd(self, key, value):
+        self._get(key, set).add(value)
+
+    def srem(self, key, value):
+        self._get(key, set).discard(value)
+
+    def scard(self, key):
+        return len(self._get(key, set))
+
+    # sorted sets
+    def zadd(self, key, mapping, nx=False, xx=False, ch=False):
+        z = self._get(key, dict)
+        changed = 0
+        for member, score in mapping.items():
+            if (nx and member in z) or (xx and member not in z):
+                continue
+            changed += z.get(member) != score
+            z[member] = score
+        return changed
+
+    def zrem(self, key, member):
+        return int(self._get(key, dict).pop(member, None) is not None)
+
+    def zrange(self, key, start, end):
+        return sorted(self._get(key, dict), key=self._get(key, dict).get)
+
+    def zrangebyscore(self, key, low, high):
+        return [m for m in self.zrange(key, 0, -1) if low <= self.data[key][m] <= high]
+
+    def zcount(self, key, low, high):
+        return len(self.zrangebyscore(key, low, high))
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(registry, "redis", lambda: fake)
+    return fake
+
+
+def _expire_leases(redis):
+    for job_id in redis.data.get(queue.LEASES_KEY, {}):
+        redis.data[queue.LEASES_KEY][job_id] = 0
+
+
+def test_job_is_held_in_the_processing_list_until_finished(redis):
+    job_id, depth = queue.enqueue_trading_job({"user_email": "a@b.c", "budget": 1000})
+    assert depth == 1
+
+    taken, payload = queue.next_job()
+    assert (taken, payload["budget"]) == (job_id, 1000)
+    assert redis.lrange(queue.PROCESSING_KEY, 0, -1) == [job_id]
+    assert queue.get_job(job_id)["status"] == "running"
+    assert queue.heartbeat(job_id)
+
+    queue.finish_job(job_id, response="plan")
+    assert redis.lrange(queue.PROCESSING_KEY, 0, -1) == []
+    assert not queue.heartbeat(job_id)
+    assert queue.get_job(job_id)["status"] == "succeeded"
+
+
+def test_expired_lease_is_requeued_to_run_next(redis):
+    crashed, _ = queue.enqueue_trading_job({"user_email": "a@b.c"})
+    waiting, _ = queue.enqueue_trading_job({"user_email": "d@e.f"})
+    queue.next_job()           # the worker dies while running it
+    _expire_leases(redis)
+
+    assert queue.recover_expired_jobs() == ([crashed], [])
+    assert queue.get_job(crashed)["status"] == "queued"
+    assert queue.queue_metrics()["totals"]["requeued"] == 1
+    assert queue.next_job()[0] == crashed
+    assert queue.next_job()[0] == waiting
+
+
+def test_live_leases_are_left_alone(redis):
+    job_id, _ = queue.enqueue_trading_job({"user_email": "a@b.c"})
+    queue.next_job()
+    assert queue.recover_expired_jobs() == ([], [])
+    assert redis.lrange(queue.PROCESSING_KEY, 0, -1) == [job_id]
+
+
+def test_job_fails_after_max_attempts(redis, monkeypatch):
+    monkeypatch.setattr(queue, "JOB_MAX_ATTEMPTS", 2)
+    job_id, _ = queue.enqueue_trading_job({"user_email": "a@b.c"})
+    for _ in range(2):
+        queue.next_job()
+        _expire_leases(redis)
+        requeued, failed = queue.recover_expired_jobs()
+
+    assert failed == [job_id]
+    job = queue.get_job(job_id)
+    assert job["status"] == "failed" and "lease expired" in job["error"]
+    assert redis.llen(queue.QUEUE_KEY) == 0
+    assert redis.lrange(queue.PROCESSING_KEY, 0, -1) == []
+
+
+def test_job_moved_without_a_lease_is_recovered_later(redis):
+    job_id, _ = queue.enqueue_trading_job({"user_email": "a@b.c"})
+    # the worker died between BLMOVE and taking its lease
+    redis.blmove(queue.QUEUE_KEY, queue.PROCESSING_KEY, 0, src="RIGHT", dest="LEFT")
+
+    assert queue.recover_expired_jobs() == ([], [])   # gets a lease first
+    _expire_leases(redis)
+    assert queue.recover_expired_jobs() == ([job_id], [])
@@ -0,0 +1,215 @@
+import time
+import asyncio
+import threading
+import pytest
+from utills.limiter import TokenBucket, UpstreamLimiter, UpstreamBusy
+
+
+def test_token_bucket_spends_the_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate=20.0, capacity=3)
+    started = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire(timeout=0)
+    assert time.monotonic() - started < 0.05
+
+    assert bucket.acquire(timeout=1)
+    # the fourth token had to be earned at 20/s
+    assert time.monotonic() - started >= 0.04
+
+
+def test_token_bucket_gives_up_at_the_timeout():
+    bucket = TokenBucket(rate=0.5, capacity=1)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.05)
+
+
+def test_limiter_admits_up_to_concurrency_and_releases_slots():
+    upstream = UpstreamLimiter("test", concurrency=2, queue=4, timeout=1.0)
+    with upstream.slot(), upstream.slot():
+        assert upstream.stats()["in_flight"] == 2
+    assert upstream.stats()["in_flight"] == 0
+    assert upstream.stats()["admitted"] == 2
+
+
+def test_limiter_rejects_with_429_when_the_queue_is_full():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=0, timeout=1.0)
+    with upstream.slot():
+        with pytest.raises(UpstreamBusy) as busy:
+            upstream.acquire()
+    assert busy.value.status_code == 429
+    assert upstream.stats()["rejected"] == 1
+
+
+def test_limiter_times_out_with_503_while_waiting_for_a_slot():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=4, timeout=0.05)
+    with upstream.slot():
+        with pytest.raises(UpstreamBusy) as busy:
+            upstream.acquire()
+    assert busy.value.status_code == 503
+    assert busy.value.retry_after >= 1
+    stats = upstream.stats()
+    assert (stats["in_flight"], stats["queued"], stats["timed_out"]) == (0, 0, 1)
+
+
+def test_queued_call_gets_the_slot_when_it_is_released():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=4, timeout=2.0)
+    started = upstream.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        with upstream.slot():
+            admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not admitted.wait(0.05)
+    assert upstream.stats()["queued"] == 1
+    upstream.release(time.monotonic() - started)
+    thread.join(2)
+    assert admitted.is_set()
+    assert upstream.stats()["in_flight"] == 0
+
+
+def test_rate_limited_upstream_returns_the_slot_when_no_token_comes():
+    upstream = UpstreamLimiter("test", concurrency=2, queue=4, timeout=0.05, rate=0.5, burst=1)
+    with upstream.slot():
+        pass
+    with pytest.raises(UpstreamBusy) as busy:
+        upstream.acquire()
+    assert busy.value.status_code == 503
+    assert upstream.stats()["in_flight"] == 0
+
+
+def test_cancelled_async_waiter_does_not_leak_its_slot():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=4, timeout=2.0)
+
+    async def scenario():
+        started = upstream.acquire()
+
+        async def use():
+            async with upstream.aslot():
+                pass
+
+        task = asyncio.create_task(use())
+        while upstream.stats()["queued"] == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert upstream.stats()["queued"] == 0
+        upstream.release(time.monotonic() - started)
+
+    asyncio.run(scenario())
+    stats = upstream.stats()
+    assert stats["admitted"] == 1
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
+
+
+def test_async_waiters_queue_without_parking_threads():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=64, timeout=2.0, rate=200.0, burst=1)
+    order = []
+
+    async def use(i):
+        async with upstream.aslot():
+            order.append(i)
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        threads = threading.active_count()
+        started = upstream.acquire()
+        tasks = [asyncio.create_task(use(i)) for i in range(40)]
+        while upstream.stats()["queued"] < 40:
+            await asyncio.sleep(0.01)
+        # forty waiters, and not one of them holds an executor thread
+        assert threading.active_count() == threads
+        upstream.release(time.monotonic() - started)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert sorted(order) == list(range(40))
+    stats = upstream.stats()
+    assert (stats["admitted"], stats["in_flight"], stats["queued"]) == (41, 0, 0)
+
+
+def test_async_waiter_gets_the_slot_a_thread_releases():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=4, timeout=2.0)
+    started = upstream.acquire()
+    threading.Timer(0.05, lambda: upstream.release(time.monotonic() - started)).start()
+
+    async def scenario():
+        async with upstream.aslot():
+            return upstream.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == 1
+    assert upstream.stats()["in_flight"] == 0
+
+
+def test_async_waiter_times_out_with_503():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=4, timeout=0.05)
+
+    async def scenario():
+        async with upstream.aslot():
+            pass
+
+    with upstream.slot():
+        with pytest.raises(UpstreamBusy) as busy:
+            asyncio.run(scenario())
+    assert busy.value.status_code == 503
+    stats = upstream.stats()
+    assert (stats["in_flight"], stats["queued"], stats["timed_out"]) == (0, 0, 1)
+
+
+def test_async_slot_fast_path_and_release():
+    upstream = UpstreamLimiter("test", concurrency=1, queue=4, timeout=1.0)
+
+    async def scenario():
+        async with upstream.aslot():
+            assert upstream.stats()["in_flight"] == 1
+
+    asyncio.run(scenario())
+    assert upstream.stats()["in_flight"] == 0
+
+
+def test_reddit_tool_holds_a_slot_per_request_only(monkeypatch):
+    from tradingAgent.core import tools
+    from utills.clients import registry
+    from utills.limiter import limiter
+    reddit_limit = limiter("reddit")
+    seen = []
+
+    class Comment:
+        body = "to the moon"
+
+        @property
+        def score(self):
+            seen.append(("processing", reddit_limit.stats()["in_flight"]))
+            return 3
+
+    class Comments(list):
+        def replace_more(self, limit):
+            seen.append(("comments", reddit_limit.stats()["in_flight"]))
+
+    class Submission:
+        title, score, url, subreddit = "AAPL", 10, "https://reddit.com/r/x", "stocks"
+
+        def __init__(self):
+            self.comments = Comments([Comment()])
+
+    def search(query, **kwargs):
+        seen.append(("search", reddit_limit.stats()["in_flight"]))
+        for _ in range(3):
+            yield Submission()
+
+    class Reddit:
+        def subreddit(self, name):
+            return type("Subreddit", (), {"search": staticmethod(search)})()
+
+    monkeypatch.setattr(registry, "reddit", lambda: Reddit())
+    monkeypatch.setattr(reddit_limit, "bucket", None)
+    docs = tools.get_reddit_vibe.invoke({"query": "AAPL"})
+
+    assert len(docs) == 3 and docs[0]["comments"] == [{"body": "to the moon", "score": 3}]
+    # the listing and each comment fetch hold one slot; building the docs holds none
+    assert [kind for kind, _ in seen if kind != "processing"] == ["search"] + ["comments"] * 3
+    assert all(in_flight == (kind != "processing") for kind, in_flight in seen)
+    assert reddit_limit.stats()["in_flight"] == 0
@@ -0,0 +1,74 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from utills import model_tiers
+from utills.llm_cache import SQLiteLLMCache, no_llm_cache
+
+
+def _model(cache, *answers):
+    return GenericFakeChatModel(messages=iter(AIMessage(content=a) for a in answers), cache=cache)
+
+
+def test_cached_model_reuses_identical_calls(tmp_path):
+    model = _model(SQLiteLLMCache(str(tmp_path / "llm.sqlite"), ttl=60, max_entries=10), "first", "second")
+
+    assert model.invoke("plan").content == "first"
+    assert model.invoke("plan").content == "first"
+    assert model.invoke("other").content == "second"
+
+
+def test_uncached_model_and_no_llm_cache_always_call(tmp_path):
+    assert _model(False, "first", "second").invoke("plan").content == "first"
+
+    model = _model(SQLiteLLMCache(str(tmp_path / "llm.sqlite"), ttl=60, max_entries=10), "first", "second")
+    model.invoke("plan")
+    with no_llm_cache():
+        assert model.invoke("plan").content == "second"
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    model = _model(SQLiteLLMCache(str(tmp_path / "llm.sqlite"), ttl=-1, max_entries=10), "first", "second")
+
+    model.invoke("plan")
+    assert model.invoke("plan").content == "second"
+
+
+def test_only_listed_nodes_are_cached(monkeypatch):
+    model_tiers.cached_nodes.cache_clear()
+    assert model_tiers.cache_enabled_for("structured.repair")
+    assert not model_tiers.cache_enabled_for("chatbot.chatbot")
+    assert not model_tiers.cache_enabled_for("analysis.chatbot")
+
+    monkeypatch.setenv("LLM_CACHE_NODES", "chatbot.chatbot")
+    model_tiers.cached_nodes.cache_clear()
+    try:
+        assert model_tiers.cache_enabled_for("chatbot.chatbot")
+        assert not model_tiers.cache_enabled_for("structured.repair")
+    finally:
+        monkeypatch.delenv("LLM_CACHE_NODES")
+        model_tiers.cached_nodes.cache_clear()
+
+
+def _value(metric, **labels):
+    return metric._values.get(metric._key(labels), 0)
+
+
+def test_cache_hits_are_not_billed_twice(tmp_path):
+    from utills.llm_callbacks import TokenUsageCallback
+    from utills.metrics import llm_tokens, llm_cost, llm_call_duration, llm_cache_hits
+
+    model_name = "fake:cached-tier-test"
+    answer = AIMessage(content="plan", usage_metadata={"input_tokens": 100, "output_tokens": 50, "total_tokens": 150})
+    model = GenericFakeChatModel(
+        messages=iter([answer, answer]),
+        cache=SQLiteLLMCache(str(tmp_path / "llm.sqlite"), ttl=60, max_entries=10),
+        callbacks=[TokenUsageCallback(model_name, "fast", (1.0, 2.0))],
+    )
+
+    model.invoke("plan")
+    model.invoke("plan")
+
+    assert _value(llm_tokens, model=model_name, type="input") == 100
+    assert _value(llm_tokens, model=model_name, type="output") == 50
+    assert _value(llm_cost, tier="fast", model=model_name) == (100 * 1.0 + 50 * 2.0) / 1_000_000
+    assert _value(llm_call_duration, tier="fast", model=model_name)[2] == 1
+    assert _value(llm_cache_hits, tier="fast", model=model_name) == 1
@@ -0,0 +1,144 @@
+import os
+import json
+from datetime import datetime
+import pytest
+from utills import market_snapshot as snapshot_module
+from utills.clients import registry
+from utills.market_snapshot import MarketSnapshot
+from utills.polygon import PolygonClient
+from utills.response_cache import MARKET_TZ
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "polygon_grouped_daily.json")
+GROUPED = "/v2/aggs/grouped/locale/us/market/stocks/"
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Polygon over HTTP: the fixture for `sessions`, an empty grouped-daily answer for other days"""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.urls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.urls.append(url)
+        if GROUPED in url and url.rsplit("/", 1)[1] in self.sessions:
+            with open(FIXTURE) as f:
+                return FakeResponse(json.load(f))
+        if GROUPED in url:
+            return FakeResponse({"status": "OK", "resultsCount": 0, "queryCount": 0})
+        return FakeResponse({"status": "OK", "results": [{"T": "IBM", "c": 280.05, "t": 1749758400000}]})
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def hset(self, key, mapping):
+        self.redis.hashes.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, seconds):
+        self.redis.ttls[key] = seconds
+
+    def execute(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        # Monday: the previous sessions are Friday 2025-06-13, then Thursday 2025-06-12
+        return datetime(2025, 6, 16, 10, 0, tzinfo=MARKET_TZ)
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    redis = FakeRedis()
+    session = FakeSession({"2025-06-13"})
+    monkeypatch.setattr(snapshot_module, "datetime", FrozenDatetime)
+    monkeypatch.setattr(registry, "polygon", lambda: PolygonClient("test-key", session, max_retries=0))
+    monkeypatch.setattr(registry, "redis", lambda: redis)
+    monkeypatch.setenv("MARKET_SNAPSHOT", "1")
+    monkeypatch.setenv("MARKET_SNAPSHOT_REDIS", "1")
+    return session, redis
+
+
+def test_grouped_daily_is_parsed_per_ticker(upstreams):
+    session, _ = upstreams
+    snapshot = MarketSnapshot()
+
+    assert snapshot.lookup("aapl")["c"] == 196.45
+    assert snapshot.lookup("MSFT")["vw"] == 474.9521
+    assert snapshot.lookup("IBM") is None
+    # bars without a ticker are dropped; one request serves every lookup
+    assert set(snapshot._bars) == {"AAPL", "MSFT", "NVDA"}
+    assert session.urls == [f"https://api.polygon.io{GROUPED}2025-06-13"]
+
+
+def test_lookback_skips_weekends_and_empty_sessions(upstreams):
+    session, _ = upstreams
+    session.sessions = {"2025-06-12"}
+
+    assert MarketSnapshot().lookup("NVDA")["c"] == 141.97
+    assert [url.rsplit("/", 1)[1] for url in session.urls] == ["2025-06-13", "2025-06-12"]
+
+
+def test_redis_hash_is_shared_between_workers(upstreams):
+    session, redis = upstreams
+    MarketSnapshot().lookup("AAPL")
+
+    key = "market:grouped:2025-06-16"
+    assert json.loads(redis.hashes[key]["AAPL"])["c"] == 196.45
+    assert redis.ttls[key] == snapshot_module.REDIS_TTL
+
+    # another worker reads the hash and makes no request of its own
+    session.urls.clear()
+    assert MarketSnapshot().lookup("MSFT")["c"] == 474.96
+    assert session.urls == []
+
+
+def test_failed_load_is_retried_after_a_pause(upstreams):
+    session, _ = upstreams
+    session.sessions = set()
+    snapshot = MarketSnapshot()
+
+    assert snapshot.lookup("AAPL") is None
+    requests_made = len(session.urls)
+    assert snapshot.lookup("AAPL") is None
+    assert len(session.urls) == requests_made
+
+
+def test_price_tool_uses_the_snapshot_and_falls_back_to_prev(upstreams, monkeypatch):
+    from tradingAgent.core import tools
+    session, _ = upstreams
+    monkeypatch.setattr(tools, "market_snapshot", MarketSnapshot())
+
+    assert tools.fetch_stock_price_polygon.invoke({"symbol": "AAPL"})["price"] == 196.45
+    assert not any("/prev" in url for url in session.urls)
+
+    assert tools.fetch_stock_price_polygon.invoke({"symbol": "IBM"})["price"] == 280.05
+    assert session.urls[-1].endswith("/v2/aggs/ticker/IBM/prev")
@@ -0,0 +1,126 @@
+import os
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from utills import ohlcv_store
+from utills.ohlcv_store import OHLCV_DTYPE, OHLCVStore, polygon_bars
+
+
+class FakeMarket:
+    """Daily bars by date; fetch(ticker, start) returns those on or after `start`"""
+
+    def __init__(self, first, days):
+        self.bars = {first + timedelta(days=i): 100.0 + i for i in range(days)}
+        self.starts = []
+
+    def fetch(self, ticker, start):
+        self.starts.append(start)
+        days = sorted(d for d in self.bars if d >= start)
+        records = np.zeros(len(days), dtype=OHLCV_DTYPE)
+        records["date"] = np.array(days, dtype="M8[D]")
+        records["close"] = [self.bars[d] for d in days]
+        records["open"] = records["high"] = records["low"] = records["close"]
+        records["volume"] = 1000.0
+        return records
+
+
+@pytest.fixture
+def market(monkeypatch):
+    market = FakeMarket(date(2025, 6, 2), 15)
+    monkeypatch.setitem(ohlcv_store.FETCHERS, "yahoo", market.fetch)
+    monkeypatch.setattr(ohlcv_store, "_last_closed_session", lambda: date(2025, 6, 10))
+    return market
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(str(tmp_path), history_days=10000, refresh_seconds=3600)
+
+
+def _dates(records):
+    return [str(d) for d in records["date"]]
+
+
+def test_first_refresh_stores_closed_sessions_only(store, market):
+    assert store.refresh("aapl") == 9
+    records = store.read("AAPL")
+    assert _dates(records)[0] == "2025-06-02" and _dates(records)[-1] == "2025-06-10"
+    assert isinstance(records, np.memmap)
+    assert os.path.getsize(store.path("AAPL", "yahoo")) == 9 * OHLCV_DTYPE.itemsize
+
+
+def test_read_slices_by_date(store, market):
+    store.refresh("AAPL")
+    assert _dates(store.read("AAPL", start="2025-06-05", end="2025-06-07")) == ["2025-06-05", "2025-06-06", "2025-06-07"]
+    assert len(store.read("AAPL", start="2025-07-01")) == 0
+    assert len(store.read("MSFT")) == 0
+
+
+def test_refresh_appends_only_the_delta(store, market, monkeypatch):
+    store.refresh("AAPL")
+    monkeypatch.setattr(ohlcv_store, "_last_closed_session", lambda: date(2025, 6, 12))
+
+    assert store.refresh("AAPL") == 0  # still fresh
+    assert store.refresh("AAPL", force=True) == 2
+    assert market.starts[-1] == date(2025, 6, 10)
+    records = store.read("AAPL")
+    assert _dates(records)[-3:] == ["2025-06-10", "2025-06-11", "2025-06-12"]
+    assert list(records["close"][-2:]) == [109.0, 110.0]
+
+
+def test_readjusted_history_is_rebuilt(store, market, monkeypatch):
+    store.refresh("AAPL")
+    # a split re-adjusts every stored close
+    market.bars = {d: close / 2 for d, close in market.bars.items()}
+    monkeypatch.setattr(ohlcv_store, "_last_closed_session", lambda: date(2025, 6, 11))
+
+    assert store.refresh("AAPL", force=True) == 10
+    records = store.read("AAPL")
+    assert len(records) == 10
+    assert records["close"][0] == 50.0 and records["close"][-1] == 54.5
+
+
+def test_history_serves_stored_data_when_the_fetch_fails(store, market, monkeypatch):
+    store.refresh("AAPL")
+
+    calls = []
+
+    def down(ticker, start):
+        calls.append(start)
+        raise ConnectionError("yahoo is down")
+
+    monkeypatch.setitem(ohlcv_store.FETCHERS, "yahoo", down)
+    store.refresh_seconds = 0
+    assert len(store.history("AAPL")) == 9
+    assert len(store.frame("AAPL")) == 9
+    assert len(calls) == 2
+
+
+def test_polygon_bars_shape(store, market):
+    store.refresh("AAPL")
+    bar = polygon_bars(store.read("AAPL", end="2025-06-02"))
+    assert bar == [{"t": 1748822400000, "o": 100.0, "h": 100.0, "l": 100.0, "c": 100.0, "v": 1000.0}]
+
+
+def test_ticker_without_bars_is_not_refetched_while_fresh(store, market):
+    market.bars = {}
+    assert store.refresh("DELISTED") == 0
+    assert store.refresh("DELISTED") == 0
+    assert len(market.starts) == 1
+    assert len(store.history("DELISTED")) == 0
+    assert len(market.starts) == 1
+
+    store.refresh_seconds = 0
+    store.refresh("DELISTED")
+    assert len(market.starts) == 2
+
+
+def test_failed_fetch_does_not_mark_the_ticker_fresh(store, market, monkeypatch):
+    def down(ticker, start):
+        raise ConnectionError("yahoo is down")
+
+    monkeypatch.setitem(ohlcv_store.FETCHERS, "yahoo", down)
+    with pytest.raises(ConnectionError):
+        store.refresh("AAPL")
+    monkeypatch.setitem(ohlcv_store.FETCHERS, "yahoo", market.fetch)
+    assert store.refresh("AAPL") == 9
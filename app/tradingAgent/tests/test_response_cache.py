@@ -0,0 +1,39 @@
+from datetime import datetime
+from utills.response_cache import MARKET_TZ, ResponseCache, market_is_open, seconds_until_next_open
+
+
+def _at(*args):
+    return datetime(*args, tzinfo=MARKET_TZ)
+
+
+def test_market_hours():
+    assert market_is_open(_at(2025, 6, 16, 9, 30))       # Monday open
+    assert market_is_open(_at(2025, 6, 16, 15, 59))
+    assert not market_is_open(_at(2025, 6, 16, 16, 0))   # close
+    assert not market_is_open(_at(2025, 6, 16, 9, 29))
+    assert not market_is_open(_at(2025, 6, 14, 12, 0))   # Saturday
+
+
+def test_seconds_until_next_open_skips_the_weekend():
+    assert seconds_until_next_open(_at(2025, 6, 16, 8, 30)) == 3600
+    assert seconds_until_next_open(_at(2025, 6, 16, 17, 30)) == 16 * 3600
+    # Friday after the close -> Monday 9:30
+    assert seconds_until_next_open(_at(2025, 6, 13, 16, 0)) == (2 * 24 + 17.5) * 3600
+
+
+def test_ttl_for_uses_the_short_ttl_only_while_the_market_is_open():
+    cache = ResponseCache("test", ttl=300, max_ttl=12 * 3600)
+
+    assert cache.ttl_for(_at(2025, 6, 16, 11, 0)) == 300
+    # overnight entries live until the open
+    assert cache.ttl_for(_at(2025, 6, 16, 23, 30)) == 10 * 3600
+    # ... capped at max_ttl over the weekend
+    assert cache.ttl_for(_at(2025, 6, 13, 18, 0)) == 12 * 3600
+    # never shorter than ttl right before the open
+    assert cache.ttl_for(_at(2025, 6, 17, 9, 29)) == 300
+
+
+def test_ttl_for_accepts_other_timezones():
+    cache = ResponseCache("test", ttl=300, max_ttl=24 * 3600)
+    # 15:00 UTC is 11:00 in New York (EDT)
+    assert cache.ttl_for(datetime.fromisoformat("2025-06-16T15:00:00+00:00")) == 300
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utills.singleflight import SingleFlight
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    monkeypatch.setenv("SINGLEFLIGHT_REDIS", "0")
+    return SingleFlight("test")
+
+
+def test_concurrent_duplicates_share_one_execution(flight):
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(2)
+        return {"answer": 42}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flight.do, "same", work) for _ in range(5)]
+        while flight.stats["local_followers"] < 4:
+            pass
+        release.set()
+        results = [f.result(2) for f in futures]
+
+    assert results == [{"answer": 42}] * 5
+    assert len(runs) == 1
+    assert flight.stats["executions"] == 1
+
+
+def test_followers_see_the_leaders_error(flight):
+    release = threading.Event()
+
+    def fail():
+        release.wait(2)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "same", fail) for _ in range(3)]
+        while flight.stats["local_followers"] < 2:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="upstream down"):
+                future.result(2)
+
+
+def test_distinct_and_sequential_calls_are_not_coalesced(flight):
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    # a finished call is not cached
+    assert flight.do("a", lambda: 3) == 3
+    assert flight.stats["executions"] == 3
+    assert flight._calls == {}
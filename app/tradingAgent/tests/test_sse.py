@@ -0,0 +1,55 @@
+import time
+import threading
+from utills.sse import sse_event, with_heartbeat
+
+
+def test_sse_event_format():
+    assert sse_event("hi") == "data: hi\n\n"
+    assert sse_event({"a": 1}, event="plan") == 'event: plan\ndata: {"a": 1}\n\n'
+    assert sse_event("two\nlines") == "data: two\ndata: lines\n\n"
+
+
+def test_heartbeat_while_the_producer_is_slow():
+    def events():
+        yield "first"
+        time.sleep(0.15)
+        yield "second"
+
+    assert list(with_heartbeat(events(), interval=0.05))[:2] == ["first", ": keep-alive\n\n"]
+
+
+def test_errors_are_reraised_in_the_response():
+    def events():
+        yield "first"
+        raise ValueError("graph failed")
+
+    stream = with_heartbeat(events(), interval=1)
+    assert next(stream) == "first"
+    try:
+        next(stream)
+    except ValueError as e:
+        assert str(e) == "graph failed"
+    else:
+        raise AssertionError("the producer's error was swallowed")
+
+
+def test_producer_stops_when_the_client_disconnects():
+    produced, closed = [], threading.Event()
+
+    def events():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                time.sleep(0.01)
+                yield f"chunk {i}"
+        finally:
+            closed.set()
+
+    stream = with_heartbeat(events(), interval=1)
+    assert next(stream) == "chunk 0"
+    stream.close()   # what the server does when the client goes away
+
+    assert closed.wait(1)
+    count = len(produced)
+    time.sleep(0.1)
+    assert len(produced) == count < 1000
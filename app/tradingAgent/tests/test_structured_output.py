@@ -0,0 +1,70 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import ValidationError
+from tradingAgent.core.models import InvestmentPlan
+from utills import structured_output
+from utills.structured_output import invoke_structured
+
+
+class FakeStructured:
+    def __init__(self, result, calls):
+        self.result = result
+        self.calls = calls
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        return self.result
+
+
+class FakeModel:
+    """Stands in for a chat model: with_structured_output returns canned results"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def with_structured_output(self, schema, include_raw=False):
+        return FakeStructured(self.result, self.calls)
+
+
+def _invalid_tool_call():
+    args = {"total_budget": "a lot", "strategy": "swing"}
+    try:
+        InvestmentPlan.model_validate(args)
+    except ValidationError as e:
+        error = e
+    raw = AIMessage(content="", tool_calls=[{"name": "InvestmentPlan", "args": args, "id": "call-1"}])
+    return {"raw": raw, "parsed": None, "parsing_error": error}
+
+
+def test_valid_output_is_returned_without_repair(monkeypatch):
+    plan = InvestmentPlan(total_budget=1000)
+    monkeypatch.setattr(structured_output.registry, "chat_model_for", lambda node: pytest_fail())
+    result = invoke_structured(FakeModel({"raw": None, "parsed": plan, "parsing_error": None}),
+                               InvestmentPlan, [HumanMessage(content="plan")], "test.ok")
+    assert result is plan
+
+
+def test_invalid_tool_call_is_repaired_from_its_args(monkeypatch):
+    repaired = InvestmentPlan(total_budget=5000)
+    repair_model = FakeModel(repaired)
+    monkeypatch.setattr(structured_output.registry, "chat_model_for", lambda node: repair_model)
+
+    result = invoke_structured(FakeModel(_invalid_tool_call()), InvestmentPlan,
+                               [HumanMessage(content="plan")], "test.repair")
+
+    assert result is repaired
+    assert len(repair_model.calls) == 1
+    repair_prompt = repair_model.calls[0][-1].content
+    assert '"total_budget": "a lot"' in repair_prompt
+    assert "Validation error" in repair_prompt
+
+
+def test_failed_repair_returns_none(monkeypatch):
+    monkeypatch.setattr(structured_output.registry, "chat_model_for", lambda node: FakeModel(None))
+    result = invoke_structured(FakeModel(_invalid_tool_call()), InvestmentPlan,
+                               [HumanMessage(content="plan")], "test.failed")
+    assert result is None
+
+
+def pytest_fail():
+    raise AssertionError("repair model must not be requested")
@@ -0,0 +1,177 @@
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from utills import tool_loop
+from utills.clients import TimeoutSession
+from utills.metrics import render
+from utills.tool_loop import build_tool_agent, execute_tool_calls, run_parallel, tool_transcript
+
+
+@tool
+def price(symbol: str) -> dict:
+    """Price of a symbol"""
+    return {"symbol": symbol, "price": 10.0}
+
+
+@tool
+def slow(seconds: float) -> str:
+    """Sleeps"""
+    time.sleep(seconds)
+    return "done"
+
+
+@tool
+def broken(symbol: str) -> str:
+    """Always fails"""
+    raise RuntimeError("upstream 500")
+
+
+TOOLS = {t.name: t for t in (price, slow, broken)}
+
+
+def _call(name, args, call_id):
+    return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
+
+
+def test_run_parallel_keeps_order_and_runs_concurrently():
+    started = time.monotonic()
+    results = run_parallel([(time.sleep, (0.2,), {}), (lambda x: x * 2, (21,), {}), (time.sleep, (0.2,), {})])
+    assert results == [None, 42, None]
+    assert time.monotonic() - started < 0.35
+
+
+def test_run_parallel_turns_failures_and_overruns_into_exceptions():
+    results = run_parallel([(int, ("x",), {}), (time.sleep, (1,), {}), (str, (1,), {})], timeout=0.1)
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], TimeoutError)
+    assert results[2] == "1"
+
+
+@pytest.fixture
+def silent_server():
+    """Accepts connections and never answers, like a stalled upstream"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    accepted = []
+    stop = threading.Event()
+
+    def serve():
+        server.settimeout(0.05)
+        while not stop.is_set():
+            try:
+                accepted.append(server.accept()[0])
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}/"
+    stop.set()
+    thread.join()
+    for conn in accepted:
+        conn.close()
+    server.close()
+
+
+def _overrunning():
+    return next(line for line in render().splitlines() if line.startswith("tool_calls_overrunning "))
+
+
+def test_timed_out_calls_are_tracked_and_free_their_worker(silent_server, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tool-test")
+    monkeypatch.setattr(tool_loop, "_executor", pool)
+    session = TimeoutSession(timeout=0.5)
+    # let calls abandoned by earlier tests return first
+    deadline = time.monotonic() + 3
+    while tool_loop._overrunning and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    def hang():
+        return session.get(silent_server)
+
+    try:
+        results = run_parallel([(hang, (), {}), (hang, (), {})], timeout=0.1)
+        assert all(isinstance(r, TimeoutError) for r in results)
+        # both workers are still stuck in the request the caller gave up on
+        assert _overrunning() == "tool_calls_overrunning 2"
+
+        started = time.monotonic()
+        assert run_parallel([(lambda x: x * 2, (21,), {})], timeout=2.0) == [42]
+        # the session timeout, not the tool-loop timeout, handed the worker back
+        assert 0.2 < time.monotonic() - started < 1.5
+        pool.shutdown(wait=True)
+        assert _overrunning() == "tool_calls_overrunning 0"
+    finally:
+        pool.shutdown(wait=True)
+
+
+def test_session_timeout_applies_unless_the_caller_passes_one(silent_server):
+    with pytest.raises(requests.Timeout):
+        TimeoutSession(timeout=0.1).get(silent_server)
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        TimeoutSession(timeout=30).get(silent_server, timeout=0.1)
+    assert time.monotonic() - started < 1
+
+
+def test_execute_tool_calls_reports_every_call():
+    messages = execute_tool_calls([
+        _call("price", {"symbol": "AAPL"}, "1"),
+        _call("missing", {}, "2"),
+        _call("broken", {"symbol": "AAPL"}, "3"),
+        _call("slow", {"seconds": 1}, "4"),
+    ], TOOLS, timeout=0.2)
+
+    assert [m.tool_call_id for m in messages] == ["1", "2", "3", "4"]
+    assert [m.status for m in messages] == ["success", "error", "error", "error"]
+    assert '"price": 10.0' in messages[0].content
+    assert messages[1].content == "Error: unknown tool missing"
+    assert "upstream 500" in messages[2].content
+    assert "timed out" in messages[3].content
+
+
+def test_large_results_are_truncated():
+    [message] = execute_tool_calls([_call("price", {"symbol": "X" * 500}, "1")], TOOLS, max_chars=100)
+    assert len(message.content) < 150
+    assert message.content.endswith("chars]")
+
+
+class ScriptedModel:
+    """Returns the scripted replies in order, then a final answer"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.seen = []
+
+    def invoke(self, messages):
+        self.seen.append(list(messages))
+        return self.replies.pop(0) if self.replies else AIMessage(content="final answer")
+
+
+def test_agent_runs_tools_until_the_model_answers():
+    model = ScriptedModel([AIMessage(content="", tool_calls=[_call("price", {"symbol": "AAPL"}, "1"),
+                                                             _call("price", {"symbol": "MSFT"}, "2")])])
+    state = build_tool_agent(model, list(TOOLS.values())).invoke({"messages": [HumanMessage(content="prices?")]})
+
+    assert state["messages"][-1].content == "final answer"
+    assert state["iterations"] == 2
+    assert sum(isinstance(m, ToolMessage) for m in model.seen[1]) == 2
+    transcript = tool_transcript(state["messages"])
+    assert '[price] {"symbol": "AAPL"' in transcript and "[analyst notes] final answer" in transcript
+
+
+def test_agent_stops_after_max_iterations():
+    looping = [AIMessage(content="", tool_calls=[_call("price", {"symbol": "AAPL"}, str(i))]) for i in range(10)]
+    model = ScriptedModel(looping)
+    state = build_tool_agent(model, list(TOOLS.values()), max_iterations=2).invoke(
+        {"messages": [HumanMessage(content="prices?")]})
+
+    assert state["iterations"] == 2
+    assert len(model.seen) == 2
+    assert state["messages"][-1].tool_calls
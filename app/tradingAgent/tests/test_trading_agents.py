@@ -0,0 +1,40 @@
+from tradingAgent.agents import tradingAgents
+from tradingAgent.agents.tradingAgents import TradingAgents
+from tradingAgent.core.models import InvestmentPlan, SelectedStock
+
+USER_PREFS = {"query": "AI stocks", "budget": 5000, "strategy": "long_term", "risk": "high", "mode": "virtual"}
+
+
+class FakeModel:
+    def bind_tools(self, tools):
+        return self
+
+
+def test_user_terms_override_the_model_plan(monkeypatch):
+    plan = InvestmentPlan(selected_stocks=[SelectedStock(symbol="NVDA", allocation_percentage=20)])
+    monkeypatch.setattr(tradingAgents, "invoke_structured", lambda *args: plan)
+
+    result = TradingAgents(FakeModel()).chatbot({"user_preferences": USER_PREFS})
+
+    stored = result["investment_plan"]["investment_plan"]
+    assert stored["total_budget"] == 5000
+    assert stored["strategy"] == "long_term"
+    assert stored["risk_level"] == "high"
+    assert list(result["signals"]) == ["NVDA"]
+
+
+def test_schema_failure_is_reported_without_fallback_plan(monkeypatch):
+    monkeypatch.setattr(tradingAgents, "invoke_structured", lambda *args: None)
+    result = TradingAgents(FakeModel()).chatbot({"user_preferences": USER_PREFS})
+    assert result["investment_plan"] == {}
+    assert "did not match the schema" in result["messages"][0].content
+
+
+def test_errors_are_reported_without_fallback_plan(monkeypatch):
+    def boom(*args):
+        raise RuntimeError("model down")
+
+    monkeypatch.setattr(tradingAgents, "invoke_structured", boom)
+    result = TradingAgents(FakeModel()).chatbot({"user_preferences": USER_PREFS})
+    assert result["investment_plan"] == {}
+    assert "model down" in result["messages"][0].content
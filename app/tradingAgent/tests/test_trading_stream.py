@@ -0,0 +1,79 @@
+from typing import Annotated
+from typing_extensions import TypedDict
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from tradingAgent import main
+from tradingAgent.core.models import InvestmentPlan, UserPreferences
+from utills.structured_output import invoke_structured
+
+PLAN_ARGS = '{"total_budget": 5000, "strategy": "long_term"}'
+
+
+class FakeToolCallingModel(BaseChatModel):
+    """Answers like Gemini's structured output: empty text, the plan in streamed tool-call args"""
+
+    @property
+    def _llm_type(self):
+        return "fake-tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _chunks(self):
+        yield AIMessageChunk(content="", tool_call_chunks=[
+            {"name": "InvestmentPlan", "args": PLAN_ARGS[:20], "id": "call-1", "index": 0}])
+        yield AIMessageChunk(content="", tool_call_chunks=[
+            {"name": None, "args": PLAN_ARGS[20:], "id": None, "index": 0}])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks():
+            yield ChatGenerationChunk(message=chunk)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = sum(self._chunks(), AIMessageChunk(content=""))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="", tool_calls=message.tool_calls))])
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+    user_preferences: dict
+    investment_plan: dict
+
+
+def _workflow():
+    def plan(state):
+        result = invoke_structured(FakeToolCallingModel(), InvestmentPlan, state["messages"], "test.plan")
+        return {"investment_plan": result.model_dump(), "messages": [AIMessage(content="Plan ready")]}
+
+    def summary(state):
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="Buy NVDA")]))
+        return {"messages": [llm.invoke(state["messages"])]}
+
+    graph = StateGraph(State)
+    graph.add_node("plan", plan)
+    graph.add_node("summary", summary)
+    graph.add_edge(START, "plan")
+    graph.add_edge("plan", "summary")
+    graph.add_edge("summary", END)
+    return graph.compile()
+
+
+def test_structured_nodes_stream_no_empty_tokens(monkeypatch):
+    monkeypatch.setattr(main, "get_trading_workflow", _workflow)
+    prefs = UserPreferences(user_email="a@b.c", query="AI stocks", budget=5000, risk="high", mode="virtual")
+
+    events = list(main.trading_bot_multi_agents_stream(prefs))
+
+    tokens = [payload for event, payload in events if event == "token"]
+    assert tokens and all(payload["delta"] for payload in tokens)
+    assert {payload["node"] for payload in tokens} == {"summary"}
+    assert "".join(payload["delta"] for payload in tokens) == "Buy NVDA"
+
+    nodes = {payload["node"]: payload for event, payload in events if event == "node"}
+    assert nodes["plan"]["summary"] == "Plan ready"
+    assert nodes["plan"]["state"]["investment_plan"]["total_budget"] == 5000
+    assert events[-1] == ("final", {"response": "Buy NVDA"})
@@ -1,88 +1,123 @@
 from typing import Annotated
 import os
-from langchain.chat_models import init_chat_model
-from astrapy import DataAPIClient
+from utills.clients import registry
 from dotenv import load_dotenv 
 from typing import List, Literal, Optional
 from .workflow import Workflow_tradingAgent
 from datetime import datetime
-import redis
 import json
 import pandas as pd
 import numpy as np
 from langgraph.pregel.io import AddableValuesDict
+from langchain_core.runnables import RunnableLambda
+import math
+import time
+import logging
+import statistics
+import functools
 
 
 load_dotenv()
 
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
-    password=os.getenv("REDIS_PASSWORD", None),
-    decode_responses=True,  
-    username=os.getenv("REDIS_USERNAME", None)  
-)
-
 def get_user_emails():
-    ASTRA_TOKEN = os.environ["ASTRA_TOKEN"]
-    ASTRA_ENDPOINT = os.environ["ASTRA_ENDPOINT"]
-
-    # Init Astra DB client
-    client = DataAPIClient(ASTRA_TOKEN)
-    db = client.get_database_by_api_endpoint(ASTRA_ENDPOINT)
     try:
         # Collection name
         TRADING_COLLECTION = "trading_bot"
-        collection = db.get_collection(TRADING_COLLECTION)
+        collection = registry.collection(TRADING_COLLECTION)
         user_emails = [doc["user_email"] for doc in collection.find({})]
         return user_emails, collection
     except Exception as e:
-        print(f"Error fetching user emails: {e}")
+        logging.error(f"Error fetching user emails: {e}")
         return []
 
 
 def set_state(user_email, state):
     key = f"user:{user_email}"
+    redis_client = registry.redis()
     redis_client.set(key, state)
     data = redis_client.get(key)
     return data
 
 def get_state(user_email):
     key = f"user:{user_email}"
-    data = redis_client.get(key)
+    data = registry.redis().get(key)
     return json.loads(data) if data else None
 
 
 
+CRONJOB_MAX_CONCURRENCY = int(os.getenv("CRONJOB_MAX_CONCURRENCY", 8))
+CRONJOB_BATCH_SIZE = int(os.getenv("CRONJOB_BATCH_SIZE", 100))
+
+
+def _store_user_result(collection, user_email, state):
+    invest_analysis = state.get("invest_analysis")
+    if invest_analysis:
+        collection.update_one(
+            {"user_email": user_email},
+            {"$set": {"invest_analysis": invest_analysis, "timestamp": datetime.utcnow().isoformat()}}
+        )
+    if state.get("data_fetched"):
+        redis_data = dict(state)
+        redis_data.pop("plan_record", None)
+        set_state(user_email, json.dumps(redis_data, default=str))
+
+
+def _log_summary(users, failures, durations, elapsed):
+    durations = sorted(durations)
+    p95 = durations[max(0, math.ceil(len(durations) * 0.95) - 1)] if durations else 0.0
+    users_per_min = users / elapsed * 60 if elapsed > 0 else 0.0
+    logging.info(f"Cronjob: {users} users in {elapsed:.1f}s ({users_per_min:.1f} users/min), "
+                 f"{failures} failed, p50 {statistics.median(durations) if durations else 0.0:.2f}s, "
+                 f"p95 {p95:.2f}s per user, max concurrency {CRONJOB_MAX_CONCURRENCY}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_cronjob_workflow():
+    """Compiled once per process and shared by every user and run; no node calls a model"""
+    return Workflow_tradingAgent().workflow
+
+
 def cronjob_trading_agents():
-    GOOGLE_API_KEY = os.environ["GOOGLE_API_KEY"] 
-    llm = init_chat_model("google_genai:gemini-2.0-flash-exp", api_key=GOOGLE_API_KEY)
-    user_emails, collection = get_user_emails()
-    for user_email in user_emails:
-        user_prefs = collection.find_one({"user_email": user_email})
-        invest_analysis = user_prefs["invest_analysis"]
-        if invest_analysis == None:    
-            workflow = Workflow_tradingAgent(llm, user_email, user_prefs)
-            print("Economic & Stocks Trading Agent")
-            query = (f"Financial Query: {user_prefs}").strip()
-            if query:
-                state = workflow.workflow.invoke({
-                    "messages": [{"role": "user", "content": query}],
-                    "user_preferences": user_prefs
-                })
-                invest_analysis = state["invest_analysis"]
-                if invest_analysis:
-                    collection.update_one(
-                        {"user_email": user_email},
-                        {"$set": {"invest_analysis": invest_analysis, "timestamp": datetime.utcnow().isoformat()}}
-                    )
-                data_fetched = state["data_fetched"]
-                print(f"Data fetched: {type(state)}")
-                print(f"Data fetched: {type(dict(state))}")
-                redis_data = dict(state)
-                redis_data_str = json.dumps(redis_data, default=str)
-                if data_fetched:
-                    res = set_state(user_email, redis_data_str)
-                get_state(user_email)    
-                #return state["messages"][-1].content, state ,res    
-    return "Cronjob executed successfully"        
\ No newline at end of file
+    """
+    Run the cronjob workflow for every user without an investment analysis yet.
+    Users run in batches of CRONJOB_BATCH_SIZE, CRONJOB_MAX_CONCURRENCY at a time;
+    a failing user is logged and skipped instead of aborting the run.
+    """
+    collection = registry.collection("trading_bot")
+    # one query for all records instead of a find_one per user
+    pending = [doc for doc in collection.find({}) if doc.get("user_email") and doc.get("invest_analysis") is None]
+    workflow = get_cronjob_workflow()
+    logging.info(f"Economic & Stocks Trading Agent: {len(pending)} users pending")
+
+    durations = []
+
+    def run_user(inputs):
+        started = time.perf_counter()
+        try:
+            return workflow.invoke(inputs)
+        finally:
+            durations.append(time.perf_counter() - started)
+
+    runner = RunnableLambda(run_user)
+    failures = 0
+    started = time.perf_counter()
+    for offset in range(0, len(pending), CRONJOB_BATCH_SIZE):
+        chunk = pending[offset:offset + CRONJOB_BATCH_SIZE]
+        inputs = [{
+            "messages": [{"role": "user", "content": f"Financial Query: {record}"}],
+            "user_email": record["user_email"],
+            "plan_record": record,
+        } for record in chunk]
+        states = runner.batch(inputs, config={"max_concurrency": CRONJOB_MAX_CONCURRENCY}, return_exceptions=True)
+        for record, state in zip(chunk, states):
+            user_email = record["user_email"]
+            try:
+                if isinstance(state, Exception):
+                    raise state
+                _store_user_result(collection, user_email, state)
+            except Exception as e:
+                failures += 1
+                logging.error(f"Cronjob failed for {user_email}: {e}")
+
+    _log_summary(len(pending), failures, durations, time.perf_counter() - started)
+    return "Cronjob executed successfully"
@@ -2,14 +2,17 @@ import requests
 from datetime import datetime, timedelta, timezone
 import json
 import os
+import logging
 from dotenv import load_dotenv 
 import yfinance as yf
 from langchain_core.tools import tool 
-import praw
-from astrapy import DataAPIClient
+from utills.clients import registry
+from utills.metrics import observed
+from utills.limiter import limit
+from utills.market_snapshot import market_snapshot
+from utills.ohlcv_store import store as ohlcv_store, polygon_bars
 import time
 import re
-import time
 from typing import Optional, Dict, List
 
 # List of stock tickers (deduplicated)
@@ -26,96 +29,73 @@ stocks = list([
 ])
 
 @tool(description="fetch stock data 200 days history using polygone.")
+@observed("polygon")
 def get_ticker_data_poly(ticker):
-    load_dotenv()
-    POLYGON_API_KEY= os.environ["POLYGON_API_KEY"]
-    # Get date range for the last 200 days
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=200)
-    
-    # Function to format date as YYYY-MM-DD
-    def format_date(date):
-        return date.strftime('%Y-%m-%d')
-    
-    url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/day/{format_date(start_date)}/{format_date(end_date)}?sort=asc&limit=200&apiKey={POLYGON_API_KEY}"
-    
+    # last 200 days from the local store; only the days it lacks are fetched from Polygon
     try:
-        response = requests.get(url)
-        response.raise_for_status()  
-        data = response.json()
-        time.sleep(1)
-        return data
-    except requests.exceptions.RequestException as error:
-        print(f'Error fetching ticker data: {error}')
-        time.sleep(1)
+        records = ohlcv_store.history(ticker, "polygon", days=200)
+    except Exception as error:
+        logging.error(f'Error fetching ticker data for {ticker}: {error}')
         return None
+    return {"ticker": ticker.upper(), "status": "OK", "adjusted": True,
+            "resultsCount": len(records), "results": polygon_bars(records)}
 
 @tool(description="fetch latest(current) stock price using polygon.")
+@observed("polygon")
 def fetch_stock_price_polygon(symbol: str):
-    load_dotenv()
-    api_key = os.getenv("POLYGON_API_KEY")
     """Fetch the latest stock price for a given symbol from Polygon.io."""
-    url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/prev?adjusted=true&apiKey={api_key}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results")
-        if not results or len(results) == 0:
-            time.sleep(1)
-            return {"error": "No price data found."}
-        latest = results[0]
+        # one grouped-daily request serves every ticker; /prev only for tickers it lacks
+        latest = market_snapshot.lookup(symbol)
+        if latest is None:
+            data = registry.polygon().previous_close(symbol)
+            results = data.get("results")
+            if not results or len(results) == 0:
+                return {"error": "No price data found."}
+            latest = results[0]
         price = latest.get("c")  # 'c' is the close price
         time_unix = latest.get("t")
         time_str = datetime.fromtimestamp(time_unix / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-        time.sleep(1)
         return {"symbol": symbol, "time": time_str, "price": price}
     except requests.exceptions.RequestException as e:
-        time.sleep(1)
         return {"error": str(e)}
 
 
 
 
 @tool(description="fetch stock data 5 years history using yfinance (yahoo).")
+@observed("yahoo")
 def get_stock_data_yahoo(ticker):
     try:
-            print(f"Fetching: {ticker}")
-            hist = yf.Ticker(ticker).history(period="5y").reset_index()
+            logging.info(f"Fetching: {ticker}")
+            # 5 years from the local store; only the days it lacks are downloaded
+            hist = ohlcv_store.frame(ticker, "yahoo", days=5 * 365)
 
             if hist.empty:
-                print(f"- {ticker}: No data found.")
+                logging.warning(f"{ticker}: No data found.")
                 return None
 
-            # Add symbol column
-            hist["Symbol"] = ticker
             return hist
 
     except Exception as e:
-        print(f"Error fetching {ticker}: {e}")
+        logging.error(f"Error fetching {ticker}: {e}")
         return None
 
 
 
 
 @tool(description="fetch reddit posts and comments related to stocks and economic terms.(query of user choice)")
+@observed("reddit")
 def get_reddit_vibe(query):
-    load_dotenv()
-    client_id = os.getenv("REDDIT_CLIENT_ID")
-    client_secret = os.getenv("REDDIT_KEY")
-    user_agent = "testscript by u/fakebot3"
-
-    reddit = praw.Reddit(    # change to -- asyncpraw
-        client_id=client_id,
-        client_secret=client_secret,
-        user_agent=user_agent,
-        username="itay601",
-    )
-    reddit.read_only = True
+    reddit = registry.reddit()
     reddit_list = []
-    for submission in reddit.subreddit("all").search(query, sort="top", time_filter="week", limit=3):
-        submission.comments.replace_more(limit=0)
-        
+    # one slot per upstream request, not for the whole tool: the listing, then each submission's comments
+    with limit("reddit"):
+        submissions = list(reddit.subreddit("all").search(query, sort="top", time_filter="week", limit=3))
+    for submission in submissions:
+        with limit("reddit"):
+            submission.comments.replace_more(limit=0)
+    
         top_comments = []
         for comment in submission.comments:
             top_comments.append(comment)
@@ -140,6 +120,7 @@ def get_reddit_vibe(query):
 
 
 @tool(description="fetch articles from all economic sources related to companies.(use it if for each company you want to get related articles)")
+@observed("articles")
 def get_related_articles(ticker):
     load_dotenv()
     url = os.getenv("URL_ARTICLES")  
@@ -149,28 +130,24 @@ def get_related_articles(ticker):
         "query": "{ articles { id source_name author title description url urlToImage content economic_terms createdAt } }"
     }
     try:
-        response = requests.post(url, headers=headers, json=payload, verify=False)
+        with limit("articles"):
+            response = registry.http_session().post(url, headers=headers, json=payload, verify=False)
         response.raise_for_status()
         data = response.json()
         return data.get("data", {}).get("articles", [])
     except Exception as e:
-        print(f"Error fetching articles: {e}")
+        logging.error(f"Error fetching articles: {e}")
         return None
 
 
 
 @tool(description="Set user portfolio from AstraDB")
+@observed("astra")
 def build_user_portfolio_from_astra(
     user_email: str,
     research_results: Dict,
 ):
-    load_dotenv()
-    ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_TOKEN")
-    ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_ENDPOINT")
-
-    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
-    database = client.get_database_by_api_endpoint(ASTRA_DB_API_ENDPOINT)
-    portfolios_collection = database.get_collection("portfolios")
+    portfolios_collection = registry.collection("portfolios", "ASTRA_TOKEN", "ASTRA_ENDPOINT")
 
     # Build update fields
     update_fields = {
@@ -246,19 +223,12 @@ def build_user_portfolio_from_astra(
         return {"error": str(e)}
 
 @tool(description="Save user portfolio to AstraDB")
+@observed("astra")
 def save_portfolio_to_astra(user_email: str, portfolio_data: dict, trade_results: dict = None):
-    load_dotenv()
-    ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_TOKEN")
-    ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_ENDPOINT")
-
-    # Initialize DataAPIClient
-    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
-    database = client.get_database_by_api_endpoint(ASTRA_DB_API_ENDPOINT)
-
     # Get collections
-    users_collection = database.get_collection("users")
-    portfolios_collection = database.get_collection("portfolios")
-    trades_collection = database.get_collection("trades")
+    users_collection = registry.collection("users", "ASTRA_TOKEN", "ASTRA_ENDPOINT")
+    portfolios_collection = registry.collection("portfolios", "ASTRA_TOKEN", "ASTRA_ENDPOINT")
+    trades_collection = registry.collection("trades", "ASTRA_TOKEN", "ASTRA_ENDPOINT")
     """Save user portfolio to AstraDB by email"""
     try:
         # First, ensure user exists
@@ -308,21 +278,16 @@ def save_portfolio_to_astra(user_email: str, portfolio_data: dict, trade_results
         }
         
     except Exception as e:
-        print(f"Error saving portfolio to AstraDB: {e}")
+        logging.error(f"Error saving portfolio to AstraDB: {e}")
         return {
             "success": False,
             "error": str(e)
         }
 
 @tool(description="Get user portfolio from AstraDB")
+@observed("astra")
 def get_user_portfolio_from_astra(user_email: str):
-    load_dotenv()
-    ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_TOKEN")
-    ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_ENDPOINT")
-
-    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
-    database = client.get_database_by_api_endpoint(ASTRA_DB_API_ENDPOINT)
-    portfolios_collection = database.get_collection("portfolios")
+    portfolios_collection = registry.collection("portfolios", "ASTRA_TOKEN", "ASTRA_ENDPOINT")
     portfolio = portfolios_collection.find_one({"user_email": user_email})
     if portfolio:
         return portfolio
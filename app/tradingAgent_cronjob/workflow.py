@@ -12,30 +12,40 @@ import json
 import datetime
 from datetime import timedelta,datetime
 from zoneinfo import ZoneInfo
+from utills.metrics import timed_node
+from utills.tool_loop import run_parallel, TOOL_CALL_TIMEOUT
 
 
 load_dotenv()
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
+    user_email: str
+    plan_record: Optional[dict]
     data_fetched: Optional[dict]
     invest_analysis: Optional[dict]
     #execution_plan : Optional[list]
     #decision_summary: Optional[dict]
     
 class Workflow_tradingAgent:
-    def __init__(self, llm, user_emails: str, initial_plan_record: Optional[dict] = None):
-        self.llm = llm.bind_tools(tools_list)
-        self.user_emails = user_emails
-        self.initial_plan_record = initial_plan_record 
+    """
+    One compiled graph serves every user: the user's email and stored plan record
+    travel in the state (`user_email`, `plan_record`), so runs can be batched.
+    """
+    def __init__(self, llm=None):
+        # both nodes are deterministic (tools + arithmetic); `llm` is optional and unused by them
+        self.llm = llm.bind_tools(tools_list) if llm is not None else None
         self.workflow = self._build_workflow()
+
+    def _user(self, state: State):
+        return state.get("user_email"), state.get("plan_record")
         
 
     def _build_workflow(self):
         """Build enhanced workflow with better structure"""
         graph = StateGraph(state_schema=State)
-        graph.add_node("market_research", self._market_research_node)
-        graph.add_node("investment_analysis", self._investment_analysis_node)        
+        graph.add_node("market_research", timed_node("trading_cronjob", "market_research", self._market_research_node))
+        graph.add_node("investment_analysis", timed_node("trading_cronjob", "investment_analysis", self._investment_analysis_node))        
         
         graph.add_edge(START,"market_research")
         graph.add_edge("market_research", "investment_analysis")
@@ -50,10 +60,11 @@ class Workflow_tradingAgent:
         Parse the provided FINAL TRADING PLAN OUTPUT, extract stock tickers,
         and collect research for those tickers using the available tools.
         """
-        if not self.initial_plan_record or "response" not in self.initial_plan_record:
+        user_email, plan_record = self._user(state)
+        if not plan_record or "response" not in plan_record:
             return None  
 
-        response_text = self.initial_plan_record["response"]
+        response_text = plan_record["response"]
         # --- Extract tickers from stock_allocations ---
         try:
             tickers_pre = extract_symbols(response_text)
@@ -62,44 +73,36 @@ class Workflow_tradingAgent:
             tickers = []
                
         # --- Collect research for each ticker using your tools ---
-        research_results = []
-        for ticker in tickers:
-            try:
-                reddit_sentiment = get_reddit_vibe.invoke(ticker)
-                yahoo_data = get_stock_data_yahoo(ticker)
-                polygon_data = get_ticker_data_poly.invoke(ticker)
-                latest_price = fetch_stock_price_polygon.invoke(ticker)
-                news_articles = get_related_articles.invoke(ticker)
-                
-                #validate = build_user_portfolio_from_astra(
-                #    self.user_emails,
-                #    ticker,
-                #    latest_price,
-                #    yahoo_data,
-                #    polygon_data,
-                #    reddit_sentiment,
-                #    news_articles,
-                #    datetime.utcnow().isoformat()
-                #)
-                #print(f"Portfolio validated: {validate}")
+        # every (ticker, tool) call runs concurrently on the tool pool, which other
+        # users of the batch share: each call gets TOOL_CALL_TIMEOUT from when it starts
+        fields = [
+            ("reddit_sentiment", get_reddit_vibe),
+            ("yahoo_data", get_stock_data_yahoo),
+            ("polygon_data", get_ticker_data_poly),
+            ("latest_price", fetch_stock_price_polygon),
+            ("articles", get_related_articles),
+        ]
+        calls = [(tool.invoke, (ticker,), {}) for ticker in tickers for _, tool in fields]
+        results = run_parallel(calls, timeout=TOOL_CALL_TIMEOUT, per_call=True)
 
+        research_results = []
+        for i, ticker in enumerate(tickers):
+            ticker_results = results[i * len(fields):(i + 1) * len(fields)]
+            errors = [r for r in ticker_results if isinstance(r, Exception)]
+            if errors:
                 research_results.append({
                     "ticker": ticker,
-                    "reddit_sentiment": reddit_sentiment,
-                    "yahoo_data": yahoo_data,
-                    "polygon_data": polygon_data,
-                    "latest_price": latest_price,
-                    "articles": news_articles,
-                })
-            except Exception as e:
-                research_results.append({
-                    "ticker": ticker,
-                    "error": str(e)
+                    "error": str(errors[0])
                 })
+                continue
+            research_results.append({
+                "ticker": ticker,
+                **{name: result for (name, _), result in zip(fields, ticker_results)}
+            })
         state["data_fetched"] = research_results
         try:
             save_result = save_research_data_to_astra.invoke({
-                "user_email": self.user_emails,
+                "user_email": user_email,
                 "research_results": state["data_fetched"]
             })
         except Exception as e:
@@ -116,14 +119,15 @@ class Workflow_tradingAgent:
         initial allocations vs. latest market data. 
         Calculates profit/loss per stock and overall portfolio performance.
         """
-        if not self.initial_plan_record or "response" not in self.initial_plan_record:
+        user_email, plan_record = self._user(state)
+        if not plan_record or "response" not in plan_record:
             return state
-        if "user_preferences" not in self.initial_plan_record:
+        if "user_preferences" not in plan_record:
             return state
             
         # Parse JSON from plan response
         try:
-            response_text = self.initial_plan_record["response"]
+            response_text = plan_record["response"]
             plan_json = re.search(r"FINAL TRADING PLAN OUTPUT:\s*(\{.*\})", response_text, re.S)
             if not plan_json:
                 return state
@@ -190,7 +194,7 @@ class Workflow_tradingAgent:
             "total_value_invested": total_value_invested,
             "total_pnl_pct": total_pnl_pct ,
             "portfolio_analysis": portfolio_analysis,
-            "budget_remaining": self.initial_plan_record["user_preferences"]["budget"] - total_invested              
+            "budget_remaining": plan_record["user_preferences"]["budget"] - total_invested              
         }
 
         state["invest_analysis"] = {
@@ -198,7 +202,7 @@ class Workflow_tradingAgent:
         }
         try:
             save_result = save_portfolio_data_to_astra.invoke({
-                "user_email": self.user_emails,
+                "user_email": user_email,
                 "portfolio_data": state.get("invest_analysis", {}),
                 "state_data": state
             })
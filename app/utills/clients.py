@@ -0,0 +1,231 @@
+import os
+import inspect
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NVIDIA_BASE_URL = "https://integrate.api.nvidia.com/v1"
+REDDIT_USER_AGENT = "testscript by u/fakebot3"
+# seconds a single upstream HTTP request may take; below TOOL_CALL_TIMEOUT so a
+# stalled request frees its tool-pool worker instead of outliving the call
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 20))
+
+
+def redis_enabled(feature: str) -> bool:
+    """Redis-backed features are on when REDIS_HOST is configured, unless `<feature>=0` (or forced with `=1`)"""
+    default = "1" if os.getenv("REDIS_HOST") else "0"
+    return os.getenv(feature, default) == "1"
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session whose requests time out after `timeout` seconds unless the caller passes one"""
+
+    def __init__(self, timeout: float = None):
+        super().__init__()
+        self.timeout = HTTP_TIMEOUT if timeout is None else timeout
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of reusable clients.
+
+    Every endpoint and tool draws its Astra, OpenAI, Firecrawl, Polygon, Reddit, Redis, HTTP
+    and chat-model clients from here instead of building new ones per call, so TLS
+    connections, auth tokens and connection pools are set up once per process.
+    Clients are created lazily on first use; `warm_up` pre-creates them at startup.
+
+    Fork-safe: clients belong to the process that created them. A forked worker
+    (gunicorn --preload, multiprocessing fork) starts with an empty registry,
+    so sockets and pools inherited from the parent are never shared.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self):
+        # the parent's clients (and possibly a held lock) are dropped, not closed:
+        # their sockets still belong to the parent
+        self._lock = threading.RLock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def _get(self, key, factory):
+        if self._pid != os.getpid():
+            # fallback for forks that bypass os.register_at_fork hooks
+            self._reset_after_fork()
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory()
+                    self._clients[key] = client
+        return client
+
+    # -------------------------------
+    # ASTRA DB
+    # -------------------------------
+    def astra_db(self, token_env="ASTRA_TOKEN", endpoint_env="ASTRA_ENDPOINT"):
+        """Astra database handle for the credentials stored in the given env vars"""
+        def build():
+            from astrapy import DataAPIClient
+            client = DataAPIClient(os.environ[token_env])
+            return client.get_database_by_api_endpoint(os.environ[endpoint_env])
+        return self._get(("astra_db", token_env, endpoint_env), build)
+
+    def collection(self, name, token_env="ASTRA_TOKEN", endpoint_env="ASTRA_ENDPOINT"):
+        return self._get(
+            ("collection", name, token_env, endpoint_env),
+            lambda: self.astra_db(token_env, endpoint_env).get_collection(name)
+        )
+
+    def async_collection(self, name, token_env="ASTRA_TOKEN", endpoint_env="ASTRA_ENDPOINT"):
+        return self._get(
+            ("async_collection", name, token_env, endpoint_env),
+            lambda: self.collection(name, token_env, endpoint_env).to_async()
+        )
+
+    # -------------------------------
+    # MODEL PROVIDERS
+    # -------------------------------
+    def chat_model(self, model: str, tier: str = "default", cache: bool = False, **kwargs):
+        """Shared init_chat_model instance per (model, tier, cache, kwargs); `cache` attaches the LLM response cache"""
+        def build():
+            from langchain.chat_models import init_chat_model
+            from utills.llm_callbacks import TokenUsageCallback
+            from utills.llm_cache import llm_cache
+            from utills.model_tiers import tier_prices
+            params = dict(kwargs)
+            if model.startswith("google_genai:"):
+                params.setdefault("api_key", os.environ["GOOGLE_API_KEY"])
+            params.setdefault("callbacks", [TokenUsageCallback(model, tier, tier_prices(tier, model))])
+            # False = never cached, whatever global cache LangChain may have
+            params["cache"] = (llm_cache() or False) if cache else False
+            return init_chat_model(model, **params)
+        return self._get(("chat_model", model, tier, cache, tuple(sorted(kwargs.items()))), build)
+
+    def chat_model_for(self, node: str):
+        """Chat model of the tier model_tiers.json assigns to `graph.node` (cached if the node is listed)"""
+        from utills.model_tiers import tier_for, cache_enabled_for
+        tier, spec = tier_for(node)
+        return self.chat_model(spec["model"], tier=tier, cache=cache_enabled_for(node), **spec.get("params", {}))
+
+    def nvidia_openai(self):
+        def build():
+            from openai import OpenAI
+            return OpenAI(base_url=NVIDIA_BASE_URL, api_key=os.environ["NVIDIA_MODEL_KEY"])
+        return self._get("nvidia_openai", build)
+
+    # -------------------------------
+    # DATA SOURCES
+    # -------------------------------
+    def firecrawl(self):
+        def build():
+            from utills.firecrawl import FirecrawlService
+            return FirecrawlService()
+        return self._get("firecrawl", build)
+
+    def polygon(self):
+        def build():
+            from utills.polygon import PolygonClient
+            return PolygonClient(os.environ["POLYGON_API_KEY"], self.http_session())
+        return self._get("polygon", build)
+
+    def reddit(self):
+        def build():
+            import praw
+            reddit = praw.Reddit(    # change to -- asyncpraw
+                client_id=os.getenv("REDDIT_CLIENT_ID"),
+                client_secret=os.getenv("REDDIT_KEY"),
+                user_agent=REDDIT_USER_AGENT,
+                username="itay601",
+                timeout=HTTP_TIMEOUT,
+            )
+            reddit.read_only = True
+            return reddit
+        return self._get("reddit", build)
+
+    def redis(self):
+        def build():
+            import redis
+            return redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                password=os.getenv("REDIS_PASSWORD", None),
+                decode_responses=True,
+                username=os.getenv("REDIS_USERNAME", None)
+            )
+        return self._get("redis", build)
+
+    def async_redis(self):
+        """redis.asyncio client for code on the event loop (same settings as `redis`)"""
+        def build():
+            import redis.asyncio
+            return redis.asyncio.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                password=os.getenv("REDIS_PASSWORD", None),
+                decode_responses=True,
+                username=os.getenv("REDIS_USERNAME", None)
+            )
+        return self._get("async_redis", build)
+
+    def http_session(self):
+        """Keep-alive requests session with a connection pool sized for threaded use; requests time out after HTTP_TIMEOUT"""
+        def build():
+            pool_size = int(os.getenv("HTTP_POOL_SIZE", 32))
+            session = TimeoutSession()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            return session
+        return self._get("http_session", build)
+
+    # -------------------------------
+    # LIFECYCLE
+    # -------------------------------
+    def warm_up(self):
+        """Create the clients whose credentials are configured, so first requests skip the setup"""
+        builders = [
+            ("http_session", self.http_session, []),
+            ("astra", lambda: self.collection("users_queries_history"), ["ASTRA_TOKEN", "ASTRA_ENDPOINT"]),
+            ("nvidia", self.nvidia_openai, ["NVIDIA_MODEL_KEY"]),
+            ("firecrawl", self.firecrawl, ["FIRECRAWL_API_KEY"]),
+            ("polygon", self.polygon, ["POLYGON_API_KEY"]),
+            ("reddit", self.reddit, ["REDDIT_CLIENT_ID", "REDDIT_KEY"]),
+        ]
+        for name, build, required_env in builders:
+            if not all(os.getenv(var) for var in required_env):
+                continue
+            try:
+                build()
+            except Exception as e:
+                logging.warning(f"Could not warm up {name} client: {e}")
+
+    def close(self):
+        """Close every client that owns a connection pool"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close) and not inspect.iscoroutinefunction(close):
+                try:
+                    close()
+                except Exception as e:
+                    logging.warning(f"Error closing client {type(client).__name__}: {e}")
+
+
+registry = ClientRegistry()
+os.register_at_fork(after_in_child=registry._reset_after_fork)
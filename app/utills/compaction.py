@@ -0,0 +1,210 @@
+"""
+Token-budgeted compaction of Firecrawl search/scrape results before they enter `messages`.
+
+Pages are cleaned (images, link targets, HTML, cookie/newsletter/nav boilerplate),
+split into passages, deduplicated across pages (exact and near-duplicate), ranked
+by relevance to the query and cut to a per-source and a total token budget:
+
+  FIRECRAWL_SOURCE_TOKENS   per page/source (default 600)
+  FIRECRAWL_CONTEXT_TOKENS  for everything together (default 2500)
+
+Token counts are estimated at ~4 characters per token, which is close enough for
+Gemini prompts and needs no tokenizer.
+"""
+import os
+import re
+import math
+import logging
+
+CHARS_PER_TOKEN = 4
+PASSAGE_TOKENS = 120
+NEAR_DUPLICATE = 0.8
+LEAD_PASSAGES = 2
+
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_URL = re.compile(r"https?://\S+")
+_HTML = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_WORD = re.compile(r"[a-z0-9$%.]+")
+_BOILERPLATE = re.compile(
+    r"cookie|subscribe|newsletter|sign in|sign up|log in|all rights reserved|privacy policy|"
+    r"terms of (use|service)|advertisement|skip to (main )?content|share this|follow us|"
+    r"accept all|back to top|javascript",
+    re.IGNORECASE
+)
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are", "at",
+    "by", "from", "as", "it", "this", "that", "be", "what", "how", "about", "market", "financial",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _terms(text: str):
+    return [w.strip(".") for w in _WORD.findall(text.lower()) if w.strip(".") and w.strip(".") not in _STOPWORDS]
+
+
+# -------------------------------
+# EXTRACT + CLEAN
+# -------------------------------
+def extract_documents(results):
+    """Flatten serialized Firecrawl results (dicts, lists, nested `data`) into {url, title, text} docs"""
+    docs = []
+
+    def walk(item):
+        if isinstance(item, list):
+            for sub in item:
+                walk(sub)
+        elif isinstance(item, dict):
+            if item.get("error"):
+                return
+            metadata = item.get("metadata") or {}
+            text = item.get("markdown") or item.get("content") or item.get("description") or ""
+            if text:
+                docs.append({
+                    "url": item.get("url") or metadata.get("sourceURL") or metadata.get("url") or "",
+                    "title": item.get("title") or metadata.get("title") or "",
+                    "text": text,
+                })
+            walk(item.get("data") or [])
+
+    walk(results)
+    return docs
+
+
+def clean_text(text: str) -> str:
+    text = _IMAGE.sub("", text)
+    text = _LINK.sub(r"\1", text)
+    text = _URL.sub("", text)
+    text = _HTML.sub(" ", text)
+    lines = []
+    for line in text.splitlines():
+        line = _SPACES.sub(" ", line).strip(" #>*-|=_")
+        if not line:
+            lines.append("")
+            continue
+        words = line.split()
+        # short menu/footer lines and consent banners
+        if _BOILERPLATE.search(line) and len(words) < 25:
+            continue
+        if len(words) < 4 and not any(ch.isdigit() for ch in line):
+            continue
+        lines.append(line)
+    return re.sub(r"\n{2,}", "\n\n", "\n".join(lines)).strip()
+
+
+def split_passages(text: str, max_tokens: int = PASSAGE_TOKENS):
+    """One passage per paragraph; long paragraphs are cut at sentence ends"""
+    passages = []
+    for paragraph in text.split("\n\n"):
+        current = " ".join(paragraph.split())
+        while estimate_tokens(current) > max_tokens:
+            cut = current.rfind(". ", 0, max_tokens * CHARS_PER_TOKEN)
+            cut = cut + 1 if cut > 0 else max_tokens * CHARS_PER_TOKEN
+            passages.append(current[:cut].strip())
+            current = current[cut:].strip()
+        if current:
+            passages.append(current)
+    return passages
+
+
+# -------------------------------
+# DEDUPE + RANK
+# -------------------------------
+def _shingles(text: str, size: int = 5):
+    words = _terms(text)
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _similar(a: set, b: set) -> bool:
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= NEAR_DUPLICATE
+
+
+def _score(passage: str, query_terms: set, position: int) -> float:
+    terms = _terms(passage)
+    if not terms:
+        return 0.0
+    hits = sum(1 for t in terms if t in query_terms)
+    coverage = len(query_terms & set(terms)) / max(1, len(query_terms))
+    numbers = sum(1 for t in terms if any(ch.isdigit() for ch in t))
+    # query coverage first, then term density; figures and early passages break ties
+    return coverage * 2 + hits / len(terms) + min(numbers, 5) * 0.02 - position * 0.01
+
+
+# -------------------------------
+# COMPACT
+# -------------------------------
+def compact_results(query: str, results, per_source_tokens: int = None, total_tokens: int = None) -> str:
+    """Compact Firecrawl results into a ranked, deduplicated, token-bounded context block"""
+    per_source_tokens = per_source_tokens or int(os.getenv("FIRECRAWL_SOURCE_TOKENS", 600))
+    total_tokens = total_tokens or int(os.getenv("FIRECRAWL_CONTEXT_TOKENS", 2500))
+    query_terms = set(_terms(query))
+
+    sources, seen_urls, seen_hashes, kept_shingles = [], set(), set(), []
+    raw_chars = 0
+    for doc in extract_documents(results):
+        raw_chars += len(doc["text"])
+        if doc["url"] and doc["url"] in seen_urls:
+            continue
+        seen_urls.add(doc["url"])
+
+        candidates = []
+        for position, passage in enumerate(split_passages(clean_text(doc["text"]))):
+            key = " ".join(_terms(passage))
+            if not key or key in seen_hashes:
+                continue
+            shingles = _shingles(passage)
+            if any(_similar(shingles, other) for other in kept_shingles):
+                continue
+            seen_hashes.add(key)
+            kept_shingles.append(shingles)
+            # off-topic passages only survive as a page's lead paragraphs
+            if query_terms and position >= LEAD_PASSAGES and not query_terms & set(key.split()):
+                continue
+            candidates.append((_score(passage, query_terms, position), position, passage))
+
+        # best passages of this source within its own budget
+        chosen, used = [], 0
+        for score, position, passage in sorted(candidates, reverse=True):
+            cost = estimate_tokens(passage)
+            if used + cost > per_source_tokens:
+                continue
+            chosen.append((score, position, passage))
+            used += cost
+        if chosen:
+            sources.append({"doc": doc, "passages": chosen})
+
+    # then the best passages overall within the total budget
+    ranked = sorted(
+        ((score, i, position, passage) for i, src in enumerate(sources) for score, position, passage in src["passages"]),
+        reverse=True
+    )
+    selected, used = set(), 0
+    for score, i, position, passage in ranked:
+        cost = estimate_tokens(passage)
+        if used + cost > total_tokens:
+            continue
+        selected.add((i, position))
+        used += cost
+
+    blocks = []
+    for i, src in enumerate(sources):
+        passages = [p for s, position, p in sorted(src["passages"], key=lambda x: x[1]) if (i, position) in selected]
+        if not passages:
+            continue
+        header = f"[{len(blocks) + 1}] {src['doc']['title'] or src['doc']['url']}"
+        if src["doc"]["url"] and src["doc"]["title"]:
+            header += f" ({src['doc']['url']})"
+        blocks.append(header + "\n" + "\n".join(passages))
+
+    compacted = "\n\n".join(blocks)
+    logging.info(
+        f"Compacted Firecrawl results for '{query}': ~{math.ceil(raw_chars / CHARS_PER_TOKEN)} -> "
+        f"~{estimate_tokens(compacted)} tokens from {len(blocks)} sources"
+    )
+    return compacted
@@ -1,22 +1,37 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from firecrawl import FirecrawlApp, ScrapeOptions
 from dotenv import load_dotenv
 import json
+from utills.limiter import limit
+from utills.metrics import observed
+from utills.firecrawl_cache import build_firecrawl_cache, cache_key, normalize_query
 
 load_dotenv()
 
+# batch calls (`gather`): how many run at once and how long each may take
+FIRECRAWL_MAX_CONCURRENCY = int(os.getenv("FIRECRAWL_MAX_CONCURRENCY", 4))
+FIRECRAWL_CALL_TIMEOUT = float(os.getenv("FIRECRAWL_CALL_TIMEOUT", 30))
+
+SCRAPE_OPTIONS = {
+    "include_tags": ["main", "article", "section", "div"],
+    "exclude_tags": ["nav", "footer", "header", "aside", "advertisement"],
+}
+
 class FirecrawlService:
     def __init__(self):
         api_key = os.getenv("FIRECRAWL_API_KEY")
         if not api_key:
             raise ValueError("Missing FIRECRAWL_API_KEY environment variable")
         self.app = FirecrawlApp(api_key=api_key)
+        self.cache = build_firecrawl_cache()
 
     def _serialize_result(self, result):
         """Convert firecrawl results to JSON-serializable format"""
         if not result:
             return None
-        
+
         try:
             # If result is a dict, extract the relevant data
             if isinstance(result, dict):
@@ -39,66 +54,125 @@ class FirecrawlService:
             print(f"⚠️ Error serializing result: {e}")
             return {'error': str(e)}
 
+    # -------------------------------
+    # SINGLE CALLS
+    # -------------------------------
+    def _cached(self, source: str, key: str, loader):
+        return loader() if self.cache is None else self.cache.fetch(source, key, loader)
+
+    def _search(self, query: str, num_results: int, source: str = "search"):
+        def load():
+            try:
+                with limit("firecrawl"):
+                    result = self.app.search(
+                        query=query,
+                        limit=num_results,
+                        scrape_options=ScrapeOptions(
+                            formats=["markdown"]
+                        )
+                    )
+                return self._serialize_result(result)
+            except Exception as e:
+                print(f"⚠️ Error searching '{query}': {e}")
+                return {'error': str(e)}
+
+        return self._cached(source, cache_key(source, normalize_query(query), num_results), load)
+
+    def _scrape(self, url: str):
+        def load():
+            try:
+                with limit("firecrawl"):
+                    result = self.app.scrape_url(
+                        url,
+                        formats=["markdown"],
+                        scrape_options=ScrapeOptions(**SCRAPE_OPTIONS)
+                    )
+                return self._serialize_result(result)
+            except Exception as e:
+                print(f"⚠️ Error scraping {url}: {e}")
+                return {'error': str(e)}
+
+        return self._cached("scrape", cache_key("scrape", url.strip(), ["markdown"], SCRAPE_OPTIONS), load)
+
+    @observed("firecrawl")
     def search_financial_services(self, query: str, num_results: int = 5):
         """Search for financial services, tools, and market data providers"""
-        try:
-            financial_query = f"{query} financial market data API trading platform"
-            result = self.app.search(
-                query=financial_query,
-                limit=num_results,
-                scrape_options=ScrapeOptions(
-                    formats=["markdown"]
-                )
-            )
-            return self._serialize_result(result)
-        except Exception as e:
-            print(f"⚠️ Error searching financial services: {e}")
-            return {'error': str(e)}
+        return self._search(f"{query} financial market data API trading platform", num_results)
 
+    @observed("firecrawl")
     def scrape_financial_website(self, url: str):
         """Scrape financial websites for detailed information"""
-        try:
-            result = self.app.scrape_url(
-                url,
-                formats=["markdown"],
-                scrape_options=ScrapeOptions(
-                    include_tags=["main", "article", "section", "div"],
-                    exclude_tags=["nav", "footer", "header", "aside", "advertisement"]
-                )
-            )
-            return self._serialize_result(result)
-        except Exception as e:
-            print(f"⚠️ Error scraping {url}: {e}")
-            return {'error': str(e)}
+        return self._scrape(url)
 
+    @observed("firecrawl")
     def search_market_data(self, query: str):
         """Search for specific market data about a stock symbol or financial instrument"""
-        try:
-            query2 = f"{query} price analysis financial data"
-            result = self.app.search(
-                query=query2,
-                limit=3,
-                scrape_options=ScrapeOptions(
-                    formats=["markdown"]
-                )
-            )
-            return self._serialize_result(result)
-        except Exception as e:
-            print(f"⚠️ Error searching market data for {query}: {e}")
-            return {'error': str(e)}
+        return self._search(f"{query} price analysis financial data", 3, source="market")
 
+    @observed("firecrawl")
     def scrape_economic_data(self, indicator: str):
         """Search for economic indicators and data"""
+        return self._search(f"{indicator} economic data statistics government source", 2, source="economic")
+
+    # -------------------------------
+    # BATCH CALLS
+    # -------------------------------
+    def gather(self, calls, max_concurrency: int = None, timeout: float = None):
+        """
+        Run `calls` - a list of (method name, kwargs), e.g.
+        ("scrape_financial_website", {"url": url}) - at most `max_concurrency` at a time.
+        Returns one result per call, in order; a call that failed or ran longer than
+        `timeout` seconds yields {'error': ...}, so the other results are still usable.
+        """
+        if not calls:
+            return []
+        max_concurrency = max_concurrency or FIRECRAWL_MAX_CONCURRENCY
+        timeout = timeout or FIRECRAWL_CALL_TIMEOUT
+        started = {}
+
+        def run(i, name, kwargs):
+            started[i] = time.monotonic()
+            return getattr(self, name)(**kwargs)
+
+        results = [None] * len(calls)
+        pool = ThreadPoolExecutor(max_workers=min(max_concurrency, len(calls)), thread_name_prefix="firecrawl")
         try:
-            query = f"{indicator} economic data statistics government source"
-            result = self.app.search(
-                query=query,
-                limit=2,
-                scrape_options=ScrapeOptions(
-                    formats=["markdown"]
-                )
-            )
-            return self._serialize_result(result)
-        except Exception as e:
-            print(f"⚠️ Error searching economic data for {indicator}: {e}")
-            return {'error': str(e)}
\ No newline at end of file
+            futures = {pool.submit(run, i, name, kwargs): i for i, (name, kwargs) in enumerate(calls)}
+            pending = set(futures)
+            while pending:
+                # wake up for the next completion or the earliest deadline of a running call
+                deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+                wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else timeout
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        results[futures[future]] = {'error': str(e)}
+                now = time.monotonic()
+                for future in [f for f in pending if futures[f] in started and started[futures[f]] + timeout <= now]:
+                    name = calls[futures[future]][0]
+                    print(f"⚠️ Firecrawl {name} timed out after {timeout:.0f}s")
+                    results[futures[future]] = {'error': f"timed out after {timeout:.0f}s"}
+                    pending.discard(future)
+        finally:
+            # abandoned calls finish in the background; queued ones are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def research(self, query: str, max_urls: int = 3):
+        """
+        The searches for `query` concurrently, then the top `max_urls` result pages
+        concurrently. Returns (search_results, [scraped pages, market data, economic data]).
+        """
+        search_results, market_data, economic_data = self.gather([
+            ("search_financial_services", {"query": query}),
+            ("search_market_data", {"query": query}),
+            ("scrape_economic_data", {"indicator": query}),
+        ])
+        urls = []
+        if search_results and isinstance(search_results, dict) and search_results.get('data'):
+            urls = [item['url'] for item in search_results['data'][:max_urls] if isinstance(item, dict) and item.get('url')]
+        scraped = self.gather([("scrape_financial_website", {"url": url}) for url in urls])
+        firecrawl_data = [data for data in scraped + [market_data, economic_data] if data]
+        return search_results, firecrawl_data
@@ -0,0 +1,187 @@
+"""
+Disk cache for Firecrawl scrapes and searches, shared by every worker on the host.
+
+Scrapes are keyed by URL + scrape options, searches by normalized query + limit.
+Values are stored zlib-compressed in SQLite (FIRECRAWL_CACHE_PATH) and expire per
+source (env overrides in brackets, seconds):
+
+  scrape    pages                  [FIRECRAWL_CACHE_TTL_SCRAPE, default 24h]
+  search    financial services     [FIRECRAWL_CACHE_TTL_SEARCH, default 6h]
+  market    market data searches   [FIRECRAWL_CACHE_TTL_MARKET, default 15min]
+  economic  economic data searches [FIRECRAWL_CACHE_TTL_ECONOMIC, default 6h]
+
+Least recently used entries are evicted beyond FIRECRAWL_CACHE_MAX_MB of compressed
+data. With FIRECRAWL_CACHE_STALE > 0 an expired entry is still served for that many
+seconds while one background call refreshes it. FIRECRAWL_CACHE=off disables it.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utills.metrics import counter
+
+SOURCE_TTLS = {
+    "scrape": 24 * 3600,
+    "search": 6 * 3600,
+    "market": 15 * 60,
+    "economic": 6 * 3600,
+}
+
+firecrawl_cache_lookups = counter(
+    "firecrawl_cache_lookups_total", "Firecrawl cache lookups by source and result (hit, stale, miss, error)",
+    ("source", "result"))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def cache_key(source: str, *parts) -> str:
+    return hashlib.sha256(json.dumps([source, *parts], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _cacheable(value) -> bool:
+    return bool(value) and not (isinstance(value, dict) and value.get("error"))
+
+
+class FirecrawlCache:
+    """SQLite store; a connection per call keeps it thread- and fork-safe"""
+
+    def __init__(self, path: str, max_bytes: int, stale: float = 0.0, ttls: dict = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stale = stale
+        self.ttls = ttls or dict(SOURCE_TTLS)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS firecrawl_cache ("
+                "key TEXT PRIMARY KEY, source TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS firecrawl_cache_accessed ON firecrawl_cache (accessed_at)")
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # refresh threads of the parent do not exist in a forked child
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    # -------------------------------
+    # STORE
+    # -------------------------------
+    def _get(self, key):
+        """(value, expires_at) or None; entries past their stale window are deleted"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM firecrawl_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] + self.stale < now:
+                conn.execute("DELETE FROM firecrawl_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE firecrawl_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def _set(self, source, key, value):
+        now = time.time()
+        blob = zlib.compress(json.dumps(value, default=str).encode(), 6)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO firecrawl_cache (key, source, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, source, blob, len(blob), now + self.ttls.get(source, SOURCE_TTLS["search"]), now)
+            )
+            conn.execute("DELETE FROM firecrawl_cache WHERE expires_at + ? < ?", (self.stale, now))
+            # least recently used first, until the rest fits in max_bytes
+            conn.execute(
+                "DELETE FROM firecrawl_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS total FROM firecrawl_cache) "
+                "WHERE total > ?)",
+                (self.max_bytes,)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM firecrawl_cache")
+
+    # -------------------------------
+    # LOOKUP
+    # -------------------------------
+    def fetch(self, source: str, key: str, loader):
+        """Cached value for `key`, else `loader()` (stored unless it is empty or an error)"""
+        try:
+            cached = self._get(key)
+        except Exception as e:
+            logging.warning(f"Firecrawl cache lookup failed: {e}")
+            firecrawl_cache_lookups.inc(source=source, result="error")
+            return loader()
+
+        if cached is not None:
+            value, expires_at = cached
+            if expires_at >= time.time():
+                firecrawl_cache_lookups.inc(source=source, result="hit")
+                return value
+            firecrawl_cache_lookups.inc(source=source, result="stale")
+            self._revalidate(source, key, loader)
+            return value
+
+        firecrawl_cache_lookups.inc(source=source, result="miss")
+        value = loader()
+        self._store(source, key, value)
+        return value
+
+    def _store(self, source, key, value):
+        if not _cacheable(value):
+            return
+        try:
+            self._set(source, key, value)
+        except Exception as e:
+            logging.warning(f"Firecrawl cache store failed: {e}")
+
+    def _revalidate(self, source, key, loader):
+        # one background refresh per key at a time
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="firecrawl-refresh")
+
+        def refresh():
+            try:
+                self._store(source, key, loader())
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(refresh)
+
+
+def build_firecrawl_cache():
+    """The configured cache, or None when FIRECRAWL_CACHE=off or it cannot be opened"""
+    if os.getenv("FIRECRAWL_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    ttls = {source: float(os.getenv(f"FIRECRAWL_CACHE_TTL_{source.upper()}", ttl)) for source, ttl in SOURCE_TTLS.items()}
+    try:
+        return FirecrawlCache(
+            os.getenv("FIRECRAWL_CACHE_PATH", ".firecrawl_cache.sqlite"),
+            max_bytes=int(float(os.getenv("FIRECRAWL_CACHE_MAX_MB", 200)) * 1024 * 1024),
+            stale=float(os.getenv("FIRECRAWL_CACHE_STALE", 0)),
+            ttls=ttls,
+        )
+    except Exception as e:
+        logging.warning(f"Firecrawl cache disabled: {e}")
+        return None
@@ -0,0 +1,275 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from utills.metrics import register_collector
+
+# Defaults per upstream; each value can be overridden with
+# UPSTREAM_<NAME>_CONCURRENCY / _QUEUE / _TIMEOUT / _RATE / _BURST env vars.
+# `rate` is requests per second (None = no token bucket).
+UPSTREAM_DEFAULTS = {
+    "gemini":    {"concurrency": 8, "queue": 64, "timeout": 30.0, "rate": None, "burst": None},
+    "nvidia":    {"concurrency": 4, "queue": 32, "timeout": 30.0, "rate": None, "burst": None},
+    "firecrawl": {"concurrency": 4, "queue": 32, "timeout": 60.0, "rate": None, "burst": None},
+    "polygon":   {"concurrency": 4, "queue": 128, "timeout": 60.0, "rate": 5.0, "burst": 10},  # set to the API plan
+    "reddit":    {"concurrency": 2, "queue": 32, "timeout": 30.0, "rate": 1.0, "burst": 5},
+}
+FALLBACK_DEFAULTS = {"concurrency": 4, "queue": 32, "timeout": 30.0, "rate": None, "burst": None}
+# seconds between checks of an async waiter for a free slot
+ASYNC_POLL_MIN = 0.005
+ASYNC_POLL_MAX = 0.05
+
+
+class UpstreamBusy(Exception):
+    """
+    Raised when an upstream cannot admit more work: 429 when its wait queue is
+    full, 503 when a queued call timed out waiting for a slot.
+    """
+
+    def __init__(self, upstream: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{upstream} is busy: {reason}")
+        self.upstream = upstream
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self) -> float:
+        """Take a token if one is banked (0.0), else the seconds until the next one"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Take one token, sleeping until one is available; False if `timeout` elapses first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, timeout: float = None) -> bool:
+        """`acquire` for the event loop: waits with asyncio.sleep instead of blocking a thread"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class UpstreamLimiter:
+    """Concurrency semaphore + bounded wait queue (+ optional token bucket) for one upstream"""
+
+    def __init__(self, name, concurrency, queue, timeout, rate=None, burst=None):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._avg_hold = 1.0  # EWMA of seconds a slot is held, used for Retry-After
+        self._cond = threading.Condition()
+
+    def _retry_after(self):
+        backlog = (self.queued + 1) / max(1, self.concurrency)
+        return max(1, math.ceil(self._avg_hold * backlog))
+
+    def _try_acquire_now(self):
+        """Non-blocking fast path; must hold the condition"""
+        if self.in_flight < self.concurrency and self.queued == 0:
+            self.in_flight += 1
+            return True
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamBusy(self.name, 429, self._retry_after(), "wait queue is full")
+        return False
+
+    def _wait_for_slot(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if self._try_acquire_now():
+                return
+            self.queued += 1
+            try:
+                while self.in_flight >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise UpstreamBusy(self.name, 503, self._retry_after(), "timed out waiting for a slot")
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.queued -= 1
+
+    async def _await_slot(self):
+        # async waiters cannot block on the condition, so they queue the same way and
+        # poll for a free slot, backing off up to ASYNC_POLL_MAX between checks
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if self._try_acquire_now():
+                return
+            self.queued += 1
+        try:
+            delay = ASYNC_POLL_MIN
+            while True:
+                with self._cond:
+                    if self.in_flight < self.concurrency:
+                        self.in_flight += 1
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise UpstreamBusy(self.name, 503, self._retry_after(), "timed out waiting for a slot")
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, ASYNC_POLL_MAX)
+        finally:
+            with self._cond:
+                self.queued -= 1
+
+    def _admitted(self, got_token: bool):
+        if not got_token:
+            self.release(0.0)
+            with self._cond:
+                self.timed_out += 1
+            raise UpstreamBusy(self.name, 503, self._retry_after(), "rate limit exceeded")
+        with self._cond:
+            self.admitted += 1
+        return time.monotonic()
+
+    def acquire(self):
+        self._wait_for_slot()
+        return self._admitted(not self.bucket or self.bucket.acquire(timeout=self.timeout))
+
+    async def aacquire(self):
+        """`acquire` without a thread: waits for the slot and token on the event loop"""
+        await self._await_slot()
+        try:
+            got_token = not self.bucket or await self.bucket.aacquire(timeout=self.timeout)
+        except BaseException:
+            # cancelled while waiting for a token
+            self.release(0.0)
+            raise
+        return self._admitted(got_token)
+
+    def release(self, held: float):
+        with self._cond:
+            self.in_flight -= 1
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        started = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def aslot(self):
+        started = await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # limits are per worker process: a forked worker starts with fresh counters and locks
+    global _limiters_lock
+    _limiters_lock = threading.Lock()
+    _limiters.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _setting(name, key, default):
+    value = os.getenv(f"UPSTREAM_{name.upper()}_{key.upper()}")
+    if value is None:
+        return default
+    return int(value) if key in ("concurrency", "queue") else float(value)
+
+
+def limiter(name: str) -> UpstreamLimiter:
+    """Shared limiter for an upstream, created from UPSTREAM_DEFAULTS / env on first use"""
+    if name not in _limiters:
+        with _limiters_lock:
+            if name not in _limiters:
+                defaults = UPSTREAM_DEFAULTS.get(name, FALLBACK_DEFAULTS)
+                settings = {key: _setting(name, key, value) for key, value in defaults.items()}
+                _limiters[name] = UpstreamLimiter(name, **settings)
+    return _limiters[name]
+
+
+def limit(name: str):
+    """`with limit("gemini"): ...` - hold one admission slot for the upstream"""
+    return limiter(name).slot()
+
+
+def alimit(name: str):
+    """`async with alimit("gemini"): ...` - async variant of `limit`"""
+    return limiter(name).aslot()
+
+
+def upstream_stats():
+    """In-flight and queued counts (plus totals) for every upstream seen so far"""
+    for name in UPSTREAM_DEFAULTS:
+        limiter(name)
+    return {name: lim.stats() for name, lim in sorted(_limiters.items())}
+
+
+@register_collector
+def _collect_upstreams():
+    stats = upstream_stats()
+    families = []
+    for field, kind in (("in_flight", "gauge"), ("queued", "gauge"), ("admitted", "counter"),
+                        ("rejected", "counter"), ("timed_out", "counter")):
+        name = f"upstream_{field}" + ("_total" if kind == "counter" else "")
+        samples = [({"upstream": upstream}, values[field]) for upstream, values in stats.items()]
+        families.append((name, kind, f"Upstream admission control: {field.replace('_', ' ')}", samples))
+    return families
@@ -0,0 +1,195 @@
+"""
+Exact-match response cache for the chat models of deterministic/structured nodes.
+
+Only nodes listed under `cached_nodes` in model_tiers.json (or LLM_CACHE_NODES)
+get a model with this cache attached (`init_chat_model(..., cache=...)`); every
+other model, e.g. the conversational chatbot, is never cached. LangChain keys the
+cache on the serialized messages plus the model's `llm_string` (model name, params
+and bound tools), so only byte-identical invocations hit. Backends:
+
+  LLM_CACHE=redis    shared by all workers (default when REDIS_HOST is set)
+  LLM_CACHE=sqlite   local file at LLM_CACHE_PATH (default otherwise)
+  LLM_CACHE=off
+
+Entries expire after LLM_CACHE_TTL seconds and the least recently used are
+evicted beyond LLM_CACHE_MAX_ENTRIES. Calls that must not be reused even on a
+cached model run with `timed_node(..., cache=False)` or `with no_llm_cache():`.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from utills.clients import registry, redis_enabled
+from utills.metrics import counter
+from utills.llm_callbacks import CACHE_HIT_KEY
+
+_cache_enabled = ContextVar("llm_cache_enabled", default=True)
+
+llm_cache_lookups = counter(
+    "llm_cache_lookups_total", "LLM response cache lookups by backend and result", ("backend", "result"))
+
+
+@contextmanager
+def no_llm_cache():
+    """Bypass the LLM cache (no lookup, no store) for calls made inside the block"""
+    token = _cache_enabled.set(False)
+    try:
+        yield
+    finally:
+        _cache_enabled.reset(token)
+
+
+def _key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\n{prompt}".encode()).hexdigest()
+
+
+class _LLMCache(BaseCache):
+    backend = None
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def lookup(self, prompt, llm_string):
+        if not _cache_enabled.get():
+            llm_cache_lookups.inc(backend=self.backend, result="skipped")
+            return None
+        try:
+            value = self._get(_key(prompt, llm_string))
+        except Exception as e:
+            logging.warning(f"LLM cache lookup failed ({self.backend}): {e}")
+            llm_cache_lookups.inc(backend=self.backend, result="error")
+            return None
+        llm_cache_lookups.inc(backend=self.backend, result="hit" if value is not None else "miss")
+        if value is None:
+            return None
+        generations = loads(value)
+        for generation in generations:
+            # cached generations still carry the original usage_metadata; TokenUsageCallback skips them
+            generation.generation_info = {**(generation.generation_info or {}), CACHE_HIT_KEY: True}
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        if not _cache_enabled.get():
+            return
+        try:
+            self._set(_key(prompt, llm_string), dumps(return_val))
+        except Exception as e:
+            logging.warning(f"LLM cache store failed ({self.backend}): {e}")
+
+
+class SQLiteLLMCache(_LLMCache):
+    """Single-file cache; a connection per call keeps it thread- and fork-safe"""
+    backend = "sqlite"
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now)
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self, **kwargs):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+
+class RedisLLMCache(_LLMCache):
+    """Shared across workers; a sorted set of access times drives LRU eviction"""
+    backend = "redis"
+    PREFIX = "llmcache:"
+    LRU_KEY = "llmcache:lru"
+
+    def _get(self, key):
+        r = registry.redis()
+        value = r.get(self.PREFIX + key)
+        if value is not None:
+            r.zadd(self.LRU_KEY, {key: time.time()})
+        return value
+
+    def _set(self, key, value):
+        r = registry.redis()
+        pipe = r.pipeline()
+        pipe.set(self.PREFIX + key, value, ex=int(self.ttl))
+        pipe.zadd(self.LRU_KEY, {key: time.time()})
+        pipe.execute()
+        evicted = r.zrange(self.LRU_KEY, 0, -self.max_entries - 1)
+        if evicted:
+            pipe = r.pipeline()
+            pipe.delete(*(self.PREFIX + k for k in evicted))
+            pipe.zrem(self.LRU_KEY, *evicted)
+            pipe.execute()
+
+    def clear(self, **kwargs):
+        r = registry.redis()
+        keys = r.zrange(self.LRU_KEY, 0, -1)
+        if keys:
+            r.delete(*(self.PREFIX + k for k in keys))
+        r.delete(self.LRU_KEY)
+
+
+_cache = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def llm_cache():
+    """The configured backend (built once per process), or None when LLM_CACHE=off or it failed"""
+    global _cache, _configured
+    if _configured:
+        return _cache
+    with _configure_lock:
+        if _configured:
+            return _cache
+        backend = os.getenv("LLM_CACHE") or ("redis" if redis_enabled("LLM_CACHE_REDIS") else "sqlite")
+        ttl = float(os.getenv("LLM_CACHE_TTL", 3600))
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+        try:
+            if backend == "redis":
+                _cache = RedisLLMCache(ttl, max_entries)
+            elif backend == "sqlite":
+                _cache = SQLiteLLMCache(os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite"), ttl, max_entries)
+        except Exception as e:
+            logging.warning(f"LLM cache disabled, could not set up {backend} backend: {e}")
+        logging.info(f"LLM cache backend: {_cache.backend if _cache else 'off'}")
+        _configured = True
+        return _cache
@@ -0,0 +1,55 @@
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from utills.metrics import llm_tokens, llm_call_duration, llm_cost, llm_cache_hits
+
+CACHE_HIT_KEY = "llm_cache_hit"  # set by utills.llm_cache on generations it serves
+
+
+def _cache_hit(response) -> bool:
+    return any((generation.generation_info or {}).get(CACHE_HIT_KEY)
+               for generations in response.generations for generation in generations)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Count input/output tokens of every chat-model call into llm_tokens_total, and
+    record per-tier call latency and estimated cost (when the tier has prices).
+    Answers served from the LLM cache only count in llm_cache_hits_total: their
+    tokens were billed (and their latency measured) when they were first generated.
+    """
+
+    def __init__(self, model: str, tier: str = "default", prices=None):
+        self.model = model
+        self.tier = tier
+        self.prices = prices
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        started = self._started.pop(run_id, None)
+        if _cache_hit(response):
+            llm_cache_hits.inc(tier=self.tier, model=self.model)
+            return
+        if started is not None:
+            llm_call_duration.observe(time.perf_counter() - started, tier=self.tier, model=self.model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens = usage.get("input_tokens") or 0
+                output_tokens = usage.get("output_tokens") or 0
+                if input_tokens:
+                    llm_tokens.inc(input_tokens, model=self.model, type="input")
+                if output_tokens:
+                    llm_tokens.inc(output_tokens, model=self.model, type="output")
+                if self.prices and (input_tokens or output_tokens):
+                    input_price, output_price = self.prices
+                    cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+                    llm_cost.inc(cost, tier=self.tier, model=self.model)
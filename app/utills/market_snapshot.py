@@ -0,0 +1,106 @@
+"""
+Previous-day bars for the whole US stock market, from one Polygon grouped-daily
+request (/v2/aggs/grouped/locale/us/market/stocks/{date}) per trading day.
+
+`fetch_stock_price_polygon` looks tickers up here instead of calling
+/v2/aggs/ticker/{symbol}/prev once per ticker per user. The table lives in
+process memory and, when Redis is configured, in the hash `market:grouped:<date>`
+so every worker (and the cronjob) shares the single daily request.
+
+  MARKET_SNAPSHOT=0        per-ticker requests only
+  MARKET_SNAPSHOT_REDIS=0  keep the table per process
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from utills.clients import registry, redis_enabled
+from utills.response_cache import MARKET_TZ
+
+MAX_LOOKBACK_DAYS = 7          # weekends + holidays before the last session
+RETRY_AFTER_FAILURE = 300      # seconds before a failed load is attempted again
+REDIS_TTL = 36 * 3600
+
+
+class MarketSnapshot:
+    """Ticker -> previous-session bar (Polygon aggregate fields: o, h, l, c, v, vw, t)"""
+
+    def __init__(self):
+        self.enabled = os.getenv("MARKET_SNAPSHOT", "1") == "1"
+        self.use_redis = redis_enabled("MARKET_SNAPSHOT_REDIS")
+        self._bars = {}
+        self._as_of = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # the table itself is fine to inherit; a lock held by a parent thread is not
+        self._lock = threading.Lock()
+
+    def _redis_key(self, today) -> str:
+        return f"market:grouped:{today.isoformat()}"
+
+    def _fetch(self, today) -> dict:
+        """Bars of the last session before `today`"""
+        client = registry.polygon()
+        day = today
+        for _ in range(MAX_LOOKBACK_DAYS):
+            day -= timedelta(days=1)
+            if day.weekday() >= 5:
+                continue
+            data = client.grouped_daily(day.isoformat())
+            results = data.get("results") or []
+            if results:
+                logging.info(f"Market snapshot: {len(results)} tickers for {day.isoformat()}")
+                return {bar["T"]: bar for bar in results if bar.get("T")}
+        return {}
+
+    def _load(self, today) -> dict:
+        if self.use_redis:
+            try:
+                cached = registry.redis().hgetall(self._redis_key(today))
+                if cached:
+                    return {ticker: json.loads(bar) for ticker, bar in cached.items()}
+            except Exception as e:
+                logging.warning(f"Market snapshot: Redis read failed: {e}")
+
+        bars = self._fetch(today)
+        if bars and self.use_redis:
+            try:
+                pipe = registry.redis().pipeline()
+                pipe.hset(self._redis_key(today), mapping={ticker: json.dumps(bar) for ticker, bar in bars.items()})
+                pipe.expire(self._redis_key(today), REDIS_TTL)
+                pipe.execute()
+            except Exception as e:
+                logging.warning(f"Market snapshot: Redis write failed: {e}")
+        return bars
+
+    def _ensure_loaded(self):
+        today = datetime.now(MARKET_TZ).date()
+        if self._as_of == today or time.monotonic() < self._retry_at:
+            return
+        with self._lock:
+            if self._as_of == today or time.monotonic() < self._retry_at:
+                return
+            try:
+                bars = self._load(today)
+            except Exception as e:
+                logging.warning(f"Market snapshot unavailable, using per-ticker requests: {e}")
+                bars = {}
+            if bars:
+                self._bars, self._as_of = bars, today
+            else:
+                self._retry_at = time.monotonic() + RETRY_AFTER_FAILURE
+
+    def lookup(self, ticker: str):
+        """Previous-session bar for `ticker`, or None when it is not in the snapshot"""
+        if not self.enabled:
+            return None
+        self._ensure_loaded()
+        return self._bars.get(ticker.upper())
+
+
+market_snapshot = MarketSnapshot()
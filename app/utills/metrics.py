@@ -0,0 +1,240 @@
+"""
+In-process metrics exported in the Prometheus text format (GET /metrics).
+
+Nothing here needs a collector or network access: values live in this process
+and are rendered on demand. Use `timed_node` for LangGraph nodes, `observed`
+for tool/upstream calls, and `register_collector` to export values that other
+modules already keep (limiter stats, cache counters, ...).
+"""
+import time
+import asyncio
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                labels = dict(zip(self.labelnames, key))
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+_metrics = []
+_collectors = []
+
+
+def counter(name, help_text, labelnames=()):
+    metric = Counter(name, help_text, labelnames)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, help_text, labelnames, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(fn):
+    """
+    `fn()` returns a list of (name, kind, help, [(labels_dict, value), ...]) that is
+    rendered on every scrape; used to export state other modules already track.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            lines.append(f"# collector {getattr(collect, '__name__', collect)} failed: {_escape(e)}")
+            continue
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------
+# METRICS
+# -------------------------------
+http_request_duration = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+graph_node_duration = histogram(
+    "graph_node_duration_seconds", "LangGraph node execution time", ("graph", "node"))
+graph_node_errors = counter(
+    "graph_node_errors_total", "LangGraph node executions that raised", ("graph", "node"))
+tool_call_duration = histogram(
+    "tool_call_duration_seconds", "Tool / upstream call latency", ("tool", "call"))
+tool_call_errors = counter(
+    "tool_call_errors_total", "Tool / upstream calls that raised or returned an error", ("tool", "call"))
+llm_tokens = counter(
+    "llm_tokens_total", "LLM tokens reported by the provider", ("model", "type"))
+llm_call_duration = histogram(
+    "llm_call_duration_seconds", "Chat-model call latency by model tier", ("tier", "model"))
+llm_cost = counter(
+    "llm_cost_usd_total", "Estimated chat-model spend from tier list prices", ("tier", "model"))
+llm_cache_hits = counter(
+    "llm_cache_hits_total", "Chat-model calls answered from the LLM cache (no tokens billed)", ("tier", "model"))
+
+
+# -------------------------------
+# HELPERS
+# -------------------------------
+def timed_node(graph: str, node: str, fn, cache: bool = True):
+    """
+    Wrap a LangGraph node (function, coroutine function or Runnable) to record its duration.
+    `cache=False` runs the node with the LLM response cache disabled (non-deterministic steps).
+    """
+    if hasattr(fn, "invoke") and not inspect.isroutine(fn):
+        runnable = fn
+        fn = lambda state: runnable.invoke(state)
+
+    if not cache:
+        from utills.llm_cache import no_llm_cache
+        uncached = fn
+        if asyncio.iscoroutinefunction(uncached):
+            @functools.wraps(uncached)
+            async def fn(state):
+                with no_llm_cache():
+                    return await uncached(state)
+        else:
+            @functools.wraps(uncached)
+            def fn(state):
+                with no_llm_cache():
+                    return uncached(state)
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            start = time.perf_counter()
+            try:
+                return await fn(state)
+            except Exception:
+                graph_node_errors.inc(graph=graph, node=node)
+                raise
+            finally:
+                graph_node_duration.observe(time.perf_counter() - start, graph=graph, node=node)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        start = time.perf_counter()
+        try:
+            return fn(state)
+        except Exception:
+            graph_node_errors.inc(graph=graph, node=node)
+            raise
+        finally:
+            graph_node_duration.observe(time.perf_counter() - start, graph=graph, node=node)
+    return wrapper
+
+
+def _is_error_result(result) -> bool:
+    # tools in this repo report failures as {"error": ...} or {"success": False}
+    return isinstance(result, dict) and ("error" in result or result.get("success") is False)
+
+
+@contextmanager
+def track_call(tool: str, call: str = ""):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        tool_call_errors.inc(tool=tool, call=call)
+        raise
+    finally:
+        tool_call_duration.observe(time.perf_counter() - start, tool=tool, call=call)
+
+
+def observed(tool: str):
+    """Decorator recording latency and errors of a tool/upstream function (place it under @tool)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track_call(tool, fn.__name__):
+                result = fn(*args, **kwargs)
+            if _is_error_result(result):
+                tool_call_errors.inc(tool=tool, call=fn.__name__)
+            return result
+        return wrapper
+    return decorator
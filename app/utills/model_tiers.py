@@ -0,0 +1,73 @@
+"""
+Node -> model tier mapping, loaded from model_tiers.json (or MODEL_TIERS_PATH).
+
+    registry.chat_model_for("trading.market_research")   # model of that node's tier
+
+Env overrides, no code changes needed:
+  MODEL_TIER_FAST=google_genai:gemini-2.0-flash     model of a tier
+  NODE_TIERS=trading.market_research=strong,...     tier of a node
+  LLM_CACHE_NODES=trading.market_research,...       nodes whose model uses the LLM cache
+Nodes that are not listed use the `default` tier. A tier may also set `params`
+(init_chat_model kwargs such as temperature). Only `cached_nodes` get the LLM
+response cache (utills/llm_cache.py); everything else is never cached.
+"""
+import os
+import json
+import functools
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_tiers.json")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_config():
+    with open(os.getenv("MODEL_TIERS_PATH", DEFAULT_PATH)) as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=None)
+def load_tiers():
+    config = _load_config()
+    config = {**config, "tiers": {tier: dict(spec) for tier, spec in config["tiers"].items()}}
+    tiers = config["tiers"]
+    for tier, spec in tiers.items():
+        override = os.getenv(f"MODEL_TIER_{tier.upper()}")
+        if override:
+            # list prices no longer apply to a different model
+            tiers[tier] = {"model": override}
+    nodes = dict(config.get("nodes", {}))
+    for item in os.getenv("NODE_TIERS", "").split(","):
+        if "=" in item:
+            node, tier = item.split("=", 1)
+            nodes[node.strip()] = tier.strip()
+    unknown = {tier for tier in nodes.values() if tier not in tiers}
+    if unknown or "default" not in tiers:
+        raise ValueError(f"model tiers config must define 'default' and every tier used by nodes, missing: {unknown}")
+    return tiers, nodes
+
+
+def tier_for(node: str):
+    """(tier name, tier spec) for a `graph.node` name"""
+    tiers, nodes = load_tiers()
+    tier = nodes.get(node, "default")
+    return tier, tiers[tier]
+
+
+def tier_prices(tier: str, model: str):
+    """(input, output) USD per 1M tokens if `model` is the tier's priced model, else None"""
+    spec = load_tiers()[0].get(tier)
+    if not spec or spec.get("model") != model or "input_per_mtok" not in spec:
+        return None
+    return spec["input_per_mtok"], spec.get("output_per_mtok", 0.0)
+
+
+@functools.lru_cache(maxsize=None)
+def cached_nodes():
+    override = os.getenv("LLM_CACHE_NODES")
+    if override is not None:
+        return frozenset(node.strip() for node in override.split(",") if node.strip())
+    return frozenset(_load_config().get("cached_nodes", []))
+
+
+def cache_enabled_for(node: str) -> bool:
+    """Whether the node's model gets the LLM response cache (deterministic/structured nodes only)"""
+    return node in cached_nodes()
@@ -0,0 +1,253 @@
+"""
+Local daily OHLCV store for the yahoo and polygon tools.
+
+One append-only file of fixed-size records per (source, ticker) under
+OHLCV_STORE_DIR, read back through np.memmap: a date-range query is a
+searchsorted + slice of the mapped file, so no bytes are copied until a caller
+converts the view. A refresh fetches only the days after the last stored one
+(OHLCV_HISTORY_DAYS of history the first time); when the re-fetched last day no
+longer matches the stored bar (split/dividend re-adjustment) the file is
+rebuilt. Tickers refreshed less than OHLCV_REFRESH_SECONDS ago are not fetched;
+the time of the last refresh is the mtime of a `.refreshed` marker next to the
+data file, so tickers without any bars are not refetched on every call either.
+
+    python -m utills.ohlcv_store                      # refresh the `stocks` universe from yahoo
+    python -m utills.ohlcv_store --source polygon --tickers AAPL,MSFT
+
+Run from app/.
+"""
+import os
+import time
+import fcntl
+import logging
+import argparse
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from utills.response_cache import MARKET_TZ, MARKET_CLOSE
+from utills.limiter import limit
+from utills.clients import HTTP_TIMEOUT
+
+OHLCV_STORE_DIR = os.getenv("OHLCV_STORE_DIR", ".ohlcv")
+OHLCV_HISTORY_DAYS = int(os.getenv("OHLCV_HISTORY_DAYS", 5 * 365))
+OHLCV_REFRESH_SECONDS = float(os.getenv("OHLCV_REFRESH_SECONDS", 3600))
+
+OHLCV_DTYPE = np.dtype([
+    ("date", "<M8[D]"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+SOURCES = ("yahoo", "polygon")
+
+
+def _last_closed_session():
+    """Latest date whose daily bar is final (today only after the close)"""
+    now = datetime.now(MARKET_TZ)
+    return now.date() if now.time() >= MARKET_CLOSE else now.date() - timedelta(days=1)
+
+
+# -------------------------------
+# FETCH
+# -------------------------------
+def _fetch_yahoo(ticker: str, start) -> np.ndarray:
+    import yfinance as yf
+    with limit("yahoo"):
+        hist = yf.Ticker(ticker).history(start=start.isoformat(), auto_adjust=True, timeout=HTTP_TIMEOUT)
+    records = np.zeros(len(hist), dtype=OHLCV_DTYPE)
+    if len(hist):
+        records["date"] = hist.index.tz_localize(None).normalize().values.astype("M8[D]")
+        for field in ("open", "high", "low", "close", "volume"):
+            records[field] = hist[field.capitalize()].to_numpy(dtype="f8")
+    return records
+
+
+def _fetch_polygon(ticker: str, start) -> np.ndarray:
+    from utills.clients import registry
+    data = registry.polygon().daily_bars(ticker, start.isoformat(), datetime.now(MARKET_TZ).date().isoformat(), limit=50000)
+    bars = data.get("results") or []
+    records = np.zeros(len(bars), dtype=OHLCV_DTYPE)
+    if bars:
+        records["date"] = np.array([bar["t"] for bar in bars], dtype="M8[ms]").astype("M8[D]")
+        for field, key in (("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"), ("volume", "v")):
+            records[field] = [bar.get(key, np.nan) for bar in bars]
+    return records
+
+
+FETCHERS = {"yahoo": _fetch_yahoo, "polygon": _fetch_polygon}
+
+
+# -------------------------------
+# STORE
+# -------------------------------
+class OHLCVStore:
+    def __init__(self, root: str = OHLCV_STORE_DIR, history_days: int = OHLCV_HISTORY_DAYS,
+                 refresh_seconds: float = OHLCV_REFRESH_SECONDS):
+        self.root = root
+        self.history_days = history_days
+        self.refresh_seconds = refresh_seconds
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, ticker: str, source: str) -> str:
+        return os.path.join(self.root, source, f"{ticker.upper()}.ohlcv")
+
+    def _marker(self, path) -> str:
+        return f"{path}.refreshed"
+
+    def _lock(self, path):
+        with self._locks_lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def read(self, ticker: str, source: str = "yahoo", start=None, end=None) -> np.ndarray:
+        """Records with start <= date <= end, as a read-only view of the mapped file"""
+        path = self.path(ticker, source)
+        if not os.path.exists(path) or os.path.getsize(path) < OHLCV_DTYPE.itemsize:
+            return np.zeros(0, dtype=OHLCV_DTYPE)
+        records = np.memmap(path, dtype=OHLCV_DTYPE, mode="r", shape=(os.path.getsize(path) // OHLCV_DTYPE.itemsize,))
+        lo = 0 if start is None else np.searchsorted(records["date"], np.datetime64(start, "D"), side="left")
+        hi = len(records) if end is None else np.searchsorted(records["date"], np.datetime64(end, "D"), side="right")
+        return records[lo:hi]
+
+    def _is_fresh(self, path) -> bool:
+        marker = self._marker(path)
+        return os.path.exists(marker) and time.time() - os.path.getmtime(marker) < self.refresh_seconds
+
+    def _mark_refreshed(self, path):
+        # written after every successful fetch, with or without new bars
+        with open(self._marker(path), "a"):
+            pass
+        os.utime(self._marker(path))
+
+    def refresh(self, ticker: str, source: str = "yahoo", force: bool = False) -> int:
+        """Append the missing days; returns the number of records written"""
+        path = self.path(ticker, source)
+        if not force and self._is_fresh(path):
+            return 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock(path), open(path, "ab") as handle:
+            # workers and the refresh CLI may update the same file
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                if not force and self._is_fresh(path):
+                    return 0
+                return self._refresh_locked(ticker, source, path, handle)
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _refresh_locked(self, ticker, source, path, handle) -> int:
+        stored = self.read(ticker, source)
+        cutoff = np.datetime64(_last_closed_session(), "D")
+        if len(stored):
+            last = stored[-1].copy()
+            fetched = FETCHERS[source](ticker, last["date"].astype(object))
+            fetched = fetched[fetched["date"] <= cutoff]
+            overlap = fetched[fetched["date"] == last["date"]]
+            if len(overlap) and not np.isclose(overlap["close"][0], last["close"], rtol=1e-6):
+                logging.info(f"OHLCV {source}/{ticker}: history was re-adjusted, rebuilding")
+                return self._rebuild(ticker, source, path, cutoff)
+            delta = fetched[fetched["date"] > last["date"]]
+        else:
+            start = (datetime.now(MARKET_TZ) - timedelta(days=self.history_days)).date()
+            delta = FETCHERS[source](ticker, start)
+            delta = delta[delta["date"] <= cutoff]
+        del stored
+
+        if len(delta):
+            handle.write(delta.tobytes())
+            handle.flush()
+        self._mark_refreshed(path)
+        return len(delta)
+
+    def _rebuild(self, ticker, source, path, cutoff) -> int:
+        start = (datetime.now(MARKET_TZ) - timedelta(days=self.history_days)).date()
+        records = FETCHERS[source](ticker, start)
+        records = records[records["date"] <= cutoff]
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as handle:
+            handle.write(records.tobytes())
+        # existing memmaps keep the old inode until they are dropped
+        os.replace(tmp, path)
+        self._mark_refreshed(path)
+        return len(records)
+
+    def history(self, ticker: str, source: str = "yahoo", days: int = None) -> np.ndarray:
+        """Refresh (serving what is stored if the fetch fails), then the last `days` days"""
+        try:
+            self.refresh(ticker, source)
+        except Exception as e:
+            logging.warning(f"OHLCV {source}/{ticker}: refresh failed, serving stored data: {e}")
+        start = None if days is None else (datetime.now(MARKET_TZ) - timedelta(days=days)).date()
+        return self.read(ticker, source, start)
+
+    def frame(self, ticker: str, source: str = "yahoo", days: int = None):
+        """history() as a DataFrame with the yfinance column names"""
+        import pandas as pd
+        records = self.history(ticker, source, days)
+        return pd.DataFrame({
+            "Date": records["date"],
+            "Open": records["open"],
+            "High": records["high"],
+            "Low": records["low"],
+            "Close": records["close"],
+            "Volume": records["volume"],
+            "Symbol": ticker,
+        })
+
+
+def polygon_bars(records):
+    """Records in the shape of Polygon aggregate results (t in ms)"""
+    millis = records["date"].astype("M8[ms]").astype("i8")
+    return [
+        {"t": int(t), "o": float(r["open"]), "h": float(r["high"]), "l": float(r["low"]),
+         "c": float(r["close"]), "v": float(r["volume"])}
+        for t, r in zip(millis, records)
+    ]
+
+
+store = OHLCVStore()
+
+
+def refresh_universe(tickers, source: str = "yahoo", workers: int = 8, force: bool = False):
+    """Delta-refresh every ticker concurrently; returns {ticker: records written or error}"""
+    def run(ticker):
+        try:
+            return ticker, store.refresh(ticker, source, force=force)
+        except Exception as e:
+            logging.error(f"OHLCV {source}/{ticker}: refresh failed: {e}")
+            return ticker, e
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ohlcv") as pool:
+        return dict(pool.map(run, tickers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=SOURCES, default="yahoo")
+    parser.add_argument("--tickers", help="comma separated (default: the `stocks` universe)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--force", action="store_true", help="ignore OHLCV_REFRESH_SECONDS")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.tickers:
+        tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    else:
+        from tradingAgent.core.tools import stocks
+        tickers = stocks
+
+    started = time.perf_counter()
+    results = refresh_universe(tickers, args.source, args.workers, args.force)
+    failed = [t for t, r in results.items() if isinstance(r, Exception)]
+    written = sum(r for r in results.values() if not isinstance(r, Exception))
+    logging.info(f"{len(tickers)} tickers from {args.source}: {written} records written, "
+                 f"{len(failed)} failed{' (' + ', '.join(failed) + ')' if failed else ''}, "
+                 f"{time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Polygon.io REST client shared by the trading and cronjob tools.
+
+Requests go through the process-wide keep-alive session (`registry.http_session`)
+and the "polygon" upstream limiter, whose token bucket is set to the API plan with
+UPSTREAM_POLYGON_RATE (requests/second) and UPSTREAM_POLYGON_BURST. 429 and 5xx
+answers and connection errors are retried up to POLYGON_MAX_RETRIES times with
+full-jitter exponential backoff (honouring Retry-After); nothing sleeps on success.
+"""
+import os
+import time
+import random
+import logging
+import requests
+from utills.limiter import limit
+from utills.metrics import counter
+
+POLYGON_BASE_URL = "https://api.polygon.io"
+POLYGON_TIMEOUT = float(os.getenv("POLYGON_TIMEOUT", 10))
+POLYGON_MAX_RETRIES = int(os.getenv("POLYGON_MAX_RETRIES", 3))
+POLYGON_BACKOFF = float(os.getenv("POLYGON_BACKOFF", 0.5))
+POLYGON_BACKOFF_MAX = float(os.getenv("POLYGON_BACKOFF_MAX", 20))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+polygon_retries = counter("polygon_retries_total", "Polygon requests retried, by reason", ("reason",))
+
+
+class PolygonClient:
+    def __init__(self, api_key: str, session, timeout: float = POLYGON_TIMEOUT,
+                 max_retries: int = POLYGON_MAX_RETRIES, backoff: float = POLYGON_BACKOFF):
+        self.session = session
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # header auth keeps the key out of URLs and logs
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+
+    def _delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(POLYGON_BACKOFF_MAX, float(retry_after))
+        return random.uniform(0, min(POLYGON_BACKOFF_MAX, self.backoff * 2 ** attempt))
+
+    def get(self, path: str, **params) -> dict:
+        """GET `path` and return the JSON body; raises requests.RequestException once retries run out"""
+        url = POLYGON_BASE_URL + path
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                with limit("polygon"):
+                    response = self.session.get(url, params=params, headers=self.headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                reason = str(response.status_code)
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = type(e).__name__
+                if attempt == self.max_retries:
+                    raise
+            delay = self._delay(attempt, response)
+            polygon_retries.inc(reason=reason)
+            logging.warning(f"Polygon {path}: {reason}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    # -------------------------------
+    # ENDPOINTS
+    # -------------------------------
+    def daily_bars(self, ticker: str, start: str, end: str, limit: int = 200) -> dict:
+        """Daily aggregates between two YYYY-MM-DD dates"""
+        return self.get(f"/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}", sort="asc", limit=limit)
+
+    def previous_close(self, ticker: str) -> dict:
+        return self.get(f"/v2/aggs/ticker/{ticker}/prev", adjusted="true")
+
+    def grouped_daily(self, date: str) -> dict:
+        """Daily bars of every US stock for one YYYY-MM-DD session"""
+        return self.get(f"/v2/aggs/grouped/locale/us/market/stocks/{date}", adjusted="true")
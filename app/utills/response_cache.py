@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+from utills.clients import registry, redis_enabled
+from utills.metrics import register_collector
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+
+def seconds_until_next_open(now: datetime) -> float:
+    """Seconds from `now` to the next NYSE open (weekends skipped, holidays ignored)"""
+    local = now.astimezone(MARKET_TZ)
+    candidate = local.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if local >= candidate:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return (candidate - local).total_seconds()
+
+
+def market_is_open(now: datetime) -> bool:
+    local = now.astimezone(MARKET_TZ)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+class ResponseCache:
+    """
+    Redis-backed cache for expensive endpoint results.
+
+    While the market is open entries live `ttl` seconds; outside market hours
+    nothing moves, so entries live until the next open (capped at `max_ttl`).
+    Hit/miss/bypass counters are kept per process. Redis errors count as misses.
+    """
+
+    def __init__(self, namespace: str, ttl: int, max_ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.enabled = redis_enabled("RESPONSE_CACHE")
+        self.counters = {"hits": 0, "misses": 0, "bypass": 0, "errors": 0}
+        self._lock = threading.Lock()
+        register_collector(self._collect)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def key(self, raw_key: str) -> str:
+        return f"cache:{self.namespace}:{hashlib.sha256(raw_key.encode()).hexdigest()}"
+
+    def ttl_for(self, now: datetime = None) -> int:
+        now = now or datetime.now(MARKET_TZ)
+        if market_is_open(now):
+            return self.ttl
+        return int(min(self.max_ttl, max(self.ttl, seconds_until_next_open(now))))
+
+    def get(self, raw_key: str):
+        """Return (value, remaining_seconds) on a hit, None on a miss"""
+        if not self.enabled:
+            return None
+        from redis.exceptions import RedisError
+        try:
+            pipe = registry.redis().pipeline()
+            pipe.get(self.key(raw_key))
+            pipe.ttl(self.key(raw_key))
+            cached, remaining = pipe.execute()
+        except RedisError as e:
+            logging.warning(f"Response cache {self.namespace} unavailable: {e}")
+            self._count("errors")
+            return None
+        if cached is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(cached), max(0, remaining)
+
+    def set(self, raw_key: str, value) -> int:
+        """Store `value` and return the TTL it was stored with (0 if not stored)"""
+        if not self.enabled:
+            return 0
+        from redis.exceptions import RedisError
+        ttl = self.ttl_for()
+        try:
+            registry.redis().set(self.key(raw_key), json.dumps(value, default=str), ex=ttl)
+        except RedisError as e:
+            logging.warning(f"Response cache {self.namespace} unavailable: {e}")
+            self._count("errors")
+            return 0
+        return ttl
+
+    def bypassed(self):
+        self._count("bypass")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else None
+        return counters
+
+    def _collect(self):
+        with self._lock:
+            samples = [({"cache": self.namespace, "result": name}, value) for name, value in self.counters.items()]
+        return [("response_cache_lookups_total", "counter", "Response cache lookups by result", samples)]
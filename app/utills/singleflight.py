@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from utills.clients import registry, redis_enabled
+from utills.metrics import register_collector
+
+# Compare-and-delete so a leader never releases a lock that expired and was re-taken
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    Within a process, duplicates wait on the leader's in-flight call. Across
+    uvicorn workers, a Redis lock elects one leader; the others poll for the
+    result it publishes (kept for `result_ttl` seconds) and run the call
+    themselves only if the leader disappears. Results must be JSON-serializable.
+    Redis coordination is used when REDIS_HOST is set (or SINGLEFLIGHT_REDIS=1).
+    """
+
+    def __init__(self, namespace: str, lock_ttl: float = 300.0, result_ttl: float = 10.0,
+                 poll_interval: float = 0.25):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.use_redis = redis_enabled("SINGLEFLIGHT_REDIS")
+        self.stats = {"executions": 0, "local_followers": 0, "remote_followers": 0}
+        self._calls = {}
+        self._lock = threading.Lock()
+        register_collector(self._collect)
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # in-flight calls belong to the parent's threads; a forked worker must not wait on them
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _collect(self):
+        with self._lock:
+            samples = [({"flight": self.namespace, "role": role}, value) for role, value in self.stats.items()]
+        return [("singleflight_calls_total", "counter", "Single-flight executions and coalesced followers", samples)]
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.stats["local_followers"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_distributed(key, fn) if self.use_redis else self._execute(fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _execute(self, fn):
+        with self._lock:
+            self.stats["executions"] += 1
+        return fn()
+
+    def _run_distributed(self, key, fn):
+        from redis.exceptions import RedisError
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        lock_key = f"singleflight:{self.namespace}:{digest}:lock"
+        result_key = f"singleflight:{self.namespace}:{digest}:result"
+        token = uuid.uuid4().hex
+        try:
+            r = registry.redis()
+            acquired = r.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except RedisError as e:
+            logging.warning(f"Single-flight Redis unavailable, coalescing locally only: {e}")
+            return self._execute(fn)
+
+        if acquired:
+            try:
+                result = self._execute(fn)
+                try:
+                    r.set(result_key, json.dumps(result, default=str), px=int(self.result_ttl * 1000))
+                except RedisError as e:
+                    logging.warning(f"Could not publish single-flight result {result_key}: {e}")
+                return result
+            finally:
+                try:
+                    r.eval(_RELEASE_LOCK, 1, lock_key, token)
+                except RedisError as e:
+                    logging.warning(f"Could not release single-flight lock {lock_key}: {e}")
+
+        # another worker is running this call: wait for its published result
+        with self._lock:
+            self.stats["remote_followers"] += 1
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                cached = r.get(result_key)
+                if cached is not None:
+                    return json.loads(cached)
+                if not r.exists(lock_key):
+                    # leader finished between the two reads, or failed without publishing
+                    cached = r.get(result_key)
+                    if cached is not None:
+                        return json.loads(cached)
+                    break
+                time.sleep(self.poll_interval)
+        except RedisError as e:
+            logging.warning(f"Single-flight Redis error while waiting on {lock_key}: {e}")
+        return self._execute(fn)
@@ -0,0 +1,64 @@
+import json
+import queue
+import threading
+
+# Headers that keep proxies / load balancers from buffering the event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(data, event: str = None) -> str:
+    """Format one server-sent event; non-string payloads are sent as JSON"""
+    if not isinstance(data, str):
+        data = json.dumps(data, default=str)
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+_DONE = object()
+
+
+def with_heartbeat(events, interval: float = 15.0):
+    """
+    Iterate `events` in a background thread and re-yield its items, emitting an SSE
+    comment whenever nothing was produced for `interval` seconds. Keeps idle
+    connections alive through load balancers while a slow step is running.
+    When the response is closed (client disconnect), the producer stops at the
+    next item and closes `events`.
+    """
+    buffer = queue.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in events:
+                if stop.is_set():
+                    break
+                buffer.put(item)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            close = getattr(events, "close", None)
+            if stop.is_set() and callable(close):
+                close()
+            buffer.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            try:
+                item = buffer.get(timeout=interval)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,68 @@
+"""
+Provider-native structured output for LLM nodes.
+
+`invoke_structured` binds a Pydantic schema with `with_structured_output`, so the
+model returns validated fields instead of free text to scrape for ```json fences.
+When the provider's output still fails validation, one repair call on the cheap
+tier (`structured.repair` in model_tiers.json) gets the raw answer plus the
+validation error; nothing silently falls back to a canned answer.
+"""
+import json
+import logging
+from langchain_core.messages import HumanMessage, SystemMessage
+from utills.clients import registry
+from utills.limiter import limit, UpstreamBusy
+from utills.metrics import counter
+
+structured_output_results = counter(
+    "structured_output_total", "Structured LLM outputs by node and result (ok, repaired, failed)", ("node", "result"))
+
+REPAIR_PROMPT = (
+    "The previous answer did not match the required schema. Return the same content "
+    "as valid structured output; do not invent data that is not in the answer."
+)
+
+
+def _raw_text(raw) -> str:
+    # function-calling providers (Gemini's default) put the answer in the tool call args
+    tool_calls = getattr(raw, "tool_calls", None)
+    if tool_calls:
+        return json.dumps(tool_calls[0].get("args", {}), default=str)
+    content = getattr(raw, "content", raw)
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+
+def invoke_structured(llm, schema, messages, node: str):
+    """
+    Run `messages` through `llm` bound to `schema`. Returns a `schema` instance,
+    or None when both the call and the single repair attempt fail to validate.
+    """
+    with limit("gemini"):
+        result = llm.with_structured_output(schema, include_raw=True).invoke(messages)
+    if result.get("parsed") is not None:
+        structured_output_results.inc(node=node, result="ok")
+        return result["parsed"]
+
+    raw = _raw_text(result.get("raw"))
+    error = result.get("parsing_error")
+    logging.warning(f"{node}: structured output did not validate ({error}), attempting repair")
+    if raw.strip():
+        try:
+            repair_llm = registry.chat_model_for("structured.repair").with_structured_output(schema)
+            with limit("gemini"):
+                repaired = repair_llm.invoke([
+                    SystemMessage(content=REPAIR_PROMPT),
+                    HumanMessage(content=f"Validation error: {error}\n\nAnswer:\n{raw}")
+                ])
+            if repaired is not None:
+                structured_output_results.inc(node=node, result="repaired")
+                return repaired
+        except UpstreamBusy:
+            raise
+        except Exception as e:
+            logging.error(f"{node}: structured output repair failed: {e}")
+
+    structured_output_results.inc(node=node, result="failed")
+    return None
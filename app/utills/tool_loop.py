@@ -0,0 +1,254 @@
+"""
+Agent loop for tool-bound chat models.
+
+    agent = build_tool_agent(llm, tools)            # compiled graph: agent <-> tools
+    state = agent.invoke({"messages": [HumanMessage(content=prompt)]})
+
+The `agent` node calls the tool-bound model; while its reply has `tool_calls`,
+a conditional edge routes to the `tools` node, which runs every call of that
+turn concurrently on a shared thread pool and appends one ToolMessage per call.
+Guards (env overrides in brackets):
+  * per-call timeout      [TOOL_CALL_TIMEOUT, seconds] - a call that outlives it
+    keeps its worker until it returns (`tool_calls_overrunning`), so upstream
+    requests carry their own, shorter timeouts (HTTP_TIMEOUT, POLYGON_TIMEOUT)
+  * result size cap       [TOOL_RESULT_MAX_CHARS]
+  * max model/tool rounds [TOOL_LOOP_MAX_ITERATIONS]
+`run_parallel` exposes the same executor for code that already knows its calls.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from typing import Annotated
+from typing_extensions import TypedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from langchain_core.messages import ToolMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from utills.limiter import limit
+from utills.metrics import timed_node, counter, register_collector
+
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", 30))
+TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", 4000))
+TOOL_LOOP_MAX_ITERATIONS = int(os.getenv("TOOL_LOOP_MAX_ITERATIONS", 4))
+TOOL_POOL_SIZE = int(os.getenv("TOOL_POOL_SIZE", 16))
+
+_executor = None
+_executor_lock = threading.Lock()
+_overrunning = 0
+_overrun_lock = threading.Lock()
+
+tool_call_timeouts = counter(
+    "tool_call_timeouts_total", "Tool calls abandoned at their timeout while still running", ("tool",))
+
+
+@register_collector
+def _collect_overrunning():
+    return [("tool_calls_overrunning", "gauge",
+             "Timed-out tool calls still holding a tool-pool worker", [({}, _overrunning)])]
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_POOL_SIZE, thread_name_prefix="tool")
+    return _executor
+
+
+def _reset_after_fork():
+    # the parent's pool threads do not exist in a forked child
+    global _executor, _executor_lock, _overrunning, _overrun_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+    _overrunning = 0
+    _overrun_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _truncate(content: str, max_chars: int) -> str:
+    if len(content) <= max_chars:
+        return content
+    return content[:max_chars] + f"\n...[truncated {len(content) - max_chars} chars]"
+
+
+def _as_text(result) -> str:
+    if isinstance(result, str):
+        return result
+    try:
+        return json.dumps(result, default=str)
+    except Exception:
+        return str(result)
+
+
+class _Call:
+    """One call submitted to the tool pool, tracked after its caller stops waiting for it"""
+
+    def __init__(self, fn, args, kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.name = getattr(getattr(fn, "__self__", None), "name", None) or getattr(fn, "__name__", repr(fn))
+        self.started = None
+        self.finished = False
+        self.abandoned = False
+
+    def run(self):
+        self.started = time.monotonic()
+        try:
+            return self.fn(*self.args, **self.kwargs)
+        finally:
+            global _overrunning
+            with _overrun_lock:
+                self.finished = True
+                if self.abandoned:
+                    _overrunning -= 1
+            if self.abandoned:
+                logging.info(f"Timed-out tool call {self.name} returned after {time.monotonic() - self.started:.1f}s")
+
+
+def _abandon(call, future, timeout):
+    """The caller gave up on `call`: drop it if still queued, else count it until it returns"""
+    global _overrunning
+    if future.cancel():
+        return
+    with _overrun_lock:
+        if call.finished:
+            return
+        call.abandoned = True
+        _overrunning += 1
+        overrunning = _overrunning
+    tool_call_timeouts.inc(tool=call.name)
+    # a thread cannot be interrupted: the worker stays busy until the tool's own timeout
+    logging.warning(f"Tool call {call.name} timed out after {timeout:.0f}s and is still running "
+                    f"({overrunning} timed-out calls holding tool-pool workers)")
+
+
+def run_parallel(calls, timeout: float = None, per_call: bool = False):
+    """
+    Run `calls` - a list of (fn, args, kwargs) - concurrently on the tool pool.
+    Returns one result per call, in order; a call that raised or outlived
+    `timeout` yields the exception instead. `timeout` is a deadline for the whole
+    batch, or with `per_call` one per call counted from when it starts running,
+    so calls queued behind other batches on the shared pool are not charged for
+    the wait. Timed-out calls keep their worker until they return, so tools
+    must time out their own upstream requests (see `tool_calls_overrunning`).
+    """
+    timeout = TOOL_CALL_TIMEOUT if timeout is None else timeout
+    tracked = [_Call(fn, args, kwargs) for fn, args, kwargs in calls]
+    if per_call:
+        return _run_per_call(tracked, timeout)
+    deadline = time.monotonic() + timeout
+    futures = [_pool().submit(call.run) for call in tracked]
+    results = []
+    for call, future in zip(tracked, futures):
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeout:
+            _abandon(call, future, timeout)
+            results.append(TimeoutError(f"timed out after {timeout:.0f}s"))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _run_per_call(tracked, timeout):
+    futures = {_pool().submit(call.run): i for i, call in enumerate(tracked)}
+    results = [None] * len(tracked)
+    pending = set(futures)
+    while pending:
+        # wake up for the next completion or the earliest deadline of a running call
+        deadlines = [tracked[futures[f]].started + timeout for f in pending if tracked[futures[f]].started]
+        wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else timeout
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+        now = time.monotonic()
+        for future in list(pending):
+            call = tracked[futures[future]]
+            if call.started and call.started + timeout <= now:
+                _abandon(call, future, timeout)
+                results[futures[future]] = TimeoutError(f"timed out after {timeout:.0f}s")
+                pending.discard(future)
+    return results
+
+
+def execute_tool_calls(tool_calls, tools_by_name, timeout: float = None, max_chars: int = None):
+    """Run every tool call of one model turn concurrently; one ToolMessage per call"""
+    max_chars = TOOL_RESULT_MAX_CHARS if max_chars is None else max_chars
+    calls, known = [], []
+    for call in tool_calls:
+        tool = tools_by_name.get(call["name"])
+        known.append(tool is not None)
+        if tool is not None:
+            calls.append((tool.invoke, (call.get("args", {}),), {}))
+    results = iter(run_parallel(calls, timeout))
+
+    messages = []
+    for call, is_known in zip(tool_calls, known):
+        if not is_known:
+            content, status = f"Error: unknown tool {call['name']}", "error"
+        else:
+            result = next(results)
+            if isinstance(result, Exception):
+                logging.warning(f"Tool {call['name']} failed: {result}")
+                content, status = f"Error: {result}", "error"
+            else:
+                content, status = _as_text(result), "success"
+        messages.append(ToolMessage(
+            content=_truncate(content, max_chars), tool_call_id=call["id"], name=call["name"], status=status
+        ))
+    return messages
+
+
+class ToolLoopState(TypedDict):
+    messages: Annotated[list, add_messages]
+    iterations: int
+
+
+def build_tool_agent(llm, tools, name: str = "tool_agent", upstream: str = "gemini",
+                     max_iterations: int = None, timeout: float = None, max_chars: int = None):
+    """Compile an agent <-> tools loop for a model with `tools` already bound"""
+    max_iterations = TOOL_LOOP_MAX_ITERATIONS if max_iterations is None else max_iterations
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    def agent(state: ToolLoopState):
+        with limit(upstream):
+            reply = llm.invoke(state["messages"])
+        return {"messages": [reply], "iterations": state.get("iterations", 0) + 1}
+
+    def run_tools(state: ToolLoopState):
+        return {"messages": execute_tool_calls(state["messages"][-1].tool_calls, tools_by_name, timeout, max_chars)}
+
+    def route(state: ToolLoopState):
+        last = state["messages"][-1]
+        if not getattr(last, "tool_calls", None):
+            return END
+        if state.get("iterations", 0) >= max_iterations:
+            logging.warning(f"{name}: stopping after {max_iterations} tool rounds")
+            return END
+        return "tools"
+
+    graph = StateGraph(ToolLoopState)
+    graph.add_node("agent", timed_node(name, "agent", agent))
+    graph.add_node("tools", timed_node(name, "tools", run_tools))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", route, {"tools": "tools", END: END})
+    graph.add_edge("tools", "agent")
+    return graph.compile()
+
+
+def tool_transcript(messages) -> str:
+    """Tool results (and any final model text) of a finished loop, as prompt context"""
+    lines = []
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            lines.append(f"[{message.name}] {message.content}")
+        elif getattr(message, "type", "") == "ai" and isinstance(message.content, str) and message.content.strip():
+            lines.append(f"[analyst notes] {message.content.strip()}")
+    return "\n".join(lines)